@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, skills, sessions, transactions, chats
+from app.api.v1.endpoints import auth, users, skills, sessions, transactions, chats, leaderboards, batch
 
 api_router = APIRouter()
 
@@ -9,7 +9,5 @@ api_router.include_router(skills.router, prefix="/skills", tags=["skills"])
 api_router.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
 api_router.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
 api_router.include_router(chats.router, prefix="/chats", tags=["chats"])
-
-
-
-
+api_router.include_router(leaderboards.router, prefix="/leaderboards", tags=["leaderboards"])
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.auth import optional_security, token_claims
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password, get_password_hash, password_needs_rehash
+from app.models.transaction import Transaction as TransactionModel
 from app.models.user import User as UserModel
+from app.schemas.auth import LogoutRequest, RefreshRequest
 from app.schemas.user import UserCreate, UserLogin, User as UserSchema
-from datetime import timedelta
-from app.core.config import settings
+from datetime import datetime
+from app.services import passwords, refresh_tokens
+from app.services.ledger import WELCOME_BONUS_DESCRIPTION
+from app.services.matching import sync_user_tags
 import logging
 
 router = APIRouter()
@@ -34,7 +41,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             skills_to_learn=user_data.skills_to_learn,
             token_balance=100  # Starting tokens
         )
+        sync_user_tags(db_user)
         db.add(db_user)
+        db.flush()
+        # The starting grant goes through the ledger like any other balance change
+        db.add(TransactionModel(
+            user_id=db_user.id,
+            type="earn",
+            amount=db_user.token_balance,
+            description=WELCOME_BONUS_DESCRIPTION,
+            created_at=datetime.utcnow(),
+        ))
         db.commit()
         db.refresh(db_user)
         logger.info(f"User registered successfully: {user_data.email}")
@@ -50,7 +67,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login")
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     user = db.query(UserModel).filter(UserModel.email == credentials.email).first()
     if not user or not verify_password(credentials.password, user.hashed_password):
         raise HTTPException(
@@ -58,12 +75,48 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Incorrect email or password"
         )
     
-    access_token = create_access_token(data={"sub": user.email})
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": user
-    }
+    if password_needs_rehash(user.hashed_password):
+        # bcrypt at the new cost is slow; do it after the response is sent
+        background_tasks.add_task(passwords.rehash_password, user.id, credentials.password, user.hashed_password)
+
+    user_data = UserSchema.model_validate(user)  # before the commit expires it
+    tokens = refresh_tokens.issue(db, user)
+    db.commit()
+    return {**tokens, "user": user_data}
+
+@router.post("/refresh")
+async def refresh(body: RefreshRequest, db: Session = Depends(get_db)):
+    """New access and refresh tokens for a refresh token, which stops working.
+
+    409 means another request of the same client rotated it a moment ago; keep
+    the tokens that request stored rather than logging out.
+    """
+    try:
+        tokens = refresh_tokens.rotate(db, body.refresh_token)
+    except refresh_tokens.ConcurrentRefresh:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Refresh token was just used by another request"
+        )
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    return tokens
+
+@router.post("/logout")
+async def logout(
+    body: Optional[LogoutRequest] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db),
+):
+    """Revoke the bearer access token and, if given, the refresh token's login."""
+    claims = token_claims(credentials.credentials) if credentials else None
+    jti = claims.get("jti") if claims else None
+    expires_at = datetime.utcfromtimestamp(claims["exp"]) if claims and "exp" in claims else None
+    refresh_tokens.logout(db, jti, expires_at, body.refresh_token if body else None)
+    return {"message": "Logged out"}
 
 
 
@@ -0,0 +1,135 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core import batch
+from app.core.auth import get_optional_user, optional_security
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.user import User as UserModel
+from app.schemas.batch import BatchRequest, BatchResponse, BatchSubRequest, BatchSubResponse
+
+router = APIRouter()
+
+API_PREFIX = "/api/v1"
+# Hop-by-hop or meaningless once the body is embedded in the batch response
+DROPPED_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "vary"}
+
+
+async def _dispatch(request: Request, sub: BatchSubRequest) -> Tuple[BatchSubResponse, int]:
+    """Run one sub-request through the whole app (routing, dependencies, middleware); also returns its body size."""
+    path, _, query = sub.path.partition("?")
+    body = orjson.dumps(sub.body) if sub.body is not None else b""
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+    authorization = request.headers.get("authorization")
+    if authorization:
+        headers.append((b"authorization", authorization.encode("latin-1")))
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": sub.method,
+        "scheme": request.url.scheme,
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": "",
+        "path": API_PREFIX + path,
+        "raw_path": (API_PREFIX + path).encode("utf-8"),
+        "query_string": query.encode("latin-1"),
+        "headers": headers,
+    }
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The batch client stays connected until every sub-request is done
+        await asyncio.Event().wait()
+
+    status_code, response_headers, chunks = 500, {}, []
+
+    async def send(message):
+        nonlocal status_code, response_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in message.get("headers", [])
+                if name.decode("latin-1").lower() not in DROPPED_HEADERS
+            }
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await request.app(scope, receive, send)
+    raw = b"".join(chunks)
+    if not raw:
+        content = None
+    elif response_headers.get("content-type", "").startswith("application/json"):
+        content = orjson.loads(raw)
+    else:
+        content = raw.decode("utf-8", "replace")
+    return BatchSubResponse(id=sub.id, status=status_code, headers=response_headers, body=content), len(raw)
+
+
+def _error(sub: BatchSubRequest, status_code: int, detail: str) -> BatchSubResponse:
+    return BatchSubResponse(id=sub.id, status=status_code, body={"detail": detail})
+
+
+@router.post("/", response_model=BatchResponse)
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    db: SQLSession = Depends(get_db),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    current_user: Optional[UserModel] = Depends(get_optional_user),
+):
+    """Run several API calls in one round trip.
+
+    Sub-requests share this request's credentials, user and database session
+    and run one after another, in order, so reads after a write see it. They
+    are not run concurrently: endpoints do their database work synchronously
+    on the event loop, so nothing would overlap, and a session must not be
+    used by several tasks at once. Every sub-request reports its own status.
+    """
+    subs = payload.requests
+    if len(subs) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch holds at most {settings.BATCH_MAX_REQUESTS} requests")
+    for sub in subs:
+        if not sub.path.startswith("/") or sub.path.split("?")[0].rstrip("/") == "/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid batch path: {sub.path!r}")
+    if credentials is not None and current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.BATCH_TIMEOUT
+    results: List[BatchSubResponse] = []
+    response_bytes = 0
+
+    with batch.sharing(db, credentials.credentials if credentials else None, current_user):
+        for sub in subs:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or response_bytes > settings.BATCH_MAX_RESPONSE_BYTES:
+                results.append(_error(sub, 503, "Batch limits exceeded; request not run"))
+                continue
+            try:
+                result, size = await asyncio.wait_for(_dispatch(request, sub), remaining)
+            except asyncio.TimeoutError:
+                results.append(_error(sub, 504, "Batch time limit exceeded"))
+                # Cancelled part-way: whatever it did in the shared session is discarded
+                db.rollback()
+                continue
+            if sub.method != "GET":
+                # Drop anything a failed write left pending in the shared session
+                db.rollback()
+            response_bytes += size
+            if response_bytes > settings.BATCH_MAX_RESPONSE_BYTES:
+                result = _error(sub, 413, "Batch response size limit exceeded")
+            results.append(result)
+    return BatchResponse(responses=results)
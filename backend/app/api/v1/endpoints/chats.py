@@ -1,43 +1,70 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session as SQLSession
+from sqlalchemy.orm import Session as SQLSession, joinedload
 from app.core.database import get_db
 from app.models.chat import Chat as ChatModel, Message as MessageModel
 from app.models.user import User as UserModel
-from app.schemas.chat import Chat as ChatSchema, Message as MessageSchema, MessageCreate
-from typing import List
+from app.schemas.chat import Chat as ChatSchema, Message as MessageSchema, MessageCreate, MessageListAdapter
+from app.core.responses import json_response
+from typing import List, Optional
 from app.core.auth import get_current_user as get_current_user_dep
+from app.core.fields import Selection, fields_query, list_adapter, load_options
+from app.core.outbox import publish
 from app.schemas.chat import ChatCreate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ChatSchema])
-async def get_chats(db: SQLSession = Depends(get_db), current_user: UserModel = Depends(get_current_user_dep)):
+async def get_chats(
+    selection: Optional[Selection] = Depends(fields_query(ChatSchema)),
+    db: SQLSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user_dep),
+):
     # Return chats for authenticated user
-    chats = db.query(ChatModel).filter(
+    wanted = None if selection is None else {name for name, _ in selection}
+    participants = wanted is None or any(name.startswith("participant_") for name in wanted)
+    if selection:
+        # Unread counts and partners are picked per side, so both sides' columns are kept
+        options = load_options(ChatModel, ChatSchema, selection, ChatModel.user1_id, ChatModel.user2_id,
+                               ChatModel.unread_count_user1, ChatModel.unread_count_user2)
+        if participants:
+            partner_columns = (UserModel.name, UserModel.avatar_url, UserModel.is_active)
+            options += [joinedload(ChatModel.user1).load_only(*partner_columns),
+                        joinedload(ChatModel.user2).load_only(*partner_columns)]
+    else:
+        options = [joinedload(ChatModel.user1), joinedload(ChatModel.user2)]
+    chats = db.query(ChatModel).options(*options).filter(
         (ChatModel.user1_id == current_user.id) | (ChatModel.user2_id == current_user.id)
     ).all()
 
     result = []
     for chat in chats:
         if chat.user1_id == current_user.id:
-            partner = db.query(UserModel).filter(UserModel.id == chat.user2_id).first()
+            partner = chat.user2 if participants else None
             unread_count = chat.unread_count_user1
         else:
-            partner = db.query(UserModel).filter(UserModel.id == chat.user1_id).first()
+            partner = chat.user1 if participants else None
             unread_count = chat.unread_count_user2
 
-        result.append({
+        row = {
             "id": chat.id,
             "user1_id": chat.user1_id,
             "user2_id": chat.user2_id,
-            "last_message": chat.last_message,
-            "last_message_time": chat.last_message_time,
             "unread_count": unread_count,
-            "participant_id": partner.id if partner else None,
-            "participant_name": partner.name if partner else None,
-            "participant_avatar": partner.avatar_url if partner else None,
-            "participant_is_active": partner.is_active if partner else False,
-        })
+        }
+        # Unselected columns were not loaded; touching them would query per row
+        for column in ("last_message", "last_message_time"):
+            if wanted is None or column in wanted:
+                row[column] = getattr(chat, column)
+        if participants:
+            row.update({
+                "participant_id": partner.id if partner else None,
+                "participant_name": partner.name if partner else None,
+                "participant_avatar": partner.avatar_url if partner else None,
+                "participant_is_active": partner.is_active if partner else False,
+            })
+        result.append(row)
+    if selection:
+        return json_response(list_adapter(ChatSchema, selection), result)
     return result
 
 @router.get("/{chat_id}/messages", response_model=List[MessageSchema])
@@ -48,7 +75,7 @@ async def get_messages(chat_id: int, db: SQLSession = Depends(get_db), current_u
         raise HTTPException(status_code=404, detail="Chat not found")
 
     messages = db.query(MessageModel).filter(MessageModel.chat_id == chat_id).order_by(MessageModel.created_at).all()
-    return messages
+    return json_response(MessageListAdapter, messages)
 
 @router.post("/{chat_id}/messages", response_model=MessageSchema)
 async def create_message(
@@ -76,6 +103,8 @@ async def create_message(
         else:
             chat.unread_count_user1 += 1
     
+    db.flush()
+    publish(db, "message.created", db_message.id, chat_id=chat_id, sender_id=current_user.id)
     db.commit()
     db.refresh(db_message)
     return db_message
@@ -109,6 +138,8 @@ async def get_or_create_chat(payload: ChatCreate, db: SQLSession = Depends(get_d
     # Create new chat
     new_chat = ChatModel(user1_id=current_user.id, user2_id=other_id)
     db.add(new_chat)
+    db.flush()
+    publish(db, "chat.created", new_chat.id, user1_id=current_user.id, user2_id=other_id)
     db.commit()
     db.refresh(new_chat)
     partner = db.query(UserModel).filter(UserModel.id == other_id).first()
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.auth import get_optional_user
+from app.core.database import get_db
+from app.models.user import User as UserModel
+from app.schemas.leaderboard import Leaderboard, LeaderboardEntry, LeaderboardName
+from app.services import leaderboard
+
+router = APIRouter()
+
+
+@router.get("/{board}", response_model=Leaderboard)
+async def get_leaderboard(
+    board: LeaderboardName,
+    limit: int = Query(10, ge=1, le=100),
+    db: SQLSession = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_optional_user),
+):
+    """Top users on a board, plus the caller's own rank when authenticated."""
+    ranking = leaderboard.get_board(board.value, db)
+    top = ranking.top(limit)
+
+    # Only the users on this page are loaded
+    user_ids = {user_id for _, user_id, _ in top}
+    users = {
+        user.id: user
+        for user in db.query(UserModel).filter(UserModel.id.in_(user_ids))
+    } if user_ids else {}
+
+    def entry(rank: int, user_id: int, score: int, user: Optional[UserModel] = None) -> LeaderboardEntry:
+        user = user or users.get(user_id)
+        return LeaderboardEntry(
+            rank=rank, user_id=user_id, score=score,
+            full_name=user.name if user else None,
+            avatar_url=user.avatar_url if user else None,
+        )
+
+    me = None
+    if current_user is not None:
+        rank, score = ranking.rank(current_user.id)
+        me = entry(rank, current_user.id, score, current_user)
+    return Leaderboard(
+        board=board,
+        total=len(ranking),
+        entries=[entry(*row) for row in top],
+        me=me,
+    )
@@ -1,19 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session as SQLSession
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.session import Session as SessionModel
 from app.models.skill import Skill as SkillModel
 from app.models.user import User as UserModel
 from app.models.transaction import Transaction as TransactionModel
 from app.schemas.session import Session as SessionSchema, SessionCreate
-from typing import List
+from typing import List, Optional
+from app.core.fields import Selection, fields_query, list_adapter, load_options
+from app.core.responses import json_response
 from app.core.auth import get_current_user as get_current_user_dep
-from datetime import datetime
+from app.core.jobs import enqueue
+from app.core.outbox import publish
+from app.services import ranking, skill_cache
+from app.services.ledger import TEACHING_EARNING_PREFIX
+from app.services.tasks import increment_streak
+from app.services.scheduling import has_conflict
+from datetime import datetime, timezone
 
 router = APIRouter()
 
 def create_transaction(db: SQLSession, user_id: int, type: str, amount: int, description: str):
-    """Helper function to create transaction records"""
+    """Add a transaction record; it is written when the caller commits, with the change it records"""
     transaction = TransactionModel(
         user_id=user_id,
         type=type,
@@ -22,25 +32,51 @@ def create_transaction(db: SQLSession, user_id: int, type: str, amount: int, des
         created_at=datetime.utcnow()
     )
     db.add(transaction)
-    db.commit()
+
+def transition(db: SQLSession, session: SessionModel, status: str, *from_statuses: str):
+    """Move the session to `status` if it is still in one of `from_statuses`, else 409.
+
+    The check and the write are one UPDATE, so when two requests, or a request
+    and the session sweeper, race on a session only one changes it and pays out.
+    """
+    changed = db.query(SessionModel).filter(
+        SessionModel.id == session.id, SessionModel.status.in_(from_statuses)
+    ).update({SessionModel.status: status})
+    if not changed:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="The session was changed by another request; reload it")
 
 @router.get("/", response_model=List[SessionSchema])
-async def get_sessions(db: SQLSession = Depends(get_db), current_user: UserModel = Depends(get_current_user_dep)):
+async def get_sessions(
+    selection: Optional[Selection] = Depends(fields_query(SessionSchema)),
+    db: SQLSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user_dep),
+):
     # Return sessions where the current user is either student or teacher
-    sessions = db.query(SessionModel).filter(
+    query = db.query(SessionModel).filter(
         (SessionModel.student_id == current_user.id) | (SessionModel.teacher_id == current_user.id)
-    ).all()
-    return sessions
+    )
+    if selection:
+        sessions = query.options(*load_options(SessionModel, SessionSchema, selection)).all()
+        return json_response(list_adapter(SessionSchema, selection), sessions)
+    return query.all()
 
 @router.get("/upcoming", response_model=List[SessionSchema])
-async def get_upcoming_sessions(db: SQLSession = Depends(get_db), current_user: UserModel = Depends(get_current_user_dep)):
+async def get_upcoming_sessions(
+    selection: Optional[Selection] = Depends(fields_query(SessionSchema)),
+    db: SQLSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user_dep),
+):
     from datetime import datetime
-    sessions = db.query(SessionModel).filter(
+    query = db.query(SessionModel).filter(
         SessionModel.student_id == current_user.id,
         SessionModel.scheduled_at > datetime.utcnow(),
         SessionModel.status.in_(["pending", "confirmed"])
-    ).all()
-    return sessions
+    )
+    if selection:
+        sessions = query.options(*load_options(SessionModel, SessionSchema, selection)).all()
+        return json_response(list_adapter(SessionSchema, selection), sessions)
+    return query.all()
 
 @router.post("/", response_model=SessionSchema)
 async def create_session(session: SessionCreate, db: SQLSession = Depends(get_db), current_user: UserModel = Depends(get_current_user_dep)):
@@ -50,34 +86,60 @@ async def create_session(session: SessionCreate, db: SQLSession = Depends(get_db
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
     
+    if not 0 < session.duration_minutes <= settings.MAX_SESSION_MINUTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Session duration must be between 1 and {settings.MAX_SESSION_MINUTES} minutes",
+        )
+    
+    # Stored timestamps are naive UTC
+    scheduled_at = session.scheduled_at
+    if scheduled_at.tzinfo is not None:
+        scheduled_at = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    if has_conflict(db, skill.teacher_id, scheduled_at, session.duration_minutes):
+        raise HTTPException(status_code=409, detail="The teacher already has a session at this time")
+    
     # Check token balance
     student = db.query(UserModel).filter(UserModel.id == current_user.id).first()
     if student.token_balance < skill.tokens_per_session:
         raise HTTPException(status_code=400, detail="Insufficient tokens")
     
-    # Deduct tokens
-    student.token_balance -= skill.tokens_per_session
-    
-    # Create transaction record for token spend
-    create_transaction(
-        db,
-        user_id=current_user.id,
-        type="spend",
-        amount=skill.tokens_per_session,
-        description=f"Booked session for {skill.title}"
-    )
+    # Deduct tokens (in SQL, so a concurrent refund is not overwritten)
+    student.token_balance = UserModel.token_balance - skill.tokens_per_session
     
-    # Create session
+    # Create session; it is committed together with the spend below so a
+    # booking rejected by the database's overlap constraint costs nothing
     db_session = SessionModel(
         skill_id=session.skill_id,
         teacher_id=skill.teacher_id,
         student_id=current_user.id,
-        scheduled_at=session.scheduled_at,
+        scheduled_at=scheduled_at,
         duration_minutes=session.duration_minutes,
         status="pending"
     )
     db.add(db_session)
-    db.commit()
+    
+    try:
+        db.flush()  # assigns the id the event refers to
+        publish(
+            db, "session.created", db_session.id,
+            skill_id=skill.id, teacher_id=skill.teacher_id, student_id=current_user.id,
+            scheduled_at=scheduled_at, tokens=skill.tokens_per_session,
+        )
+        # Create transaction record for token spend
+        create_transaction(
+            db,
+            user_id=current_user.id,
+            type="spend",
+            amount=skill.tokens_per_session,
+            description=f"Booked session for {skill.title}"
+        )
+        db.commit()
+    except IntegrityError:
+        # A concurrent booking won the race (PostgreSQL exclusion constraint)
+        db.rollback()
+        raise HTTPException(status_code=409, detail="The teacher already has a session at this time")
     db.refresh(db_session)
     return db_session
 
@@ -94,7 +156,8 @@ async def confirm_session(session_id: int, db: SQLSession = Depends(get_db), cur
     if session.status != "pending":
         raise HTTPException(status_code=400, detail="Session can only be confirmed from pending status")
     
-    session.status = "confirmed"
+    transition(db, session, "confirmed", "pending")
+    publish(db, "session.confirmed", session.id, teacher_id=session.teacher_id, student_id=session.student_id)
     db.commit()
     db.refresh(session)
     return session
@@ -112,13 +175,15 @@ async def decline_session(session_id: int, db: SQLSession = Depends(get_db), cur
     if session.status != "pending":
         raise HTTPException(status_code=400, detail="Session can only be declined from pending status")
     
+    transition(db, session, "cancelled", "pending")
+    
     # Get skill to find token cost
     skill = db.query(SkillModel).filter(SkillModel.id == session.skill_id).first()
     
     # Refund tokens to student
     student = db.query(UserModel).filter(UserModel.id == session.student_id).first()
     if student and skill:
-        student.token_balance += skill.tokens_per_session
+        student.token_balance = UserModel.token_balance + skill.tokens_per_session
         
         # Create transaction record for token refund
         create_transaction(
@@ -129,7 +194,11 @@ async def decline_session(session_id: int, db: SQLSession = Depends(get_db), cur
             description=f"Refund for declined session on {skill.title}"
         )
     
-    session.status = "cancelled"
+    publish(
+        db, "session.cancelled", session.id,
+        reason="declined", teacher_id=session.teacher_id, student_id=session.student_id,
+        refunded=skill.tokens_per_session if student and skill else 0,
+    )
     db.commit()
     db.refresh(session)
     return session
@@ -150,13 +219,15 @@ async def cancel_session(session_id: int, db: SQLSession = Depends(get_db), curr
     if session.status == "cancelled":
         raise HTTPException(status_code=400, detail="Session is already cancelled")
     
+    transition(db, session, "cancelled", "pending", "confirmed")
+    
     # Get skill to find token cost
     skill = db.query(SkillModel).filter(SkillModel.id == session.skill_id).first()
     
     # Refund tokens to student
     student = db.query(UserModel).filter(UserModel.id == session.student_id).first()
     if student and skill:
-        student.token_balance += skill.tokens_per_session
+        student.token_balance = UserModel.token_balance + skill.tokens_per_session
         
         # Create transaction record for token refund
         create_transaction(
@@ -167,7 +238,11 @@ async def cancel_session(session_id: int, db: SQLSession = Depends(get_db), curr
             description=f"Refund for cancelled session on {skill.title}"
         )
     
-    session.status = "cancelled"
+    publish(
+        db, "session.cancelled", session.id,
+        reason="cancelled", teacher_id=session.teacher_id, student_id=session.student_id,
+        refunded=skill.tokens_per_session if student and skill else 0,
+    )
     db.commit()
     db.refresh(session)
     return session
@@ -185,13 +260,17 @@ async def complete_session(session_id: int, db: SQLSession = Depends(get_db), cu
     if session.status != "confirmed":
         raise HTTPException(status_code=400, detail="Session must be confirmed before marking as complete")
     
+    transition(db, session, "completed", "confirmed")
+    
     # Get skill to award tokens to teacher
     skill = db.query(SkillModel).filter(SkillModel.id == session.skill_id).first()
     
     # Award tokens to teacher
     teacher = db.query(UserModel).filter(UserModel.id == session.teacher_id).first()
+    earned = 0
     if teacher and skill:
-        teacher.token_balance += skill.tokens_per_session
+        earned = skill.tokens_per_session
+        teacher.token_balance = UserModel.token_balance + earned
         
         # Create transaction record for teacher earning
         create_transaction(
@@ -199,17 +278,20 @@ async def complete_session(session_id: int, db: SQLSession = Depends(get_db), cu
             user_id=session.teacher_id,
             type="earn",
             amount=skill.tokens_per_session,
-            description=f"Earned from teaching {skill.title}"
+            description=f"{TEACHING_EARNING_PREFIX}{skill.title}"
         )
     
-    # Increment student's learning streak
-    student = db.query(UserModel).filter(UserModel.id == session.student_id).first()
-    if student:
-        student.streak = (student.streak or 0) + 1
+    # Increment student's learning streak (in the background where a job runner is running)
+    enqueue(db, increment_streak, user_id=session.student_id, session_id=session.id)
     
-    session.status = "completed"
+    publish(
+        db, "session.completed", session.id,
+        skill_id=session.skill_id, teacher_id=session.teacher_id, student_id=session.student_id, tokens=earned,
+    )
+    ranking.record_completion(db, session.skill_id)
     db.commit()
     db.refresh(session)
+    skill_cache.invalidate_lists()
     return session
 
 
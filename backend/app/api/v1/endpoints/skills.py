@@ -1,25 +1,120 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session as SQLSession
-from sqlalchemy import update
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session as SQLSession, joinedload, selectinload
+from sqlalchemy import func, tuple_
 from app.core.database import get_db
 from app.models.skill import Skill as SkillModel, SkillReview as SkillReviewModel
 from app.models.user import User
-from app.schemas.skill import Skill, SkillCreate, SkillUpdate, SkillReview, SkillReviewCreate
+from app.schemas.skill import (
+    Skill, SkillCreate, SkillUpdate, SkillReview, SkillReviewCreate, SkillFacets, FreeSlot,
+    SkillAdapter, SkillListAdapter, SkillFacetsAdapter, SkillReviewListAdapter,
+)
+from app.core.config import settings
+from app.core.responses import json_response, dump_json, etag_response
+from app.services import skill_cache
+from app.core.jobs import enqueue
+from app.core.outbox import publish
+from app.services.tasks import recompute_skill_rating
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.core.fields import Selection, fields_query, list_adapter, load_options, selection_key
+from app.services.availability import (
+    available_clause, parse_interval, sync_skill_availability, windows_at, windows_between, windows_key,
+)
+from app.services.scheduling import availability_intervals, subtract, teacher_bookings
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 from app.core.auth import get_current_user as get_current_user_dep
 
 router = APIRouter()
 
+CATALOG_CACHE_CONTROL = f"public, max-age={settings.SKILL_CACHE_MAX_AGE}"
+
+# sort name -> (column, descending); ties are broken by id in the same direction
+SORTS = {
+    "top": (SkillModel.ranking_score, True),
+    "new": (SkillModel.id, True),
+    "price": (SkillModel.tokens_per_session, False),
+    "rating": (SkillModel.rating, True),
+}
+
 @router.get("/", response_model=List[Skill])
 async def get_skills(
+    request: Request,
     category: Optional[str] = Query(None),
     level: Optional[str] = Query(None),
     language: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    available_at: Optional[datetime] = Query(None),
+    available_between: Optional[str] = Query(None, description="ISO 8601 interval: <start>/<end>"),
+    sort: Optional[str] = Query(None, pattern="^(top|new|price|rating)$"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.CATALOG_PAGE_MAX),
+    cursor: Optional[str] = Query(None, description=f"Value of {NEXT_CURSOR_HEADER} from the previous page"),
+    selection: Optional[Selection] = Depends(fields_query(Skill)),
     db: SQLSession = Depends(get_db)
 ):
-    query = db.query(SkillModel)
-    
+    # Pages need a stable order
+    if (limit or cursor) and not sort:
+        sort = "top"
+    after = None
+    if cursor:
+        try:
+            column, _ = SORTS[sort]
+            value_type = column.type.python_type
+            after = decode_cursor(cursor, (value_type, None) if column.nullable else value_type, int)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Availability filters are resolved to UTC weekday/minute windows up front,
+    # so every timestamp in the same minute shares one cache entry
+    windows = []
+    if available_at:
+        windows.append(windows_at(available_at))
+    if available_between:
+        try:
+            windows.append(windows_between(*parse_interval(available_between)))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid available_between: {e}")
+
+    # Identical for every visitor, so served from the catalog cache
+    key = skill_cache.list_key(category=category, level=level, language=language, search=search,
+                               available="|".join(windows_key(w) for w in windows),
+                               sort=sort, limit=limit, cursor=cursor, fields=selection_key(selection))
+    cached = skill_cache.get(key)
+    if cached is None:
+        skills = _query_skills(db, category, level, language, search, windows, sort, limit, after, selection)
+        next_cursor = ""
+        if limit and len(skills) == limit:
+            column, _ = SORTS[sort]
+            next_cursor = encode_cursor(getattr(skills[-1], column.key), skills[-1].id)
+        adapter = list_adapter(Skill, selection) if selection else SkillListAdapter
+        cached = skill_cache.put(key, dump_json(adapter, skills), next_cursor)
+    headers = {NEXT_CURSOR_HEADER: cached.next_cursor} if cached.next_cursor else None
+    return etag_response(request, cached.body, cached.etag, CATALOG_CACHE_CONTROL, headers)
+
+def _query_skills(db: SQLSession, category, level, language, search, windows=(),
+                  sort=None, limit=None, after=None, selection=None):
+    if selection:
+        # Only the selected columns; the sort key is kept for the next cursor
+        options = load_options(SkillModel, Skill, selection, *([SORTS[sort][0]] if sort else []))
+    else:
+        options = [joinedload(SkillModel.teacher)]
+    query = db.query(SkillModel).options(*options)
+    query = _apply_filters(query, category=category, level=level, language=language, search=search)
+    for window in windows:
+        query = query.filter(available_clause(window))
+    if sort:
+        # Keyset pagination: continue strictly after the (value, id) of the previous page's last row
+        column, descending = SORTS[sort]
+        key_columns = (SkillModel.id,) if column is SkillModel.id else (column, SkillModel.id)
+        if after is not None:
+            position = tuple_(*key_columns)
+            bound = tuple_(*after[-len(key_columns):])
+            query = query.filter(position < bound if descending else position > bound)
+        query = query.order_by(*(c.desc() if descending else c.asc() for c in key_columns))
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+def _apply_filters(query, category=None, level=None, language=None, search=None):
     if category:
         query = query.filter(SkillModel.category == category)
     if level:
@@ -31,20 +126,76 @@ async def get_skills(
             (SkillModel.title.ilike(f"%{search}%")) |
             (SkillModel.description.ilike(f"%{search}%"))
         )
-    
-    skills = query.all()
-    # Load teacher relationship
-    for skill in skills:
-        skill.teacher = db.query(User).filter(User.id == skill.teacher_id).first()
-    return skills
+    return query
+
+FACETS = {
+    "category": SkillModel.category,
+    "level": SkillModel.level,
+    "language": SkillModel.language,
+}
+
+@router.get("/facets", response_model=SkillFacets)
+async def get_skill_facets(
+    request: Request,
+    category: Optional[str] = Query(None),
+    level: Optional[str] = Query(None),
+    language: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    db: SQLSession = Depends(get_db)
+):
+    """Skill counts per category, level and language.
+
+    Each facet is counted under all the *other* active filters, so the UI can
+    show how many results selecting a different value would give.
+    """
+    key = skill_cache.list_key("facets", category=category, level=level, language=language, search=search)
+    cached = skill_cache.get(key)
+    if cached is None:
+        active = {"category": category, "level": level, "language": language}
+        facets = {}
+        for name, column in FACETS.items():
+            others = {k: v for k, v in active.items() if k != name}
+            query = _apply_filters(db.query(column, func.count()), search=search, **others)
+            facets[name] = dict(query.group_by(column).all())
+        cached = skill_cache.put(key, dump_json(SkillFacetsAdapter, facets))
+    return etag_response(request, cached.body, cached.etag, CATALOG_CACHE_CONTROL)
 
 @router.get("/{skill_id}", response_model=Skill)
-async def get_skill(skill_id: int, db: SQLSession = Depends(get_db)):
+async def get_skill(skill_id: int, request: Request, db: SQLSession = Depends(get_db)):
+    key = skill_cache.detail_key(skill_id)
+    cached = skill_cache.get(key)
+    if cached is None:
+        skill = db.query(SkillModel).options(joinedload(SkillModel.teacher)).filter(SkillModel.id == skill_id).first()
+        if not skill:
+            raise HTTPException(status_code=404, detail="Skill not found")
+        cached = skill_cache.put(key, dump_json(SkillAdapter, skill))
+    return etag_response(request, cached.body, cached.etag, CATALOG_CACHE_CONTROL)
+
+@router.get("/{skill_id}/free-slots", response_model=List[FreeSlot])
+async def get_free_slots(
+    skill_id: int,
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    db: SQLSession = Depends(get_db)
+):
+    """Open time in [from, to): the skill's availability minus the teacher's active bookings."""
+    # Stored timestamps are naive UTC
+    start, end = (
+        value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+        for value in (start, end)
+    )
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=settings.FREE_SLOTS_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {settings.FREE_SLOTS_MAX_DAYS} days")
+
     skill = db.query(SkillModel).filter(SkillModel.id == skill_id).first()
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
-    skill.teacher = db.query(User).filter(User.id == skill.teacher_id).first()
-    return skill
+
+    free = availability_intervals(skill.availability_slots, start, end)
+    busy = teacher_bookings(db, skill.teacher_id, start, end)
+    return [{"start": low, "end": high} for low, high in subtract(free, busy)]
 
 @router.post("/", response_model=Skill)
 async def create_skill(
@@ -57,9 +208,13 @@ async def create_skill(
         **skill.dict(),
         teacher_id=current_user.id
     )
+    sync_skill_availability(db_skill)
     db.add(db_skill)
+    db.flush()
+    publish(db, "skill.created", db_skill.id, teacher_id=current_user.id, category=db_skill.category)
     db.commit()
     db.refresh(db_skill)
+    skill_cache.invalidate_lists()
     return db_skill
 
 @router.put("/{skill_id}", response_model=Skill)
@@ -81,9 +236,13 @@ async def update_skill(
     update_data = skill_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_skill, field, value)
+    if "availability" in update_data:
+        sync_skill_availability(db_skill)
+    publish(db, "skill.updated", skill_id, teacher_id=db_skill.teacher_id, fields=sorted(update_data))
     
     db.commit()
     db.refresh(db_skill)
+    skill_cache.invalidate_skill(skill_id)
     return db_skill
 
 @router.delete("/{skill_id}")
@@ -101,15 +260,46 @@ async def delete_skill(
         raise HTTPException(status_code=403, detail="You can only delete your own skills")
     
     db.delete(db_skill)
+    publish(db, "skill.deleted", skill_id, teacher_id=db_skill.teacher_id)
     db.commit()
+    skill_cache.invalidate_skill(skill_id)
     return {"message": "Skill deleted successfully"}
 
 @router.get("/{skill_id}/reviews", response_model=List[SkillReview])
-async def get_skill_reviews(skill_id: int, db: SQLSession = Depends(get_db)):
-    reviews = db.query(SkillReviewModel).filter(SkillReviewModel.skill_id == skill_id).all()
-    for review in reviews:
-        review.reviewer = db.query(User).filter(User.id == review.reviewer_id).first()
-    return reviews
+async def get_skill_reviews(
+    skill_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description=f"Value of {NEXT_CURSOR_HEADER} from the previous page"),
+    selection: Optional[Selection] = Depends(fields_query(SkillReview)),
+    db: SQLSession = Depends(get_db)
+):
+    """Newest reviews first, one page at a time."""
+    if selection:
+        options = load_options(SkillReviewModel, SkillReview, selection, SkillReviewModel.created_at)
+    else:
+        options = [selectinload(SkillReviewModel.reviewer)]
+    query = (
+        db.query(SkillReviewModel)
+        .options(*options)
+        .filter(SkillReviewModel.skill_id == skill_id)
+    )
+    if cursor:
+        try:
+            created_at, review_id = decode_cursor(cursor, str, int)
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(SkillReviewModel.created_at, SkillReviewModel.id) < tuple_(created_at, review_id)
+        )
+    reviews = query.order_by(SkillReviewModel.created_at.desc(), SkillReviewModel.id.desc()).limit(limit).all()
+
+    headers = {}
+    # Undated legacy rows (init_db backfills them) cannot be a keyset position
+    if len(reviews) == limit and reviews[-1].created_at is not None:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(reviews[-1].created_at.isoformat(), reviews[-1].id)
+    adapter = list_adapter(SkillReview, selection) if selection else SkillReviewListAdapter
+    return json_response(adapter, reviews, headers=headers)
 
 @router.post("/{skill_id}/reviews", response_model=SkillReview)
 async def create_review(
@@ -126,19 +316,12 @@ async def create_review(
         comment=review.comment
     )
     db.add(db_review)
-    db.flush()  # Flush to ensure the review is in the session
+    db.flush()
+    publish(db, "review.created", db_review.id, skill_id=skill_id, reviewer_id=current_user.id, rating=review.rating)
     
-    # Calculate updated rating and review count
-    all_reviews = db.query(SkillReviewModel).filter(SkillReviewModel.skill_id == skill_id).all()
-    new_rating = sum(r.rating for r in all_reviews) / len(all_reviews) if all_reviews else 0.0
-    new_review_count = len(all_reviews)
-    
-    # Use explicit UPDATE query to ensure the skill is updated in the database
-    db.execute(
-        update(SkillModel)
-        .where(SkillModel.id == skill_id)
-        .values(rating=new_rating, review_count=new_review_count)
-    )
+    # Rating, review count and ranking are rolled up in the background (inline
+    # without a job runner); the job also invalidates the cached skill
+    enqueue(db, recompute_skill_rating, skill_id=skill_id)
     
     db.commit()
     db.refresh(db_review)
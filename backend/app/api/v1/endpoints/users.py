@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session as SQLSession
 from app.core.database import get_db
 from app.models.user import User as UserModel
-from app.schemas.user import User, UserUpdate
+from app.schemas.user import User, UserUpdate, UserMatch
 from typing import List
 from app.core.auth import get_current_user as get_current_user_dep
+from app.core.outbox import publish
+from app.services import skill_cache
+from app.services.matching import find_matches, sync_user_tags
 
 router = APIRouter()
 
@@ -14,6 +17,16 @@ async def get_current_user(current_user: UserModel = Depends(get_current_user_de
     return current_user
 
 
+@router.get("/me/matches", response_model=List[UserMatch])
+async def get_matches(
+    limit: int = Query(20, ge=1, le=100),
+    db: SQLSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user_dep),
+):
+    """Teachers for what I want to learn and partners for a skill exchange, best first."""
+    return find_matches(db, current_user, limit)
+
+
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: int, db: SQLSession = Depends(get_db)):
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -35,9 +48,14 @@ async def update_user(
     update_data = user_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(user, field, value)
+    if "skills_to_teach" in update_data or "skills_to_learn" in update_data:
+        sync_user_tags(user)
+    publish(db, "user.updated", user.id, fields=sorted(update_data))
 
     db.commit()
     db.refresh(user)
+    # Skills embed their teacher's profile
+    skill_cache.invalidate_teacher(db, user.id)
     return user
 
 
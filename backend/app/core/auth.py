@@ -1,20 +1,22 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
+from app.core import batch
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.revocation import revocations
 from app.models.user import User as UserModel
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-    token = credentials.credentials
+def _user_from_token(token: str, db: Session) -> UserModel:
+    from jose import JWTError, jwt  # deferred: jose is slow to import
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str | None = payload.get("sub")
@@ -28,9 +30,46 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
+    # Answered from the in-memory snapshot for all but revoked tokens
+    jti = payload.get("jti")
+    if jti is not None and revocations.is_revoked(jti, db):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
 
     user = db.query(UserModel).filter(UserModel.email == email).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     return user
+
+
+def token_claims(token: str) -> Optional[dict]:
+    """The verified claims of an access token, or None if it is invalid or expired."""
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    return batch.shared_user(credentials.credentials) or _user_from_token(credentials.credentials, db)
+
+
+def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db),
+) -> Optional[UserModel]:
+    """The authenticated user, or None for anonymous callers and invalid tokens."""
+    if credentials is None:
+        return None
+    user = batch.shared_user(credentials.credentials)
+    if user is not None:
+        return user
+    try:
+        return _user_from_token(credentials.credentials, db)
+    except HTTPException:
+        return None
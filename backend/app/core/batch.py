@@ -0,0 +1,35 @@
+"""
+Request context shared by the sub-requests of `POST /batch`.
+
+The batch endpoint opens the database session and resolves the caller once;
+sub-requests dispatched through the app inherit both through contextvars, so
+get_db and the auth dependencies hand them out instead of opening another
+session and decoding the token again.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+_session: ContextVar = ContextVar("batch_session", default=None)
+_user: ContextVar[Optional[Tuple[str, object]]] = ContextVar("batch_user", default=None)
+
+
+def shared_session():
+    return _session.get()
+
+
+def shared_user(token: str):
+    """The batch's resolved user if `token` is the batch's own credentials."""
+    cached = _user.get()
+    return cached[1] if cached is not None and cached[0] == token else None
+
+
+@contextmanager
+def sharing(db, token: Optional[str] = None, user=None):
+    session_token = _session.set(db)
+    user_token = _user.set((token, user) if token and user is not None else None)
+    try:
+        yield
+    finally:
+        _user.reset(user_token)
+        _session.reset(session_token)
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class CacheBackend:
+    """Byte-value store with TTLs and monotonically increasing generation counters.
+
+    Generation counters are what make invalidation precise: cache keys embed
+    the current generation of what they depend on, and invalidating means
+    bumping the generation. Entries written by a request that raced with the
+    invalidation land under the old generation and are never read again.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def generation(self, name: str) -> int:
+        raise NotImplementedError
+
+    def bump(self, name: str) -> int:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Generations are never evicted: a reset counter could resurrect stale entries
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            value = self._generations.get(name, 0) + 1
+            self._generations[name] = value
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """Shared backend for multi-worker deployments (requires the `redis` package)."""
+
+    def __init__(self, url: str, prefix: str = "circleed:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def generation(self, name: str) -> int:
+        value = self.client.get(self.prefix + "gen:" + name)
+        return int(value) if value else 0
+
+    def bump(self, name: str) -> int:
+        return int(self.client.incr(self.prefix + "gen:" + name))
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+class TieredCache(CacheBackend):
+    """Local LRU in front of an optional shared backend.
+
+    Generations always come from the shared backend when there is one, so an
+    invalidation in one worker is seen by all of them; bodies are served from
+    the local tier when its copy is for the current generation.
+    """
+
+    def __init__(self, local: MemoryBackend, shared: Optional[CacheBackend] = None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def generation(self, name: str) -> int:
+        return (self.shared or self.local).generation(name)
+
+    def bump(self, name: str) -> int:
+        return (self.shared or self.local).bump(name)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def create_cache(url: str = "", max_entries: int = 1024) -> TieredCache:
+    """Build the cache from a CACHE_URL-style setting ("" for in-process only)."""
+    shared = RedisBackend(url) if url.startswith(("redis://", "rediss://")) else None
+    return TieredCache(MemoryBackend(max_entries), shared)
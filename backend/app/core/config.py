@@ -18,7 +18,15 @@ class Settings:
         raise RuntimeError("SECRET_KEY is not set")
 
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # bcrypt cost for new hashes; stored hashes with a lower cost are rehashed after login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+    # Refresh tokens renew access tokens without the password; a rotated token presented again
+    # after REFRESH_REUSE_GRACE seconds revokes its whole login
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    REFRESH_REUSE_GRACE: float = float(os.getenv("REFRESH_REUSE_GRACE", "10"))
+    # How often each worker reloads its in-memory snapshot of revoked access tokens (seconds)
+    REVOCATION_REFRESH_INTERVAL: float = float(os.getenv("REVOCATION_REFRESH_INTERVAL", "10"))
 
     CORS_ORIGINS: List[str] = [
         origin.strip()
@@ -30,7 +38,117 @@ class Settings:
 
     USE_MOCK_DB: bool = os.getenv("USE_MOCK_DB", "false").lower() == "true"
 
-    def __init__(self):
+    # Response compression (bodies smaller than the threshold are sent as-is)
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
+    # Skill catalog response cache; CACHE_URL=redis://... shares it between workers,
+    # otherwise each worker has its own and invalidations travel through the outbox
+    CACHE_URL: str = os.getenv("CACHE_URL", "")
+    SKILL_CACHE_TTL: float = float(os.getenv("SKILL_CACHE_TTL", "60"))
+    SKILL_CACHE_MAX_ENTRIES: int = int(os.getenv("SKILL_CACHE_MAX_ENTRIES", "1024"))
+    SKILL_CACHE_MAX_AGE: int = int(os.getenv("SKILL_CACHE_MAX_AGE", "30"))
+
+    # Skill availability: time slots in the JSON are start times in this zone
+    # unless an entry carries its own "timezone"; each slot lasts SLOT_MINUTES
+    AVAILABILITY_TIMEZONE: str = os.getenv("AVAILABILITY_TIMEZONE", "UTC")
+    AVAILABILITY_SLOT_MINUTES: int = int(os.getenv("AVAILABILITY_SLOT_MINUTES", "60"))
+
+    # Booking limits; the duration cap bounds the index range scanned for conflicts
+    MAX_SESSION_MINUTES: int = int(os.getenv("MAX_SESSION_MINUTES", "240"))
+    FREE_SLOTS_MAX_DAYS: int = int(os.getenv("FREE_SLOTS_MAX_DAYS", "31"))
+
+    # Users ranked by tag overlap before skill quality is considered in /users/me/matches
+    MATCH_CANDIDATE_POOL: int = int(os.getenv("MATCH_CANDIDATE_POOL", "500"))
+
+    # Catalog ranking (sort=top): completions within RANKING_RECENT_DAYS boost a skill;
+    # scores are fully recomputed every RANKING_REFRESH_INTERVAL seconds (0 disables)
+    RANKING_RECENT_DAYS: int = int(os.getenv("RANKING_RECENT_DAYS", "30"))
+    RANKING_REFRESH_INTERVAL: float = float(os.getenv("RANKING_REFRESH_INTERVAL", "3600"))
+    CATALOG_PAGE_MAX: int = int(os.getenv("CATALOG_PAGE_MAX", "100"))
+
+    # In-memory leaderboards are rebuilt from the database this often (seconds, 0 disables)
+    LEADERBOARD_RECONCILE_INTERVAL: float = float(os.getenv("LEADERBOARD_RECONCILE_INTERVAL", "300"))
+
+    # Background jobs: "queue:workers" pairs set per-queue concurrency
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+    JOB_QUEUES: str = os.getenv("JOB_QUEUES", "default:4")
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_BACKOFF_BASE: float = float(os.getenv("JOB_BACKOFF_BASE", "2"))
+    JOB_STALE_AFTER: int = int(os.getenv("JOB_STALE_AFTER", "300"))
+    # Done and failed jobs are deleted after this many days (0 keeps them)
+    JOB_RETENTION_DAYS: float = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+    # Domain events: each process tails outbox_events; history older than
+    # OUTBOX_RETENTION_DAYS is pruned (0 keeps it). OUTBOX_GAP_TIMEOUT is how long a
+    # gap in the ids is waited for (on PostgreSQL: before warning that it is still open)
+    OUTBOX_ENABLED: bool = os.getenv("OUTBOX_ENABLED", "true").lower() == "true"
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+    OUTBOX_GAP_TIMEOUT: float = float(os.getenv("OUTBOX_GAP_TIMEOUT", "5"))
+    OUTBOX_RETENTION_DAYS: float = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+    # Idempotency-Key replays for booking and messaging POSTs
+    IDEMPOTENCY_TTL: int = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "10"))
+    IDEMPOTENCY_LOCK_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+
+    # POST /batch limits: sub-requests per batch, wall time (seconds) and response size
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_TIMEOUT: float = float(os.getenv("BATCH_TIMEOUT", "10"))
+    BATCH_MAX_RESPONSE_BYTES: int = int(os.getenv("BATCH_MAX_RESPONSE_BYTES", "5000000"))
+
+    # Rate limits as "requests/seconds" token buckets (burst size / time to refill), empty or 0 turns
+    # a policy off; RATE_LIMIT_URL=redis://... shares buckets between workers
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_URL: str = os.getenv("RATE_LIMIT_URL", "")
+    RATE_LIMIT_LOGIN: str = os.getenv("RATE_LIMIT_LOGIN", "10/60")
+    RATE_LIMIT_SEARCH: str = os.getenv("RATE_LIMIT_SEARCH", "60/60")
+    RATE_LIMIT_MESSAGES: str = os.getenv("RATE_LIMIT_MESSAGES", "30/60")
+    RATE_LIMIT_DEFAULT: str = os.getenv("RATE_LIMIT_DEFAULT", "600/60")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Key anonymous callers by the last X-Forwarded-For hop (only behind a proxy that sets it)
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+    # Ledger reconciliation (balances vs. transactions) every LEDGER_RECONCILE_INTERVAL seconds
+    # (0 disables); LEDGER_AUTO_REPAIR="ledger" or "balance" also fixes what it finds
+    LEDGER_RECONCILE_INTERVAL: float = float(os.getenv("LEDGER_RECONCILE_INTERVAL", "86400"))
+    LEDGER_BATCH_SIZE: int = int(os.getenv("LEDGER_BATCH_SIZE", "10000"))
+    LEDGER_WORKERS: int = int(os.getenv("LEDGER_WORKERS", "4"))
+    LEDGER_AUTO_REPAIR: str = os.getenv("LEDGER_AUTO_REPAIR", "")
+
+    # Session sweeper every SESSION_SWEEP_INTERVAL seconds (0 disables): pending sessions are cancelled
+    # and refunded once their start has passed or after SESSION_PENDING_TTL_HOURS (0: start only);
+    # confirmed ones SESSION_COMPLETE_AFTER_HOURS past their start are "flag"ged or "complete"d ("" leaves them)
+    SESSION_SWEEP_INTERVAL: float = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+    SESSION_SWEEP_BATCH_SIZE: int = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500"))
+    SESSION_PENDING_TTL_HOURS: float = float(os.getenv("SESSION_PENDING_TTL_HOURS", "72"))
+    SESSION_PAST_CONFIRMED: str = os.getenv("SESSION_PAST_CONFIRMED", "flag")
+    SESSION_COMPLETE_AFTER_HOURS: float = float(os.getenv("SESSION_COMPLETE_AFTER_HOURS", "24"))
+    SESSION_SWEEP_DRY_RUN: bool = os.getenv("SESSION_SWEEP_DRY_RUN", "false").lower() == "true"
+
+    # GET /metrics needs "Authorization: Bearer METRICS_TOKEN"; without a token only loopback
+    # clients may scrape (set a token when a proxy on the same host forwards public traffic). With METRICS_DIR (gunicorn.conf.py sets one) the workers' metrics are
+    # merged through snapshot files each worker rewrites every METRICS_FLUSH_INTERVAL seconds
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+
+    # Opt-in request profiling (middleware is not installed unless enabled); X-Profile-Token
+    # headers are signed with PROFILING_SECRET, which must be set and differ from SECRET_KEY
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SECRET: str = os.getenv("PROFILING_SECRET", "")
+    if PROFILING_ENABLED and (not PROFILING_SECRET or PROFILING_SECRET == SECRET_KEY):
+        raise RuntimeError("PROFILING_ENABLED needs its own PROFILING_SECRET (not SECRET_KEY)")
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "./profiles")
+    PROFILING_MAX_FILES: int = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+    def log_configuration(self):
+        """Log the effective CORS setup; called at app startup rather than import."""
         logger.info(f"✅ CORS Origins configured: {self.CORS_ORIGINS if self.CORS_ORIGINS else 'ALLOWING ALL (*)'}")
         if not self.CORS_ORIGINS:
             logger.warning("⚠️  No CORS_ORIGINS set - allowing all origins for development")
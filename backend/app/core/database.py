@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from typing import Optional
+
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from app.core import batch
 from app.core.config import settings
 
 # For mock database, use SQLite
@@ -9,24 +12,61 @@ if settings.USE_MOCK_DB or "mock" in settings.DATABASE_URL.lower():
 else:
     SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-if "sqlite" in SQLALCHEMY_DATABASE_URL:
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, 
-        connect_args={"check_same_thread": False},
-        echo=False
-    )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+_engine: Optional[Engine] = None
+
+
+def get_engine() -> Engine:
+    """Create the engine on first use; importing the app stays cheap on cold starts."""
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+
+        if "sqlite" in SQLALCHEMY_DATABASE_URL:
+            _engine = create_engine(
+                SQLALCHEMY_DATABASE_URL,
+                connect_args={"check_same_thread": False},
+                echo=False
+            )
+        else:
+            _engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    return _engine
+
+
+def dispose_engine(close: bool = True):
+    """Drop pooled connections, e.g. in a freshly forked worker (close=False)."""
+    if _engine is not None:
+        _engine.dispose(close=close)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def __getattr__(name):
+    # Keeps `from app.core.database import engine` working without creating it at import time
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySession(Session):
+    """Session that binds to the lazily created engine when first used."""
+
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=LazySession)
 
 Base = declarative_base()
 
 def get_db():
     """Dependency for getting database session"""
+    shared = batch.shared_session()
+    if shared is not None:
+        # Inside POST /batch: the batch request owns (and closes) the session
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,156 @@
+"""
+Sparse fieldsets for list endpoints: `?fields=id,title,teacher.full_name`.
+
+parse_fields() validates the list against the endpoint's response schema.
+The resulting selection drives both ends of the response:
+
+* load_options() turns it into load_only() for the columns behind the
+  selected fields, plus an eager load (with its own load_only) for each
+  selected relationship, so unselected columns are never fetched;
+* projected() builds a pydantic model with only those fields, and a list
+  TypeAdapter for it, once per distinct selection.
+
+A bare relationship name ("teacher") selects the whole nested object. `id`
+is always included so clients can key the rows.
+"""
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+# Frozen so it can key the caches: ((field, nested selection or None), ...)
+Selection = FrozenSet[Tuple[str, Optional["Selection"]]]
+
+MAX_FIELDS = 64
+
+
+def _nested_schema(schema: Type[BaseModel], name: str) -> Optional[Type[BaseModel]]:
+    """The model inside Optional[Model] / List[Model] annotations, if any."""
+    annotation = schema.model_fields[name].annotation
+    candidates = [annotation, *get_args(annotation)]
+    for candidate in candidates:
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+        for inner in get_args(candidate):
+            if isinstance(inner, type) and issubclass(inner, BaseModel):
+                return inner
+    return None
+
+
+def parse_fields(spec: Optional[str], schema: Type[BaseModel]) -> Optional[Selection]:
+    """"id,title,teacher.full_name" -> Selection; None without a spec. Raises ValueError."""
+    if spec is None or not spec.strip():
+        return None
+    paths = [part.strip() for part in spec.split(",") if part.strip()]
+    if len(paths) > MAX_FIELDS:
+        raise ValueError(f"at most {MAX_FIELDS} fields")
+    tree: dict = {"id": None} if "id" in schema.model_fields else {}
+    for path in paths:
+        name, _, rest = path.partition(".")
+        if name not in schema.model_fields:
+            raise ValueError(f"unknown field {name!r}")
+        if not rest:
+            tree[name] = None
+            continue
+        nested = _nested_schema(schema, name)
+        if nested is None:
+            raise ValueError(f"{name!r} has no subfields")
+        if name in tree and tree[name] is None:
+            continue  # already selected whole
+        tree.setdefault(name, []).append(rest)
+    selection = []
+    for name, rests in tree.items():
+        if rests is None:
+            selection.append((name, None))
+        else:
+            selection.append((name, parse_fields(",".join(rests), _nested_schema(schema, name))))
+    return frozenset(selection)
+
+
+def fields_query(schema: Type[BaseModel]):
+    """Dependency parsing the `fields` query parameter against `schema` (400 on unknown fields)."""
+    async def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,teacher.full_name"),
+    ) -> Optional[Selection]:
+        try:
+            return parse_fields(fields, schema)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid fields: {e}")
+    return dependency
+
+
+def selection_key(selection: Optional[Selection]) -> str:
+    """Canonical text form, for cache keys."""
+    if selection is None:
+        return ""
+    parts = []
+    for name, nested in sorted(selection, key=lambda item: item[0]):
+        parts.append(f"{name}({selection_key(nested)})" if nested is not None else name)
+    return ",".join(parts)
+
+
+def _full_selection(schema: Type[BaseModel]) -> Selection:
+    return frozenset((name, None) for name in schema.model_fields)
+
+
+def _attribute(schema: Type[BaseModel], name: str) -> str:
+    alias = schema.model_fields[name].validation_alias
+    return alias if isinstance(alias, str) else name
+
+
+def load_options(model, schema: Type[BaseModel], selection: Selection, *always) -> list:
+    """Loader options fetching only what `selection` renders (plus primary keys and `always`)."""
+    mapper = inspect(model)
+    keys = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+    keys += [attribute.key for attribute in always]
+    options = []
+    for name, nested in selection:
+        attribute = _attribute(schema, name)
+        if attribute in mapper.column_attrs:
+            keys.append(attribute)
+        elif attribute in mapper.relationships:
+            relationship = mapper.relationships[attribute]
+            # The join needs this side's foreign keys
+            keys += [mapper.get_property_by_column(column).key for column in relationship.local_columns]
+            nested_schema = _nested_schema(schema, name)
+            loader = selectinload if relationship.uselist else joinedload
+            options.append(loader(getattr(model, attribute)).options(*load_options(
+                relationship.mapper.class_, nested_schema,
+                nested if nested is not None else _full_selection(nested_schema),
+            )))
+        # Anything else is computed by the endpoint and needs no column
+    return [load_only(*(getattr(model, key) for key in dict.fromkeys(keys))), *options]
+
+
+@lru_cache(maxsize=256)
+def projected(schema: Type[BaseModel], selection: Selection) -> Type[BaseModel]:
+    """`schema` cut down to the selected fields (nested models included)."""
+    selected = dict(selection)
+    definitions = {}
+    # Declaration order, so every process renders the same bytes (and ETags)
+    for name in (name for name in schema.model_fields if name in selected):
+        nested = selected[name]
+        field = schema.model_fields[name]
+        annotation = field.annotation
+        if nested is not None:
+            annotation = _replace(annotation, _nested_schema(schema, name), projected(_nested_schema(schema, name), nested))
+        definitions[name] = (annotation, field)
+    return create_model(f"{schema.__name__}Fields", __config__=schema.model_config, **definitions)
+
+
+@lru_cache(maxsize=256)
+def list_adapter(schema: Type[BaseModel], selection: Selection) -> TypeAdapter:
+    return TypeAdapter(List[projected(schema, selection)])
+
+
+def _replace(annotation, old: Type[BaseModel], new: Type[BaseModel]):
+    if annotation is old:
+        return new
+    origin = get_origin(annotation)
+    if origin is None:
+        return annotation
+    args = tuple(_replace(arg, old, new) for arg in get_args(annotation))
+    return Union[args] if origin is Union else origin[args]
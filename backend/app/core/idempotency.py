@@ -0,0 +1,321 @@
+"""
+Idempotency-Key support for POSTs that clients retry.
+
+A request to one of the IDEMPOTENT_ROUTES with an `Idempotency-Key` header
+runs once; repeats with the same key (from the same user, to the same
+path) get the first response back, marked `Idempotent-Replayed: true`,
+without reaching the endpoint. Responses are kept for IDEMPOTENCY_TTL
+seconds in an in-process LRU backed by the `idempotency_keys` table, so
+replays work across workers and restarts.
+
+The first request claims its key by inserting a pending row. Duplicates
+that arrive while it runs wait for it: in-process on an asyncio.Event, from
+other processes by polling the row, for up to IDEMPOTENCY_WAIT_TIMEOUT
+seconds before answering 409. A pending row older than
+IDEMPOTENCY_LOCK_TIMEOUT (its worker died) can be claimed again.
+
+Keys are scoped to the verified subject of the bearer token rather than the
+raw header, so a retry sent after the client refreshed its access token
+still replays. Requests without a valid token pass straight through (the
+endpoint answers 401), and 401 and 5xx responses are not stored, so a
+retry after a rejected token or a server error runs again.
+Reusing a key with a different body is rejected with 422.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.auth import token_claims
+from app.core.cache import MemoryBackend
+from app.core.database import SessionLocal
+from app.models.idempotency import IdempotencyKey as IdempotencyKeyModel
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+
+IDEMPOTENT_ROUTES = (
+    re.compile(r"^/api/v1/sessions/?$"),
+    re.compile(r"^/api/v1/chats/\d+/messages/?$"),
+)
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+def _encode(response: StoredResponse) -> bytes:
+    meta = json.dumps([response.fingerprint, response.status, response.headers])
+    return meta.encode("utf-8") + b"\n" + response.body
+
+
+def _decode(raw: bytes) -> StoredResponse:
+    meta, _, body = raw.partition(b"\n")
+    fingerprint, status, headers = json.loads(meta)
+    return StoredResponse(fingerprint, status, [tuple(pair) for pair in headers], body)
+
+
+class IdempotencyStore:
+    """Responses by key: LRU first, then the database."""
+
+    def __init__(self, ttl: float = 86400, max_entries: int = 10000, lock_timeout: float = 60,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.memory = MemoryBackend(max_entries)
+        self.session_factory = session_factory
+
+    def get_local(self, key: str) -> Optional[StoredResponse]:
+        raw = self.memory.get(key)
+        return _decode(raw) if raw is not None else None
+
+    def _remember(self, key: str, response: StoredResponse, expires_at: datetime):
+        ttl = (expires_at - datetime.utcnow()).total_seconds()
+        if ttl > 0:
+            self.memory.set(key, _encode(response), ttl)
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        """("claimed", None), ("done", response) or ("busy", None) if another request holds the key."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            db.add(IdempotencyKeyModel(
+                key=key, fingerprint=fingerprint, created_at=now, expires_at=now + timedelta(seconds=self.ttl)
+            ))
+            try:
+                db.commit()
+                return "claimed", None
+            except IntegrityError:
+                db.rollback()
+
+            row = db.get(IdempotencyKeyModel, key)
+            if row is None:
+                return "busy", None  # pruned in between; the next attempt inserts again
+            if row.status_code is not None and row.expires_at > now:
+                response = StoredResponse(row.fingerprint, row.status_code, [tuple(h) for h in row.headers or []], row.body or b"")
+                self._remember(key, response, row.expires_at)
+                return "done", response
+            stale = row.expires_at <= now or row.created_at < now - timedelta(seconds=self.lock_timeout)
+            if not stale:
+                return "busy", None
+            # Expired response or abandoned claim: take it over, unless someone else just did
+            taken = db.execute(
+                update(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.key == key, IdempotencyKeyModel.created_at == row.created_at)
+                .values(
+                    fingerprint=fingerprint, status_code=None, headers=None, body=None,
+                    created_at=now, expires_at=now + timedelta(seconds=self.ttl),
+                )
+            ).rowcount
+            db.commit()
+            return ("claimed", None) if taken else ("busy", None)
+        finally:
+            db.close()
+
+    def save(self, key: str, response: StoredResponse):
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.key == key)
+                .values(
+                    status_code=response.status, headers=response.headers, body=response.body, expires_at=expires_at
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        self._remember(key, response, expires_at)
+
+    def release(self, key: str):
+        """Drop a claim whose request failed, so a retry runs again."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.key == key, IdempotencyKeyModel.status_code.is_(None))
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+def prune_expired() -> int:
+    db = SessionLocal()
+    try:
+        count = db.execute(
+            delete(IdempotencyKeyModel).where(IdempotencyKeyModel.expires_at < datetime.utcnow())
+        ).rowcount
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def _subject(headers: dict) -> Optional[str]:
+    """The verified subject of the request's bearer token, or None."""
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    claims = token_claims(token.strip())
+    return claims.get("sub") if claims else None
+
+
+async def _send_json(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Run a keyed POST once and replay its response to retries."""
+
+    def __init__(self, app, store: IdempotencyStore, wait_timeout: float = 10,
+                 routes: Sequence[Pattern] = IDEMPOTENT_ROUTES):
+        self.app = app
+        self.store = store
+        self.wait_timeout = wait_timeout
+        self.routes = routes
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not any(
+            route.match(scope["path"]) for route in self.routes
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        if IDEMPOTENCY_HEADER not in headers:
+            await self.app(scope, receive, send)
+            return
+        client_key = headers[IDEMPOTENCY_HEADER].decode("latin-1").strip()
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        subject = _subject(headers)
+        if subject is None:
+            # Not signed in: the endpoint rejects it without side effects
+            await self.app(scope, receive, send)
+            return
+        # Keys are per user, not per token: the same key from two users names two
+        # requests, and a retry with a refreshed token names the same one
+        key = hashlib.sha256(
+            b"\0".join([subject.encode("utf-8"), scope["path"].encode("utf-8"), client_key.encode("latin-1")])
+        ).hexdigest()
+        body, receive = await self._buffer_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while True:
+            stored = self.store.get_local(key)
+            if stored is not None:
+                await self._replay(stored, fingerprint, send)
+                return
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                try:
+                    await asyncio.wait_for(inflight.wait(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+                    return
+                continue
+
+            done = self._inflight[key] = asyncio.Event()
+            try:
+                state, stored = await asyncio.to_thread(self.store.claim, key, fingerprint)
+                if state == "claimed":
+                    await self._run(key, fingerprint, scope, receive, send)
+                    return
+            finally:
+                del self._inflight[key]
+                done.set()
+            if state == "done":
+                await self._replay(stored, fingerprint, send)
+                return
+            # Held by another process
+            if loop.time() >= deadline:
+                await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+                return
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def _buffer_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay_receive
+
+    async def _replay(self, stored: StoredResponse, fingerprint: str, send):
+        if stored.fingerprint != fingerprint:
+            await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            return
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+        await send({"type": "http.response.start", "status": stored.status, "headers": headers + [(REPLAYED_HEADER, b"true")]})
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _run(self, key: str, fingerprint: str, scope, receive, send):
+        status = 500
+        headers: List[Tuple[str, str]] = []
+        chunks = []
+
+        async def capture(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await asyncio.to_thread(self.store.release, key)
+            raise
+        try:
+            if status >= 500 or status == 401:
+                # Not a result of the request: the token was revoked, or the server failed
+                await asyncio.to_thread(self.store.release, key)
+            else:
+                response = StoredResponse(fingerprint, status, headers, b"".join(chunks))
+                await asyncio.to_thread(self.store.save, key, response)
+        except Exception as e:
+            # The request itself went through; its claim lapses after lock_timeout
+            logger.warning(f"Could not store idempotent response: {e}")
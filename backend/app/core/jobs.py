@@ -0,0 +1,351 @@
+"""
+Persistent background jobs.
+
+Side effects that do not have to finish inside the request are registered
+as handlers and enqueued as rows of the `jobs` table, in the same database
+transaction as the write that caused them:
+
+    @job("skills.recompute_rating")
+    def recompute_skill_rating(db, skill_id: int): ...
+
+    enqueue(db, "skills.recompute_rating", skill_id=skill.id)
+    db.commit()
+
+A process without a JobRunner (JOBS_ENABLED=false, CLI scripts, a
+serverless deploy with no lifespan) runs the handler inline instead, in the
+caller's transaction, so the side effect is never left waiting for a runner
+that does not exist.
+
+Each process runs a JobRunner from the app lifespan: an asyncio worker pool
+with a fixed number of workers per queue (JOB_QUEUES). Workers claim due
+jobs with a conditional UPDATE (plus SKIP LOCKED on PostgreSQL), so several
+processes can share the table. A handler's writes and its job's "done" mark
+commit together; failures are retried with exponential backoff until
+max_attempts, then marked "failed". Jobs left "running" by a crashed
+process are requeued after JOB_STALE_AFTER seconds, and finished ones are
+pruned after JOB_RETENTION_DAYS.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional, Union
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import Job as JobModel
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+class Handler(NamedTuple):
+    func: Callable
+    queue: str
+    max_attempts: int
+
+
+HANDLERS: Dict[str, Handler] = {}
+
+jobs_enqueued = metrics.counter("jobs_enqueued_total", "Jobs enqueued")
+jobs_processed = metrics.counter("jobs_processed_total", "Job attempts by outcome (done, retry, failed)")
+job_wait = metrics.histogram("job_wait_seconds", "Time from a job becoming due to a worker starting it")
+job_run = metrics.histogram("job_run_seconds", "Job handler run time")
+queue_depth = metrics.gauge("jobs_queue_depth", "Queued and running jobs", per_process=False)
+
+
+def job(name: str, queue: str = "default", max_attempts: Optional[int] = None):
+    """Register a handler `func(db, **payload)`; it must not commit, the runner does."""
+    def decorator(func: Callable) -> Callable:
+        HANDLERS[name] = Handler(func, queue, max_attempts or settings.JOB_MAX_ATTEMPTS)
+        func.job_name = name
+        return func
+    return decorator
+
+
+def after_commit(db: SQLSession, callback: Callable[[], None]):
+    """Run callback once the session's current transaction commits (dropped on rollback)."""
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(SQLSession, "after_commit")
+def _run_after_commit(session: SQLSession):
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("after_commit callback failed")
+
+
+@event.listens_for(SQLSession, "after_rollback")
+def _drop_after_commit(session: SQLSession):
+    session.info.pop("after_commit", None)
+
+
+def enqueue(db: SQLSession, handler: Union[str, Callable], delay: float = 0, **payload) -> Optional[JobModel]:
+    """Add a job to the session; it becomes visible to workers when the caller commits.
+
+    Without a runner in this process the handler runs right away in `db`
+    instead (ignoring `delay`) and commits with the caller; None is returned.
+    """
+    name = handler if isinstance(handler, str) else handler.job_name
+    if name not in HANDLERS:
+        raise ValueError(f"Unknown job {name!r}")
+    spec = HANDLERS[name]
+    if _runner is None:
+        db.flush()  # the handler reads what the caller has written so far
+        spec.func(db, **payload)
+        return None
+    job_row = JobModel(
+        queue=spec.queue,
+        name=name,
+        payload=payload,
+        max_attempts=spec.max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.add(job_row)
+
+    def committed():
+        jobs_enqueued.inc(queue=spec.queue, name=name)
+        wake(spec.queue)
+
+    after_commit(db, committed)
+    return job_row
+
+
+def backoff(attempts: int) -> float:
+    delay = settings.JOB_BACKOFF_BASE * 2 ** max(attempts - 1, 0)
+    return min(delay * random.uniform(1.0, 1.25), MAX_BACKOFF_SECONDS)
+
+
+def claim(queue: str) -> Optional[int]:
+    """Mark the oldest due job of a queue as running and return its id."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        query = (
+            select(JobModel.id)
+            .where(JobModel.status == "queued", JobModel.queue == queue, JobModel.run_at <= now)
+            .order_by(JobModel.run_at, JobModel.id)
+            .limit(1)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        job_id = db.execute(query).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        # Conditional so two processes can never both claim it
+        claimed = db.execute(
+            update(JobModel)
+            .where(JobModel.id == job_id, JobModel.status == "queued")
+            .values(status="running", attempts=JobModel.attempts + 1, started_at=now)
+        ).rowcount
+        db.commit()
+        return job_id if claimed else None
+    finally:
+        db.close()
+
+
+def execute(job_id: int) -> str:
+    """Run a claimed job; returns the outcome (done, retry or failed)."""
+    db = SessionLocal()
+    try:
+        job_row = db.get(JobModel, job_id)
+        name, queue = job_row.name, job_row.queue
+        job_wait.observe(max((job_row.started_at - job_row.run_at).total_seconds(), 0.0), queue=queue)
+        handler = HANDLERS.get(name)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for {name!r}")
+            handler.func(db, **(job_row.payload or {}))
+            job_row.status = "done"
+            job_row.finished_at = datetime.utcnow()
+            job_row.last_error = None
+            db.commit()
+            outcome = "done"
+        except Exception as e:
+            db.rollback()
+            job_row = db.get(JobModel, job_id)
+            job_row.last_error = f"{type(e).__name__}: {e}"[:2000]
+            if handler is None or job_row.attempts >= job_row.max_attempts:
+                job_row.status = "failed"
+                job_row.finished_at = datetime.utcnow()
+                outcome = "failed"
+            else:
+                job_row.status = "queued"
+                job_row.run_at = datetime.utcnow() + timedelta(seconds=backoff(job_row.attempts))
+                outcome = "retry"
+            db.commit()
+            logger.warning(f"Job {job_id} ({name}) attempt {job_row.attempts} -> {outcome}: {job_row.last_error}")
+        job_run.observe(time.perf_counter() - started, queue=queue, name=name)
+        jobs_processed.inc(queue=queue, name=name, outcome=outcome)
+        return outcome
+    finally:
+        db.close()
+
+
+def requeue_stale(older_than: float) -> int:
+    """Put jobs whose worker died mid-run back in their queue."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+        count = db.execute(
+            update(JobModel)
+            .where(JobModel.status == "running", JobModel.started_at < cutoff)
+            .values(status="queued", run_at=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        if count:
+            logger.warning(f"Requeued {count} stale jobs")
+        return count
+    finally:
+        db.close()
+
+
+def prune(older_than_days: float) -> int:
+    """Delete done and failed jobs that finished more than `older_than_days` ago."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        count = db.execute(
+            delete(JobModel).where(JobModel.status.in_(("done", "failed")), JobModel.finished_at < cutoff)
+        ).rowcount
+        db.commit()
+        if count:
+            logger.info(f"Pruned {count} finished jobs")
+        return count
+    finally:
+        db.close()
+
+
+def run_due_jobs(queue: str = "default", limit: Optional[int] = None) -> int:
+    """Synchronously drain due jobs of a queue (scripts and maintenance)."""
+    processed = 0
+    while limit is None or processed < limit:
+        job_id = claim(queue)
+        if job_id is None:
+            break
+        execute(job_id)
+        processed += 1
+    return processed
+
+
+def _collect_queue_depth():
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(JobModel.queue, JobModel.status, func.count(JobModel.id))
+            .filter(JobModel.status.in_(("queued", "running")))
+            .group_by(JobModel.queue, JobModel.status)
+            .all()
+        )
+    finally:
+        db.close()
+    for queue in set(q for q, _, _ in rows) | {h.queue for h in HANDLERS.values()}:
+        for status in ("queued", "running"):
+            queue_depth.set(0, queue=queue, status=status)
+    for queue, status, count in rows:
+        queue_depth.set(count, queue=queue, status=status)
+
+
+metrics.register_collector(_collect_queue_depth)
+
+
+def parse_queues(spec: str) -> Dict[str, int]:
+    """"default:4,email:1" -> {"default": 4, "email": 1}."""
+    queues = {}
+    for part in spec.split(","):
+        name, _, workers = part.strip().partition(":")
+        if name:
+            queues[name] = max(int(workers or 1), 1)
+    return queues
+
+
+class JobRunner:
+    """Asyncio worker pool; handlers run in threads so the event loop stays free."""
+
+    def __init__(self, concurrency: Dict[str, int], poll_interval: float = 1.0,
+                 stale_after: float = 300, shutdown_timeout: float = 10):
+        # Queues with handlers but no configured concurrency get one worker
+        self.concurrency = {**{h.queue: 1 for h in HANDLERS.values()}, **concurrency}
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.shutdown_timeout = shutdown_timeout
+        self._events: Dict[str, asyncio.Event] = {}
+        self._tasks = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def start(self):
+        global _runner
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        for queue, workers in self.concurrency.items():
+            self._events[queue] = asyncio.Event()
+            self._tasks += [asyncio.create_task(self._worker(queue)) for _ in range(workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+        _runner = self
+        logger.info(f"Job runner started: {self.concurrency}")
+
+    async def stop(self):
+        """Let in-flight jobs finish (up to shutdown_timeout), then cancel the workers."""
+        global _runner
+        _runner = None
+        self._stopping = True
+        self._stopped.set()
+        for queue_event in self._events.values():
+            queue_event.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=self.shutdown_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def wake(self, queue: str):
+        queue_event = self._events.get(queue)
+        if queue_event is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(queue_event.set)
+
+    async def _worker(self, queue: str):
+        queue_event = self._events[queue]
+        while not self._stopping:
+            try:
+                job_id = await asyncio.to_thread(claim, queue)
+                if job_id is not None:
+                    await asyncio.to_thread(execute, job_id)
+                    continue
+            except Exception:
+                logger.exception(f"Job worker for queue {queue!r} failed")
+            try:
+                await asyncio.wait_for(queue_event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            queue_event.clear()
+
+    async def _reaper(self):
+        while not self._stopping:
+            try:
+                await asyncio.to_thread(requeue_stale, self.stale_after)
+            except Exception:
+                logger.exception("Requeueing stale jobs failed")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.stale_after / 2)
+            except asyncio.TimeoutError:
+                pass
+
+
+_runner: Optional[JobRunner] = None
+
+
+def wake(queue: str):
+    """Nudge this process's idle workers for a queue (no-op without a runner)."""
+    if _runner is not None:
+        _runner.wake(queue)
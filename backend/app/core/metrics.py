@@ -0,0 +1,307 @@
+"""Minimal in-process metrics in the Prometheus text format.
+
+    from app.core import metrics
+    metrics.counter("jobs_total", "Jobs finished").inc(queue="default", outcome="done")
+    metrics.histogram("job_run_seconds", "Job run time").observe(0.12, queue="default")
+
+Values are kept per process; `GET /metrics` renders everything registered
+here plus the gauges computed at scrape time by registered collectors.
+
+Under gunicorn each scrape lands on one worker, so with a metrics directory
+configured (METRICS_DIR, set by gunicorn.conf.py) every process writes a
+snapshot of its metrics there, on every scrape it answers and every
+METRICS_FLUSH_INTERVAL seconds, and the scrape merges them: counters and
+histograms are summed over all processes, including exited ones, so they
+never go backwards when a worker is recycled; per-process gauges get a
+`pid` label and are reported for live processes only; cluster gauges
+(computed from the database) report the most recently set value.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def dump(self) -> list:
+        """This process's values, as stored in its snapshot file."""
+        raise NotImplementedError
+
+    def merged_samples(self, snapshots: List[Tuple[int, bool, list]]) -> List[str]:
+        """Samples from (pid, alive, dump) of every process."""
+        raise NotImplementedError
+
+    def render(self, snapshots: Optional[List[Tuple[int, bool, list]]] = None) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        samples = self.samples() if snapshots is None else self.merged_samples(snapshots)
+        return "\n".join(lines + samples)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        super().__init__(name, description)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in items]
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merged_samples(self, snapshots):
+        totals: Dict[LabelKey, float] = {}
+        for _, _, rows in snapshots:
+            for key, value in rows:
+                key = tuple(tuple(pair) for pair in key)
+                totals[key] = totals.get(key, 0.0) + value
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in totals.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, per_process: bool = True):
+        super().__init__(name, description)
+        self.per_process = per_process
+        self._updated: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        super().inc(amount, **labels)
+        self._updated[_key(labels)] = time.time()
+
+    def set(self, value: float, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = value
+            self._updated[key] = time.time()
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), value, self._updated.get(key, 0.0)] for key, value in self._values.items()]
+
+    def merged_samples(self, snapshots):
+        if self.per_process:
+            return [
+                f"{self.name}{_format_labels(tuple(tuple(pair) for pair in key), [('pid', str(pid))])} {value}"
+                for pid, alive, rows in snapshots if alive
+                for key, value, _ in rows
+            ]
+        latest: Dict[LabelKey, Tuple[float, float]] = {}
+        for _, _, rows in snapshots:
+            for key, value, updated in rows:
+                key = tuple(tuple(pair) for pair in key)
+                if key not in latest or updated > latest[key][1]:
+                    latest[key] = (value, updated)
+        return [f"{self.name}{_format_labels(key)} {value}" for key, (value, _) in latest.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, count, sum)
+        self._values: Dict[LabelKey, Tuple[List[int], int, float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        with self._lock:
+            counts, count, total = self._values.get(key) or ([0] * len(self.buckets), 0, 0.0)
+            index = bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, count + 1, total + value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), count, total) for key, (counts, count, total) in self._values.items()]
+        return self._lines(items)
+
+    def _lines(self, items) -> List[str]:
+        lines = []
+        for key, counts, count, total in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+        return lines
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), list(counts), count, total] for key, (counts, count, total) in self._values.items()]
+
+    def merged_samples(self, snapshots):
+        merged: Dict[LabelKey, Tuple[List[int], int, float]] = {}
+        for _, _, rows in snapshots:
+            for key, counts, count, total in rows:
+                key = tuple(tuple(pair) for pair in key)
+                if len(counts) != len(self.buckets):
+                    continue  # written with other buckets by an older release
+                old_counts, old_count, old_total = merged.get(key) or ([0] * len(self.buckets), 0, 0.0)
+                merged[key] = ([a + b for a, b in zip(old_counts, counts)], old_count + count, old_total + total)
+        return self._lines([(key, counts, count, total) for key, (counts, count, total) in merged.items()])
+
+
+_registry: Dict[str, Metric] = {}
+_collectors: List[Callable[[], None]] = []
+_process_collectors: List[Callable[[], None]] = []
+_registry_lock = threading.Lock()
+_directory: Optional[str] = None
+_snapshot_name: Optional[Tuple[int, str]] = None  # (pid, file name) of this process
+
+
+def _get_or_create(cls, name: str, description: str, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, description, **kwargs)
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name: str, description: str, per_process: bool = True) -> Gauge:
+    """A gauge; per_process=False for values that describe the whole deployment, e.g. from a query."""
+    return _get_or_create(Gauge, name, description, per_process=per_process)
+
+
+def histogram(name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, description, buckets=buckets)
+
+
+def register_collector(collect: Callable[[], None], per_process: bool = False):
+    """Run `collect` before every scrape, e.g. to set gauges from a query.
+
+    per_process collectors (cheap, reading this process's state) also run
+    before every snapshot, so each worker's values stay current.
+    """
+    (_process_collectors if per_process else _collectors).append(collect)
+
+
+def _run(collectors: List[Callable[[], None]]):
+    for collect in list(collectors):
+        try:
+            collect()
+        except Exception as e:
+            # A failing collector leaves its gauges at their last values
+            logger.warning(f"Metrics collector {collect.__name__} failed: {e}")
+
+
+def configure(directory: str):
+    """Share metrics between the processes that use `directory` (empty: this process only)."""
+    global _directory
+    _directory = directory or None
+
+
+def flush():
+    """Write this process's snapshot to the metrics directory (no-op without one)."""
+    global _snapshot_name
+    if _directory is None:
+        return
+    _run(_process_collectors)
+    pid = os.getpid()
+    if _snapshot_name is None or _snapshot_name[0] != pid:
+        # Named per process start, so a reused pid never overwrites an exited worker's counters
+        _snapshot_name = (pid, f"{pid}-{time.time_ns()}.json")
+    with _registry_lock:
+        metrics = list(_registry.values())
+    data = json.dumps({metric.name: metric.dump() for metric in metrics})
+    os.makedirs(_directory, exist_ok=True)  # gunicorn empties it after the app is preloaded
+    path = os.path.join(_directory, _snapshot_name[1])
+    with open(path + ".tmp", "w") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _snapshots() -> Dict[str, List[Tuple[int, bool, list]]]:
+    """name -> [(pid, alive, dump)] from every snapshot in the metrics directory."""
+    merged: Dict[str, List[Tuple[int, bool, list]]] = {}
+    for filename in sorted(os.listdir(_directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            pid = int(filename.split("-", 1)[0])
+            with open(os.path.join(_directory, filename)) as f:
+                data = json.load(f)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Skipping metrics snapshot {filename}: {e}")
+            continue
+        alive = _alive(pid)
+        for name, rows in data.items():
+            merged.setdefault(name, []).append((pid, alive, rows))
+    return merged
+
+
+def render() -> str:
+    _run(_collectors)
+    with _registry_lock:
+        metrics = list(_registry.values())
+    if _directory is None:
+        _run(_process_collectors)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+    flush()
+    snapshots = _snapshots()
+    return "\n".join(metric.render(snapshots.get(metric.name, [])) for metric in metrics) + "\n"
@@ -0,0 +1,275 @@
+"""
+Transactional outbox for domain events.
+
+Write paths record what changed as rows of `outbox_events`, in the same
+database transaction as the change, so an event exists exactly when the
+change committed:
+
+    publish(db, "session.completed", session.id, teacher_id=..., tokens=...)
+    db.commit()
+
+Each process runs an OutboxDispatcher from the app lifespan. It tails the
+table in id order, OUTBOX_BATCH_SIZE rows per read, and hands every event
+to the consumers subscribed to its topic:
+
+    @consumer("leaderboards", "session.completed")
+    def apply_event(event: Event): ...
+
+Delivery is in order and at least once per consumer: a consumer's position
+only moves past an event after its handler returned, and a failing handler
+is retried with backoff from the same event. Consumers maintain derived
+in-process state (leaderboards, caches), so positions live in memory and
+start at the end of the table; state from before startup comes from the
+consumer's own rebuild. Handlers should tolerate seeing an event twice.
+
+Ids are allocated at insert but become visible at commit, so a slow
+transaction can commit a lower id after a higher one was read. The
+dispatcher stops at a gap in the ids. On PostgreSQL it notes the snapshot's
+xmax when the gap appears and skips the gap once pg_snapshot_xmin has moved
+past it: every transaction that could still fill it has then ended, so the
+insert was rolled back. Other databases commit one writer at a time, and a
+gap is skipped after it has stayed open for OUTBOX_GAP_TIMEOUT seconds.
+Skipped gaps are counted in outbox_gaps_skipped_total.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, text
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core import metrics
+from app.core.database import SessionLocal
+from app.core.jobs import after_commit
+from app.models.outbox import OutboxEvent as OutboxEventModel
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_SECONDS = 60
+
+events_delivered = metrics.counter("outbox_events_delivered_total", "Outbox events handled by a consumer")
+consumer_failures = metrics.counter("outbox_consumer_failures_total", "Outbox consumer handler errors")
+gaps_skipped = metrics.counter(
+    "outbox_gaps_skipped_total", "Runs of missing outbox ids given up on, by how the gap was judged final"
+)
+consumer_lag = metrics.gauge("outbox_consumer_lag", "Events read by the dispatcher but not yet handled by a consumer")
+
+
+class Event(NamedTuple):
+    id: int
+    topic: str
+    key: Optional[str]
+    payload: dict
+    created_at: datetime
+
+
+class Consumer:
+    def __init__(self, name: str, topics: FrozenSet[str], func: Callable[[Event], None]):
+        self.name = name
+        self.topics = topics  # empty: every topic
+        self.func = func
+        self.position = 0  # id of the last event handled (or skipped as not subscribed)
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def wants(self, topic: str) -> bool:
+        return not self.topics or topic in self.topics
+
+    def deliver(self, events: List[Event]):
+        if time.monotonic() < self.retry_at:
+            return
+        for event in events:
+            if event.id <= self.position:
+                continue
+            if self.wants(event.topic):
+                try:
+                    self.func(event)
+                except Exception:
+                    self.failures += 1
+                    self.retry_at = time.monotonic() + min(2 ** self.failures, MAX_RETRY_SECONDS)
+                    consumer_failures.inc(consumer=self.name)
+                    logger.exception(f"Outbox consumer {self.name!r} failed on event {event.id} ({event.topic})")
+                    return
+                events_delivered.inc(consumer=self.name)
+            self.position = event.id
+        self.failures = 0
+
+
+CONSUMERS: Dict[str, Consumer] = {}
+
+
+def consumer(name: str, *topics: str):
+    """Register `func(event)` for the given topics (all topics if none)."""
+    def decorator(func: Callable[[Event], None]) -> Callable[[Event], None]:
+        CONSUMERS[name] = Consumer(name, frozenset(topics), func)
+        return func
+    return decorator
+
+
+def publish(db: SQLSession, topic: str, key=None, **payload) -> OutboxEventModel:
+    """Add an event to the session; it is written and delivered only if the caller commits."""
+    payload = {name: value.isoformat() if isinstance(value, datetime) else value for name, value in payload.items()}
+    event = OutboxEventModel(topic=topic, key=None if key is None else str(key), payload=payload)
+    db.add(event)
+    after_commit(db, wake)
+    return event
+
+
+def last_event_id() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(func.max(OutboxEventModel.id)).scalar() or 0
+    finally:
+        db.close()
+
+
+def prune(older_than_days: float) -> int:
+    """Delete delivered history; consumers only ever read recent events."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        count = db.execute(delete(OutboxEventModel).where(OutboxEventModel.created_at < cutoff)).rowcount
+        db.commit()
+        if count:
+            logger.info(f"Pruned {count} outbox events")
+        return count
+    finally:
+        db.close()
+
+
+class OutboxDispatcher:
+    """Tails outbox_events and delivers them to this process's consumers."""
+
+    def __init__(self, poll_interval: float = 1.0, batch_size: int = 500, gap_timeout: float = 5.0,
+                 shutdown_timeout: float = 10):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.settled = 0  # every id up to here is either visible or gone for good
+        # (first missing id, first seen, PostgreSQL snapshot xmax then or None, stall reported)
+        self._gap: Optional[Tuple[int, float, Optional[int], bool]] = None
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start_at(self, position: int):
+        self.settled = position
+        for registered in CONSUMERS.values():
+            registered.position = max(registered.position, position)
+
+    def _fetch(self, after: int) -> List[Event]:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(OutboxEventModel)
+                .filter(OutboxEventModel.id > after)
+                .order_by(OutboxEventModel.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            return [Event(row.id, row.topic, row.key, row.payload or {}, row.created_at) for row in rows]
+        finally:
+            db.close()
+
+    def _snapshot_bound(self, bound: str) -> Optional[int]:
+        """pg_snapshot_xmin/xmax of a fresh snapshot, or None on other databases."""
+        db = SessionLocal()
+        try:
+            if db.get_bind().dialect.name != "postgresql":
+                return None
+            return int(db.execute(text(f"SELECT pg_snapshot_{bound}(pg_current_snapshot())::text")).scalar())
+        finally:
+            db.close()
+
+    def _settle(self, events: List[Event]) -> List[Event]:
+        """Drop events after a gap that may still be filled by an open transaction."""
+        for index, event in enumerate(events):
+            if event.id <= self.settled or event.id == self.settled + 1:
+                self.settled = max(self.settled, event.id)
+                continue
+            missing = self.settled + 1
+            if self._gap is None or self._gap[0] != missing:
+                # Every transaction that allocated a missing id has an xid below this xmax
+                self._gap = (missing, time.monotonic(), self._snapshot_bound("xmax"), False)
+            _, seen, horizon, reported = self._gap
+            waited = time.monotonic() - seen
+            if horizon is not None:
+                if self._snapshot_bound("xmin") < horizon:
+                    if waited >= self.gap_timeout and not reported:
+                        logger.warning(f"Outbox delivery has waited {waited:.0f}s for ids {missing}..{event.id - 1}: "
+                                       f"a transaction that may still commit them is open")
+                        self._gap = (missing, seen, horizon, True)
+                    return events[:index]
+                gaps_skipped.inc(reason="rolled_back")
+                logger.info(f"Skipping outbox ids {missing}..{event.id - 1} (rolled back)")
+            else:
+                if waited < self.gap_timeout:
+                    return events[:index]
+                gaps_skipped.inc(reason="timeout")
+                logger.warning(f"Skipping outbox ids {missing}..{event.id - 1}, missing for {waited:.0f}s; "
+                               f"events committed later with these ids will not be delivered")
+            self.settled = event.id
+        self._gap = None
+        return events
+
+    def poll(self) -> bool:
+        """Read and deliver one batch; True if a full batch was read and more may be waiting."""
+        consumers = list(CONSUMERS.values())
+        if not consumers:
+            return False
+        events = self._fetch(min(c.position for c in consumers))
+        full = len(events) == self.batch_size
+        events = self._settle(events)
+        for registered in consumers:
+            registered.deliver(events)
+            consumer_lag.set(max(self.settled - registered.position, 0), consumer=registered.name)
+        return full and self._gap is None
+
+    async def start(self):
+        global _dispatcher
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self.start_at(await asyncio.to_thread(last_event_id))
+        self._task = asyncio.create_task(self._run())
+        _dispatcher = self
+        logger.info(f"Outbox dispatcher started at event {self.settled}: {sorted(CONSUMERS)}")
+
+    async def stop(self):
+        global _dispatcher
+        _dispatcher = None
+        self._stopping = True
+        self._event.set()
+        try:
+            await asyncio.wait_for(self._task, self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                if await asyncio.to_thread(self.poll):
+                    continue
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+            try:
+                await asyncio.wait_for(self._event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._event.clear()
+
+
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def wake():
+    """Deliver this process's new events without waiting for the next poll."""
+    if _dispatcher is not None:
+        _dispatcher.wake()
@@ -0,0 +1,42 @@
+import base64
+import json
+from typing import Any, List
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor for the last row of a page."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# What JSON gives back for a column's Python type; bool never passes for a number
+_JSON_TYPES = {float: (int, float), int: (int,), str: (str,)}
+
+
+def _is_a(value: Any, kind) -> bool:
+    kinds = kind if isinstance(kind, tuple) else (kind,)
+    if value is None:
+        return None in kinds
+    if isinstance(value, bool):
+        return bool in kinds
+    return any(isinstance(value, _JSON_TYPES.get(k, (k,))) for k in kinds if k is not None)
+
+
+def decode_cursor(cursor: str, *types) -> List[Any]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed.
+
+    `types` has one entry per value: a type, or a tuple of them where None
+    allows null. A cursor whose values do not match is malformed too, so it
+    never reaches the database as a comparison it cannot make.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("malformed cursor") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("malformed cursor")
+    if not all(_is_a(value, kind) for value, kind in zip(values, types)):
+        raise ValueError("malformed cursor")
+    return values
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Leadership:
+    """Elects the one process that runs the cluster-wide periodic jobs.
+
+    On PostgreSQL the first process to take a session-level advisory lock
+    leads and keeps it, on a dedicated connection, for as long as it lives;
+    the others try again before each run, so one of them takes over when the
+    leader exits. Other databases are single-host setups where every process
+    leads.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = int.from_bytes(hashlib.sha256(name.encode("utf-8")).digest()[:8], "big", signed=True)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """True if this process leads (taking the lock if it is free)."""
+        from sqlalchemy import text
+        from app.core.database import get_engine
+
+        with self._lock:
+            engine = get_engine()
+            if engine.dialect.name != "postgresql":
+                return True
+            if self._conn is not None:
+                try:
+                    self._conn.execute(text("SELECT 1"))
+                    return True
+                except Exception:
+                    # The connection, and the lock with it, is gone
+                    logger.warning(f"Lost the {self.name!r} lock; electing again")
+                    self._conn.invalidate()
+                    self._conn = None
+            # Autocommit, so the held connection does not sit idle in a transaction
+            conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            try:
+                taken = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            except Exception:
+                conn.close()
+                raise
+            if not taken:
+                conn.close()
+                return False
+            logger.info(f"This process now runs the {self.name!r}")
+            self._conn = conn
+            return True
+
+    def release(self):
+        from sqlalchemy import text
+
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                # close() only returns the connection to the pool, where the session-level lock would stay held
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._conn.close()
+            except Exception:
+                logger.warning(f"Could not release the {self.name!r} lock; dropping its connection")
+                self._conn.invalidate()  # the database frees the lock when the session ends
+            finally:
+                self._conn = None
+
+
+# Jobs that change shared tables run in one process; per-process caches refresh everywhere
+leader = Leadership("cluster periodic jobs")
+
+
+async def run_periodically(name: str, interval: float, func: Callable[[], None],
+                           leadership: Optional[Leadership] = None):
+    """Call a blocking func every `interval` seconds in a worker thread until cancelled.
+
+    The first run is one interval after startup; failures are logged and the
+    loop carries on. With `leadership`, runs are skipped while another process
+    leads.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if leadership is not None and not await asyncio.to_thread(leadership.acquire):
+                continue
+            await asyncio.to_thread(func)
+        except Exception:
+            logger.exception(f"Periodic task {name!r} failed")
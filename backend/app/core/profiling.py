@@ -0,0 +1,121 @@
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import random
+import re
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+MAX_TOKEN_TTL = 3600  # tokens expiring further out than this are refused
+
+
+def _signature(secret: str, method: str, path: str, expires: int) -> str:
+    message = f"{method.upper()} {path} {expires}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def profile_token(secret: str, method: str, path: str, ttl: int = 300) -> str:
+    """The X-Profile-Token value that profiles `method path` for the next `ttl` seconds."""
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_signature(secret, method, path, expires)}"
+
+
+def verify_token(secret: str, method: str, path: str, token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit():
+        return False
+    now = time.time()
+    if not now <= int(expires) <= now + MAX_TOKEN_TTL:
+        return False
+    return hmac.compare_digest(signature, _signature(secret, method, path, int(expires)))
+
+
+class ProfilingMiddleware:
+    """Run selected requests under cProfile and dump .pstats files.
+
+    A request is profiled when it carries a valid X-Profile-Token header
+    ("<expiry>.<signature>", see profile_token: an HMAC-SHA256 of
+    "METHOD /path expiry" with the profiling secret, so a leaked token stops
+    working at its expiry) or is picked by the sampling rate. Only register
+    this middleware when profiling is enabled, so there is no overhead at all
+    otherwise.
+
+    Profiles are written as `<timestamp>_<ms>ms_<METHOD>_<route>.pstats` and the
+    directory is pruned to the newest `max_files`. Open them with
+    `python -m pstats` or snakeviz.
+
+    cProfile is process-wide per thread: with async endpoints, other requests
+    interleaved on the event loop show up in the same profile.
+    """
+
+    def __init__(self, app, directory: str, secret: Optional[str] = None,
+                 sample_rate: float = 0.0, max_files: int = 200):
+        self.app = app
+        self.directory = directory
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._active = False
+        os.makedirs(directory, exist_ok=True)
+
+    def _wants_profile(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not self.secret:
+            return False
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                return verify_token(self.secret, scope["method"], scope["path"], value.decode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        # One profiler at a time; cProfile cannot nest
+        if scope["type"] != "http" or self._active or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._active = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._dump(profiler, scope, elapsed_ms)
+
+    def _dump(self, profiler: cProfile.Profile, scope, elapsed_ms: float):
+        # The router stores the matched endpoint in the (shared) scope
+        endpoint = scope.get("endpoint")
+        route_path = getattr(endpoint, "__name__", None) or scope["path"]
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route_path).strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}_{elapsed_ms:.0f}ms_{scope['method']}_{slug}.pstats"
+        path = os.path.join(self.directory, filename)
+        try:
+            profiler.dump_stats(path)
+            self._prune()
+            logger.info(f"Profiled {scope['method']} {route_path} in {elapsed_ms:.1f}ms -> {path}")
+        except OSError as e:
+            logger.warning(f"Could not write profile {path}: {e}")
+
+    def _prune(self):
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".pstats")
+        ]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for old in files[: len(files) - self.max_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
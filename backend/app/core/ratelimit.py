@@ -0,0 +1,266 @@
+"""
+Token-bucket rate limiting per route policy.
+
+Each Policy names the requests it covers (method, path pattern, optionally
+a query parameter) and a limit like "10/60": a bucket of 10 requests that
+refills over 60 seconds, so short bursts are fine and sustained traffic is
+held to the average rate. Buckets are per caller: the token subject for
+authenticated requests, the client address otherwise (or always, for
+policies keyed by "ip" such as login). A request has to fit every policy
+that matches it; one that does not gets 429 with Retry-After.
+
+Buckets live in process by default (MemoryBucketStore, touched only from
+the event loop, so it needs no locks). With several workers each one would
+allow the full limit, so RATE_LIMIT_URL=redis://... moves them to Redis,
+where a script updates each bucket atomically. If Redis is unreachable,
+requests are let through and counted in ratelimit_backend_errors_total.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import FrozenSet, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import parse_qs
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+requests_total = metrics.counter("ratelimit_requests_total", "Requests checked against a rate limit policy")
+backend_errors = metrics.counter("ratelimit_backend_errors_total", "Rate limit store errors (requests let through)")
+buckets_gauge = metrics.gauge("ratelimit_buckets", "Token buckets held in process")
+
+
+class Policy(NamedTuple):
+    name: str
+    limit: int  # bucket size: requests allowed in a burst
+    period: float  # seconds to refill an empty bucket
+    path: Pattern
+    methods: FrozenSet[str] = frozenset()  # empty: any method
+    key: str = "user"  # "user": token subject, else client address; "ip": always the address
+    query_param: Optional[str] = None  # only requests carrying this parameter
+
+    def matches(self, method: str, path: str, query_string: bytes) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        if not self.path.match(path):
+            return False
+        if self.query_param is not None:
+            values = parse_qs(query_string.decode("latin-1")).get(self.query_param)
+            return bool(values and any(value.strip() for value in values))
+        return True
+
+
+def parse_limit(spec: str) -> Optional[Tuple[int, float]]:
+    """"10/60" -> (10, 60.0); "" or a zero limit -> None (policy off). Raises ValueError."""
+    spec = spec.strip()
+    if not spec:
+        return None
+    count, _, seconds = spec.partition("/")
+    limit, period = int(count), float(seconds or 1)
+    if limit <= 0:
+        return None
+    if period <= 0:
+        raise ValueError(f"Invalid rate limit {spec!r}")
+    return limit, period
+
+
+def build_policies(settings) -> List[Policy]:
+    """The policies configured by the RATE_LIMIT_* settings."""
+    candidates = [
+        # bcrypt on every attempt; also slows down password guessing
+        ("login", settings.RATE_LIMIT_LOGIN, r"^/api/v1/auth/(login|register)/?$", {"POST"}, "ip", None),
+        # Text search scans the catalog
+        ("search", settings.RATE_LIMIT_SEARCH, r"^/api/v1/skills/?$", {"GET"}, "user", "search"),
+        ("messages", settings.RATE_LIMIT_MESSAGES, r"^/api/v1/chats/\d+/messages/?$", {"POST"}, "user", None),
+        ("default", settings.RATE_LIMIT_DEFAULT, r"^/api/", set(), "user", None),
+    ]
+    policies = []
+    for name, spec, path, methods, key, query_param in candidates:
+        parsed = parse_limit(spec)
+        if parsed is not None:
+            policies.append(Policy(name, parsed[0], parsed[1], re.compile(path), frozenset(methods), key, query_param))
+    return policies
+
+
+class BucketStore:
+    blocking = False  # True: take() does I/O and is run in the threadpool
+
+    def take(self, key: str, limit: int, period: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens from the bucket; 0 if they were there, else seconds until they will be."""
+        raise NotImplementedError
+
+
+class MemoryBucketStore(BucketStore):
+    """Buckets in a dict; least recently used ones are dropped past max_keys.
+
+    Only called from the event loop thread and never awaits in between, so
+    read-modify-write on a bucket cannot interleave. A dropped bucket comes
+    back full, which errs on the side of letting requests through.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        metrics.register_collector(self.collect_metrics, per_process=True)
+
+    def take(self, key: str, limit: int, period: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        rate = limit / period
+        tokens, updated = self._buckets.pop(key, (limit, now))
+        tokens = min(limit, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def collect_metrics(self):
+        buckets_gauge.set(len(self._buckets))
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# KEYS[1]: bucket; ARGV: limit, period, cost. Returns the wait in microseconds (0: allowed).
+_TAKE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local rate = limit / period
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or limit
+local updated = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(now - updated, 0) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(period * 1000))
+return math.ceil(wait * 1000000)
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared by every worker (requires the `redis` package)."""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "circleed:ratelimit:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, limit: int, period: float, cost: float = 1.0) -> float:
+        return int(self._take(keys=[self.prefix + key], args=[limit, period, cost])) / 1000000
+
+
+def create_bucket_store(url: str = "", max_keys: int = 100000) -> BucketStore:
+    """Redis buckets for a redis:// url, in-process ones otherwise."""
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBucketStore(url)
+    return MemoryBucketStore(max_keys)
+
+
+@lru_cache(maxsize=4096)
+def _token_claims(token: str) -> Optional[Tuple[Optional[str], Optional[float]]]:
+    """(sub, exp) of a token that verified when first seen, else None."""
+    from jose import JWTError, jwt  # deferred: jose is slow to import
+    from app.core.config import settings
+
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return claims.get("sub"), claims.get("exp")
+
+
+def _token_subject(token: str) -> Optional[str]:
+    """The subject of a valid token; decoding is cached, so expiry is checked here on every call."""
+    claims = _token_claims(token)
+    if claims is None:
+        return None
+    subject, expires_at = claims
+    if expires_at is not None and expires_at <= time.time():
+        return None
+    return subject
+
+
+class RateLimitMiddleware:
+    """Answer 429 to requests over any matching policy's limit."""
+
+    def __init__(self, app, store: BucketStore, policies: List[Policy], trust_forwarded: bool = False):
+        self.app = app
+        self.store = store
+        self.policies = policies
+        self.trust_forwarded = trust_forwarded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path, query = scope["method"], scope["path"], scope.get("query_string", b"")
+        matched = [policy for policy in self.policies if policy.matches(method, path, query)]
+        for policy in matched:
+            wait = await self._take(f"{policy.name}:{self._caller(scope, policy.key)}", policy)
+            if wait > 0:
+                requests_total.inc(policy=policy.name, outcome="limited")
+                await _send_limited(send, policy, wait)
+                return
+            requests_total.inc(policy=policy.name, outcome="allowed")
+        await self.app(scope, receive, send)
+
+    async def _take(self, key: str, policy: Policy) -> float:
+        try:
+            if self.store.blocking:
+                return await asyncio.to_thread(self.store.take, key, policy.limit, policy.period)
+            return self.store.take(key, policy.limit, policy.period)
+        except Exception as e:
+            backend_errors.inc()
+            logger.warning(f"Rate limit check failed, letting the request through: {e}")
+            return 0.0
+
+    def _caller(self, scope, key: str) -> str:
+        headers = dict(scope.get("headers", []))
+        if key == "user":
+            authorization = headers.get(b"authorization", b"").decode("latin-1")
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                subject = _token_subject(token.strip())
+                if subject is not None:
+                    return "user:" + subject
+        if self.trust_forwarded and b"x-forwarded-for" in headers:
+            # The last hop is the one our proxy saw; earlier entries are client-supplied
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[-1].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+
+async def _send_limited(send, policy: Policy, wait: float):
+    body = json.dumps({"detail": "Too many requests, please retry later"}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(math.ceil(wait), 1)).encode("latin-1")),
+            (b"ratelimit-policy", f"{policy.limit};w={policy.period:g}".encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,29 @@
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+
+class JSONBytesResponse(Response):
+    """Response for bodies that are already serialized JSON bytes."""
+
+    media_type = "application/json"
+
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    """Validate ORM objects against a prebuilt adapter and serialize straight to bytes."""
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def json_response(adapter: TypeAdapter, data: Any, **kwargs) -> JSONBytesResponse:
+    return JSONBytesResponse(content=dump_json(adapter, data), **kwargs)
+
+
+def etag_response(request: Request, body: bytes, etag: str, cache_control: str,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON body with validators; answers 304 when the client already has this version."""
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return JSONBytesResponse(content=body, headers=headers)
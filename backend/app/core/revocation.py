@@ -0,0 +1,121 @@
+"""
+Access token revocation without a query per request.
+
+Revoked access tokens (logout, a leaked refresh token) are rows of
+`revoked_tokens`, kept until the token would have expired. Each process
+holds a snapshot of them as a Bloom filter, rebuilt from the table every
+REVOCATION_REFRESH_INTERVAL seconds. is_revoked() answers from the filter:
+a miss, which is every valid token, costs no query; a hit is confirmed in
+the database, since the filter has false positives.
+
+Revocations committed in this process are added to the snapshot right
+away; those from other workers are seen after their next refresh. Until
+the first snapshot is loaded every check goes to the database.
+"""
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core import metrics
+from app.core.database import SessionLocal
+from app.core.jobs import after_commit
+from app.models.token import RevokedToken as RevokedTokenModel
+
+logger = logging.getLogger(__name__)
+
+snapshot_size = metrics.gauge("revocation_snapshot_tokens", "Revoked access tokens in this process's snapshot")
+database_checks = metrics.counter("revocation_database_checks_total", "Revocation checks the snapshot could not answer")
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about `error_rate` false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self, error_rate: float = 0.001, min_capacity: int = 1024):
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self._filter: Optional[BloomFilter] = None
+        # Revoked here since startup, so a refresh that read the table just before cannot drop them
+        self._local: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild the snapshot from revoked_tokens."""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            jtis = [jti for (jti,) in db.query(RevokedTokenModel.jti).filter(RevokedTokenModel.expires_at > now)]
+        finally:
+            db.close()
+        with self._lock:
+            self._local = {jti: expires for jti, expires in self._local.items() if expires > now}
+            # Headroom for the revocations added before the next rebuild
+            bloom = BloomFilter(max(2 * (len(jtis) + len(self._local)), self.min_capacity), self.error_rate)
+            for jti in jtis:
+                bloom.add(jti)
+            for jti in self._local:
+                bloom.add(jti)
+            self._filter = bloom
+        snapshot_size.set(len(jtis) + len(self._local))
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._local[jti] = expires_at
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def is_revoked(self, jti: str, db: SQLSession) -> bool:
+        bloom = self._filter
+        if bloom is not None and jti not in bloom:
+            return False
+        database_checks.inc()
+        return db.query(RevokedTokenModel.jti).filter(RevokedTokenModel.jti == jti).first() is not None
+
+
+revocations = RevocationList()
+
+
+def revoke(db: SQLSession, jti: str, expires_at: datetime):
+    """Revoke an access token when the caller commits."""
+    if expires_at <= datetime.utcnow():
+        return
+    pending = any(isinstance(row, RevokedTokenModel) and row.jti == jti for row in db.new)
+    if pending or db.get(RevokedTokenModel, jti) is not None:
+        return
+    db.add(RevokedTokenModel(jti=jti, expires_at=expires_at))
+    after_commit(db, lambda: revocations.add(jti, expires_at))
+
+
+def prune() -> int:
+    db = SessionLocal()
+    try:
+        count = db.execute(delete(RevokedTokenModel).where(RevokedTokenModel.expires_at <= datetime.utcnow())).rowcount
+        db.commit()
+        return count
+    finally:
+        db.close()
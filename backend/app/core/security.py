@@ -1,37 +1,76 @@
-from passlib.context import CryptContext
-from jose import jwt
+import hashlib
+import secrets
+import uuid
 from datetime import datetime, timedelta
-from fastapi import HTTPException, status
+from functools import lru_cache
 from app.core.config import settings
 
-# Use bcrypt for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """bcrypt CryptContext, built on first use (passlib is slow to import)."""
+    from passlib.context import CryptContext
+    # Hashes below BCRYPT_ROUNDS (or of deprecated schemes) are upgraded at the next login
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+
+def __getattr__(name):
+    # Backwards compatible `from app.core.security import pwd_context`
+    if name == "pwd_context":
+        return get_pwd_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
     except ValueError:
         # Password is invalid or hashed_password is not a valid hash
         return False
     except Exception:
         return False
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash should be replaced once the password is known (outdated scheme or cost)."""
+    try:
+        return get_pwd_context().needs_update(hashed_password)
+    except ValueError:
+        return False
+
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire})
+    # jti names this token in the revocation list
+    to_encode.update({"exp": expire, "jti": to_encode.get("jti") or uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM
     )
     return encoded_jwt
+
+
+def new_refresh_token() -> str:
+    """Opaque refresh token; only its hash_token() is stored."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_token(token: str) -> str:
+    # The token is 256 random bits, so a fast unsalted hash is enough (unlike passwords)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
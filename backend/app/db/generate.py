@@ -0,0 +1,422 @@
+"""
+Synthetic data generator for load and scaling tests.
+
+Generates N users plus skills, reviews, sessions, transactions, chats and
+messages with realistic distributions: user activity and skill popularity
+follow a power law, so a few teachers get most bookings and a few chats hold
+most of the messages. Rows are written with bulk Core inserts (COPY on
+PostgreSQL) and every user shares one precomputed password hash.
+
+Usage:
+    python -m app.db.generate --users 10000
+    python -m app.db.generate --users 100000 --messages 500000 --seed 7
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.database import Base, get_engine
+from app.core.security import get_password_hash
+from app.models import (
+    User, UserSkillTag, Skill, SkillReview, SkillAvailability, Session, Transaction, Chat, Message,
+    RefreshToken, RevokedToken, Job, OutboxEvent, IdempotencyKey,
+)
+from app.services.availability import slot_rows
+from app.services.ledger import STARTING_BALANCE, TEACHING_EARNING_PREFIX, WELCOME_BONUS_DESCRIPTION
+from app.services.matching import LEARN, TEACH, normalize_tag
+from app.services.ranking import refresh_scores
+
+CHUNK_SIZE = 20_000
+
+FIRST_NAMES = ["Alex", "Maria", "James", "Sarah", "John", "Aisha", "Wei", "Lucas", "Priya", "Omar",
+               "Emma", "Kenji", "Sofia", "Noah", "Fatima", "Liam", "Chloe", "Mateo", "Yuki", "Zara"]
+LAST_NAMES = ["Chen", "Garcia", "Wilson", "Kim", "Doe", "Khan", "Silva", "Patel", "Müller", "Rossi",
+              "Nguyen", "Okafor", "Smith", "Tanaka", "Ivanova", "Haddad", "Brown", "Lopez", "Cohen", "Singh"]
+CATEGORIES = {
+    "Programming": ["Python", "JavaScript", "React", "Data Science", "Machine Learning", "SQL", "Rust", "Go"],
+    "Language": ["Spanish", "English", "French", "Japanese", "German", "Mandarin", "Arabic"],
+    "Music": ["Guitar", "Piano", "Singing", "Drums", "Music Theory"],
+    "Design": ["UI Design", "Figma", "Illustration", "Photography"],
+    "Business": ["Marketing", "Public Speaking", "Negotiation", "Accounting"],
+    "Fitness": ["Yoga", "Running", "Nutrition"],
+}
+CATEGORY_WEIGHTS = [35, 25, 15, 10, 10, 5]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+LEVEL_WEIGHTS = [50, 35, 15]
+LANGUAGES = ["English", "Spanish", "French", "German", "Japanese", "Hindi"]
+LANGUAGE_WEIGHTS = [70, 12, 6, 5, 4, 3]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+TIME_SLOTS = ["8:00 AM", "9:00 AM", "10:00 AM", "11:00 AM", "1:00 PM", "2:00 PM",
+              "3:00 PM", "5:00 PM", "6:00 PM", "7:00 PM", "8:00 PM"]
+BADGES = ["Popular", "Verified Teacher", "Expert", "Native Speaker", "Rising Star"]
+REVIEW_RATINGS = [1, 2, 3, 4, 5]
+REVIEW_RATING_WEIGHTS = [2, 3, 10, 30, 55]
+REVIEW_COMMENTS = ["Excellent teacher!", "Very clear explanations.", "Helpful session, thanks!",
+                   "Good but a bit fast.", "Would book again.", None]
+MESSAGES = ["Hi! Are you free this week?", "Thanks for the session!", "See you tomorrow at 2 PM",
+            "Could we go over the exercises again?", "Sure, that works for me.", "Sounds great!",
+            "I uploaded my homework.", "Running 5 minutes late, sorry."]
+ALL_TAGS = [tag for tags in CATEGORIES.values() for tag in tags]
+
+# Table order for deletes (children first); inserts go in reverse. Tokens, jobs, events and
+# stored replays are only cleared: SQLite reuses ids, so a refresh token from the old data
+# would sign in as a new user, and queued jobs or replayed responses would name new rows.
+# Outbox ids restart too, so restart a running app after regenerating.
+TABLES = [IdempotencyKey, OutboxEvent, Job, RevokedToken, RefreshToken, Message, Chat, Transaction, Session,
+          SkillReview, SkillAvailability, Skill, UserSkillTag, User]
+
+
+def power_law_weights(rng: random.Random, n: int, alpha: float = 1.2) -> List[float]:
+    """Per-entity activity weights drawn from a Pareto distribution (heavy tail)."""
+    return [rng.paretovariate(alpha) for _ in range(n)]
+
+
+def cumulative(weights: Sequence[float]) -> List[float]:
+    total, out = 0.0, []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+
+def clear_tables(conn: Connection):
+    """Remove all rows with one statement per table."""
+    if conn.dialect.name == "postgresql":
+        names = ", ".join(model.__tablename__ for model in TABLES)
+        conn.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+    else:
+        for model in TABLES:
+            conn.execute(model.__table__.delete())
+
+
+def reset_sequences(conn: Connection):
+    """Move PostgreSQL id sequences past the explicitly inserted ids."""
+    if conn.dialect.name != "postgresql":
+        return
+    for model in TABLES:
+        if "id" not in model.__table__.c:
+            continue
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        ))
+
+
+def _copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def bulk_insert(conn: Connection, model, columns: List[str], rows: Iterable[tuple]) -> int:
+    """Insert tuples in chunks; COPY on PostgreSQL, executemany elsewhere."""
+    table = model.__table__
+    count = 0
+    chunk: List[tuple] = []
+
+    def flush():
+        if not chunk:
+            return
+        if conn.dialect.name == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow([_copy_value(v) for v in row])
+            buffer.seek(0)
+            cursor = conn.connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+        else:
+            conn.execute(table.insert(), [dict(zip(columns, row)) for row in chunk])
+        chunk.clear()
+
+    for row in rows:
+        chunk.append(row)
+        count += 1
+        if len(chunk) >= CHUNK_SIZE:
+            flush()
+    flush()
+    return count
+
+
+class Generator:
+    def __init__(self, users: int, skills: int, reviews: int, sessions: int, chats: int, messages: int,
+                 password: str = "password123", seed: Optional[int] = None, now: Optional[datetime] = None):
+        self.n_users = users
+        self.n_skills = skills
+        self.n_reviews = reviews
+        self.n_sessions = sessions
+        self.n_chats = chats
+        self.n_messages = messages
+        self.password = password
+        self.rng = random.Random(seed)
+        self.now = now or datetime.utcnow()
+
+    def random_past(self, days: int = 365) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randint(60, days * 86400))
+
+    def random_future(self, days: int = 30) -> datetime:
+        return self.now + timedelta(seconds=self.rng.randint(3600, days * 86400))
+
+    def plan(self):
+        """Decide every row up front so balances and aggregates are consistent."""
+        rng = self.rng
+        user_ids = range(1, self.n_users + 1)
+        self.user_activity = cumulative(power_law_weights(rng, self.n_users))
+
+        # Skills: teachers are picked by activity, so prolific teachers own many skills
+        categories = list(CATEGORIES)
+        self.skills = []
+        teachers = rng.choices(user_ids, cum_weights=self.user_activity, k=self.n_skills)
+        for skill_id, teacher_id in enumerate(teachers, start=1):
+            category = rng.choices(categories, CATEGORY_WEIGHTS)[0]
+            topic = rng.choice(CATEGORIES[category])
+            level = rng.choices(LEVELS, LEVEL_WEIGHTS)[0]
+            days = rng.sample(DAYS, rng.randint(1, 4))
+            availability = [
+                {"day": day, "timeSlots": sorted(rng.sample(TIME_SLOTS, rng.randint(1, 3)), key=TIME_SLOTS.index)}
+                for day in sorted(days, key=DAYS.index)
+            ]
+            self.skills.append([
+                skill_id, f"{level} {topic}",
+                f"Learn {topic.lower()} with a hands-on, {level.lower()}-friendly approach.",
+                teacher_id, category, level, rng.choices(LANGUAGES, LANGUAGE_WEIGHTS)[0],
+                rng.choice(range(20, 105, 5)), 0.0, 0,
+                rng.sample(BADGES, rng.randint(0, 2)), availability,
+            ])
+        self.skill_popularity = cumulative(power_law_weights(rng, self.n_skills))
+        skill_ids = range(1, self.n_skills + 1)
+
+        # Reviews: popular skills collect most of them; aggregates roll up into the skill row
+        rating_sum: Counter = Counter()
+        rating_count: Counter = Counter()
+        self.reviews = []
+        reviewed = rng.choices(skill_ids, cum_weights=self.skill_popularity, k=self.n_reviews)
+        reviewers = rng.choices(user_ids, cum_weights=self.user_activity, k=self.n_reviews)
+        for review_id, (skill_id, reviewer_id) in enumerate(zip(reviewed, reviewers), start=1):
+            rating = rng.choices(REVIEW_RATINGS, REVIEW_RATING_WEIGHTS)[0]
+            rating_sum[skill_id] += rating
+            rating_count[skill_id] += 1
+            self.reviews.append((review_id, skill_id, reviewer_id, rating, rng.choice(REVIEW_COMMENTS),
+                                 self.random_past(730)))
+        for skill in self.skills:
+            count = rating_count[skill[0]]
+            if count:
+                skill[8] = round(rating_sum[skill[0]] / count, 2)
+                skill[9] = count
+
+        # Sessions and the ledger rows they imply (booking spend, refunds, teaching earnings)
+        balance = [STARTING_BALANCE] * (self.n_users + 1)
+        streak = [0] * (self.n_users + 1)
+        self.sessions = []
+        self.transactions = []
+        booked = rng.choices(skill_ids, cum_weights=self.skill_popularity, k=self.n_sessions)
+        students = rng.choices(user_ids, cum_weights=self.user_activity, k=self.n_sessions)
+        statuses = rng.choices(["completed", "confirmed", "pending", "cancelled"], [60, 10, 10, 20],
+                               k=self.n_sessions)
+        for session_id, (skill_id, student_id, status) in enumerate(zip(booked, students, statuses), start=1):
+            skill = self.skills[skill_id - 1]
+            teacher_id, title, price = skill[3], skill[1], skill[7]
+            if student_id == teacher_id:
+                student_id = student_id % self.n_users + 1
+                if student_id == teacher_id:
+                    continue
+            if status == "completed":
+                scheduled = self.random_past()
+            elif status == "cancelled":
+                scheduled = self.random_past() if rng.random() < 0.5 else self.random_future()
+            else:
+                scheduled = self.random_future()
+            booked_at = min(scheduled, self.now) - timedelta(days=rng.randint(1, 14))
+            review_submitted = rng.choices(REVIEW_RATINGS, REVIEW_RATING_WEIGHTS)[0] \
+                if status == "completed" and rng.random() < 0.3 else 0
+            self.sessions.append((session_id, skill_id, teacher_id, student_id, scheduled, status,
+                                  rng.choice([30, 60, 60, 60, 90]), review_submitted, booked_at))
+
+            self.transactions.append((student_id, "spend", price, f"Booked session for {title}", booked_at))
+            balance[student_id] -= price
+            if status == "cancelled":
+                self.transactions.append((student_id, "earn", price, f"Refund for cancelled session on {title}",
+                                          booked_at + timedelta(hours=rng.randint(1, 48))))
+                balance[student_id] += price
+            elif status == "completed":
+                self.transactions.append((teacher_id, "earn", price, f"{TEACHING_EARNING_PREFIX}{title}",
+                                          scheduled + timedelta(hours=1)))
+                balance[teacher_id] += price
+                streak[student_id] += 1
+
+        # Users: every account starts with a welcome bonus (before its first booking), and a negative
+        # simulated balance is topped up with a grant so the ledger still adds up
+        self.users = []
+        password_hash = get_password_hash(self.password)
+        for user_id in user_ids:
+            joined = self.now - timedelta(days=380, seconds=rng.randint(0, 365 * 86400))
+            self.transactions.append((user_id, "earn", STARTING_BALANCE, WELCOME_BONUS_DESCRIPTION, joined))
+            if balance[user_id] < 0:
+                grant = -balance[user_id] + rng.randint(0, 100)
+                self.transactions.append((user_id, "earn", grant, "Token top-up", self.random_past(730)))
+                balance[user_id] += grant
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            self.users.append((
+                user_id, f"user{user_id}@example.com", name, password_hash, None,
+                f"Hi, I'm {name.split()[0]}.", rng.sample(ALL_TAGS, rng.randint(1, 3)),
+                rng.sample(ALL_TAGS, rng.randint(1, 3)), balance[user_id], streak[user_id], True,
+            ))
+        self.transactions.sort(key=lambda t: t[4])
+
+        # Chats between activity-weighted pairs; message counts are heavy-tailed (a few very long chats)
+        self.chats = []
+        pairs = set()
+        attempts = 0
+        while len(pairs) < self.n_chats and attempts < self.n_chats * 5 and self.n_users > 1:
+            attempts += 1
+            a, b = rng.choices(user_ids, cum_weights=self.user_activity, k=2)
+            if a != b and (b, a) not in pairs:
+                pairs.add((a, b))
+        self.chat_pairs = list(pairs)
+        chat_weights = cumulative(power_law_weights(rng, len(self.chat_pairs), alpha=1.1))
+        self.message_counts = Counter(
+            rng.choices(range(len(self.chat_pairs)), cum_weights=chat_weights, k=self.n_messages)
+        ) if self.chat_pairs else Counter()
+
+    def iter_messages(self):
+        rng = self.rng
+        message_id = 0
+        self.chat_last = {}
+        for index, (a, b) in enumerate(self.chat_pairs):
+            count = self.message_counts.get(index, 0)
+            sent_at = self.random_past(180)
+            for _ in range(count):
+                message_id += 1
+                sent_at += timedelta(seconds=rng.randint(5, 6 * 3600))
+                sender = a if rng.random() < 0.5 else b
+                content = rng.choice(MESSAGES)
+                self.chat_last[index] = (content, sent_at)
+                yield (message_id, index + 1, sender, content, sent_at, True)
+
+    def iter_user_tags(self):
+        for user in self.users:
+            for kind, tags in ((TEACH, user[6]), (LEARN, user[7])):
+                for tag in {normalize_tag(t) for t in tags}:
+                    yield (user[0], kind, tag)
+
+    def iter_availability(self):
+        row_id = 0
+        for skill in self.skills:
+            for weekday, start, end, tz in slot_rows(skill[-1]):
+                row_id += 1
+                yield (row_id, skill[0], weekday, start, end, tz)
+
+    def iter_chats(self):
+        for index, (a, b) in enumerate(self.chat_pairs):
+            content, sent_at = self.chat_last.get(index, (None, None))
+            unread = self.rng.choice([0, 0, 0, 1, 2])
+            yield (index + 1, a, b, content, sent_at, 0, unread, sent_at or self.now)
+
+    def load(self, conn: Connection) -> Dict[str, int]:
+        counts = {}
+        counts["users"] = bulk_insert(conn, User, [
+            "id", "email", "name", "hashed_password", "avatar_url", "bio", "skills_to_teach",
+            "skills_to_learn", "token_balance", "streak", "is_active",
+        ], self.users)
+        counts["user_skill_tags"] = bulk_insert(conn, UserSkillTag, [
+            "user_id", "kind", "tag",
+        ], self.iter_user_tags())
+        counts["skills"] = bulk_insert(conn, Skill, [
+            "id", "title", "description", "teacher_id", "category", "level", "language",
+            "tokens_per_session", "rating", "review_count", "badges", "availability",
+        ], (tuple(s) for s in self.skills))
+        counts["skill_availability"] = bulk_insert(conn, SkillAvailability, [
+            "id", "skill_id", "weekday", "start_minute", "end_minute", "tz",
+        ], self.iter_availability())
+        counts["skill_reviews"] = bulk_insert(conn, SkillReview, [
+            "id", "skill_id", "reviewer_id", "rating", "comment", "created_at",
+        ], self.reviews)
+        counts["sessions"] = bulk_insert(conn, Session, [
+            "id", "skill_id", "teacher_id", "student_id", "scheduled_at", "status",
+            "duration_minutes", "review_submitted", "created_at",
+        ], self.sessions)
+        counts["transactions"] = bulk_insert(conn, Transaction, [
+            "id", "user_id", "type", "amount", "description", "created_at",
+        ], ((i, *t) for i, t in enumerate(self.transactions, start=1)))
+        # Messages are generated first so each chat row carries its real last message
+        messages = list(self.iter_messages())
+        counts["chats"] = bulk_insert(conn, Chat, [
+            "id", "user1_id", "user2_id", "last_message", "last_message_time",
+            "unread_count_user1", "unread_count_user2", "created_at",
+        ], self.iter_chats())
+        counts["messages"] = bulk_insert(conn, Message, [
+            "id", "chat_id", "sender_id", "content", "created_at", "is_read",
+        ], messages)
+        return counts
+
+
+def generate(users: int, skills: Optional[int] = None, reviews: Optional[int] = None,
+             sessions: Optional[int] = None, chats: Optional[int] = None, messages: Optional[int] = None,
+             password: str = "password123", seed: Optional[int] = None, bind=None) -> Dict[str, int]:
+    """Replace the database contents with generated data and return row counts per table."""
+    skills = users * 3 // 10 if skills is None else skills
+    generator = Generator(
+        users=users,
+        skills=max(skills, 1),
+        reviews=skills * 5 if reviews is None else reviews,
+        sessions=users * 3 if sessions is None else sessions,
+        chats=users * 2 if chats is None else chats,
+        messages=users * 20 if messages is None else messages,
+        password=password,
+        seed=seed,
+    )
+    generator.plan()
+
+    bind = bind or get_engine()
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        clear_tables(conn)
+        counts = generator.load(conn)
+        refresh_scores(conn)
+        reset_sequences(conn)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--skills", type=int, help="Default: 30%% of users")
+    parser.add_argument("--reviews", type=int, help="Default: 5 per skill")
+    parser.add_argument("--sessions", type=int, help="Default: 3 per user")
+    parser.add_argument("--chats", type=int, help="Default: 2 per user")
+    parser.add_argument("--messages", type=int, help="Default: 20 per user")
+    parser.add_argument("--password", default="password123", help="Password shared by every generated user")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible data")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(args.users, args.skills, args.reviews, args.sessions, args.chats, args.messages,
+                      password=args.password, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"  {table:<18} {count:>10,}")
+    print(f"Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
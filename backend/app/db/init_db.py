@@ -1,14 +1,89 @@
-from app.core.database import engine, Base
-from app.models import User, Skill, SkillReview, Session, Transaction, Chat, Message
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.core.database import get_engine, Base
+from app.models import User, UserSkillTag, Skill, SkillReview, SkillAvailability, Session, Transaction, Chat, Message
+from app.services import availability, ledger, matching, ranking
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL only: the database itself rejects overlapping active bookings
+# for a teacher, closing the race between the API's check and its insert
+SESSION_OVERLAP_CONSTRAINT = "sessions_teacher_no_overlap"
+SESSION_OVERLAP_DDL = f"""
+ALTER TABLE sessions ADD CONSTRAINT {SESSION_OVERLAP_CONSTRAINT}
+EXCLUDE USING gist (
+    teacher_id WITH =,
+    tsrange(scheduled_at, scheduled_at + coalesce(duration_minutes, 60) * interval '1 minute') WITH &&
+) WHERE (status IN ('pending', 'confirmed'))
+"""
 
 def init_db():
     """Initialize database tables"""
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        availability.backfill(conn)
+        matching.backfill(conn)
+        ranking.refresh_scores(conn)
+        ledger.backfill_welcome_bonus(conn)
+    backfill_review_dates(engine)
+    if engine.dialect.name == "postgresql":
+        add_session_overlap_constraint(engine)
 
-if __name__ == "__main__":
-    init_db()
-    print("Database initialized!")
+def upgrade_schema(engine: Engine):
+    """Add columns and indexes introduced after a table was first created.
+
+    create_all() only creates missing tables, so existing databases would
+    otherwise never get new indexes or nullable/defaulted columns.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
+def backfill_review_dates(engine: Engine):
+    """Date the reviews written before skill_reviews.created_at existed.
 
+    Undated rows fall out of the newest-first keyset pages. They get the oldest
+    known review date; on PostgreSQL the column is then made NOT NULL.
+    """
+    with engine.begin() as conn:
+        oldest = conn.execute(select(func.min(SkillReview.created_at))).scalar() or datetime.utcnow()
+        conn.execute(update(SkillReview).where(SkillReview.created_at.is_(None)).values(created_at=oldest))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE skill_reviews ALTER COLUMN created_at SET NOT NULL"))
 
+def add_session_overlap_constraint(engine: Engine):
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": SESSION_OVERLAP_CONSTRAINT}
+        ).first()
+    if exists:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+            conn.execute(text(SESSION_OVERLAP_DDL))
+    except DBAPIError as e:
+        # Existing double bookings (or no permission for the extension) must not block startup;
+        # the API-level check still applies
+        logger.warning(f"Could not add {SESSION_OVERLAP_CONSTRAINT}: {e}")
 
+if __name__ == "__main__":
+    init_db()
+    print("Database initialized!")
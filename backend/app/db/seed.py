@@ -1,10 +1,13 @@
 from app.core.database import SessionLocal
+from app.db.generate import clear_tables
 from app.models.user import User
 from app.models.skill import Skill, SkillReview
 from app.models.session import Session
 from app.models.transaction import Transaction
 from app.models.chat import Chat, Message
 from app.core.security import get_password_hash
+from app.services.availability import sync_skill_availability
+from app.services.matching import sync_user_tags
 from datetime import datetime, timedelta
 
 def seed_db():
@@ -12,21 +15,18 @@ def seed_db():
     
     try:
         # Clear existing data
-        db.query(Message).delete()
-        db.query(Chat).delete()
-        db.query(Transaction).delete()
-        db.query(Session).delete()
-        db.query(SkillReview).delete()
-        db.query(Skill).delete()
-        db.query(User).delete()
+        clear_tables(db.connection())
         db.commit()
         
+        # All demo users share one password, so hash it once
+        password_hash = get_password_hash("password123")
+        
         # Create users
         users = [
             User(
                 email="alex@example.com",
                 name="Alex Chen",
-                hashed_password=get_password_hash("password123"),
+                hashed_password=password_hash,
                 bio="Passionate JavaScript developer and teacher",
                 skills_to_teach=["JavaScript", "React", "Node.js"],
                 skills_to_learn=["Spanish"],
@@ -36,7 +36,7 @@ def seed_db():
             User(
                 email="maria@example.com",
                 name="Maria Garcia",
-                hashed_password=get_password_hash("password123"),
+                hashed_password=password_hash,
                 bio="Native Spanish speaker teaching conversational Spanish",
                 skills_to_teach=["Spanish"],
                 skills_to_learn=["English"],
@@ -46,7 +46,7 @@ def seed_db():
             User(
                 email="james@example.com",
                 name="James Wilson",
-                hashed_password=get_password_hash("password123"),
+                hashed_password=password_hash,
                 bio="Professional guitarist with 10+ years of experience",
                 skills_to_teach=["Guitar"],
                 skills_to_learn=["Piano"],
@@ -56,7 +56,7 @@ def seed_db():
             User(
                 email="sarah@example.com",
                 name="Sarah Kim",
-                hashed_password=get_password_hash("password123"),
+                hashed_password=password_hash,
                 bio="Data scientist and machine learning enthusiast",
                 skills_to_teach=["Data Science", "Python", "Machine Learning"],
                 skills_to_learn=["Design"],
@@ -66,7 +66,7 @@ def seed_db():
             User(
                 email="john@example.com",
                 name="John Doe",
-                hashed_password=get_password_hash("password123"),
+                hashed_password=password_hash,
                 bio="Passionate learner and teacher. Love sharing knowledge!",
                 skills_to_teach=["JavaScript", "React"],
                 skills_to_learn=["Spanish", "Guitar"],
@@ -76,6 +76,7 @@ def seed_db():
         ]
         
         for user in users:
+            sync_user_tags(user)
             db.add(user)
         db.commit()
         
@@ -153,6 +154,7 @@ def seed_db():
         ]
         
         for skill in skills:
+            sync_skill_availability(skill)
             db.add(skill)
         db.commit()
         
@@ -241,6 +243,7 @@ def seed_db():
         db.close()
 
 if __name__ == "__main__":
+    # For larger, generated datasets use `python -m app.db.generate --users N`
     seed_db()
 
 
@@ -1,13 +1,179 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.core import metrics, revocation
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.idempotency import IdempotencyMiddleware, IdempotencyStore, prune_expired
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.periodic import leader, run_periodically
 from app.api.v1.api import api_router
+from app.services import leaderboard, ledger, ranking, refresh_tokens, session_sweeper
+
+logger = logging.getLogger(__name__)
+
+# Reset when a worker starts serving: with gunicorn's preload the module is imported once, in the master
+STARTED_AT = time.monotonic()
+
+
+async def _seed_leaderboards():
+    try:
+        await asyncio.to_thread(leaderboard.reconcile)
+    except Exception as e:
+        logger.warning(f"Could not seed leaderboards at startup: {e}")
+
+
+async def _load_revocations():
+    try:
+        await asyncio.to_thread(revocation.revocations.refresh)
+    except Exception as e:
+        logger.warning(f"Could not load revoked tokens at startup: {e}")
+
+
+def _prune_tokens():
+    revocation.prune()
+    refresh_tokens.prune_expired()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global STARTED_AT
+    STARTED_AT = time.monotonic()
+    settings.log_configuration()
+    tasks = []
+    # Jobs passed `leader` write shared tables and run in a single process (one
+    # gunicorn worker holds a PostgreSQL advisory lock); the others keep per-process state
+    if settings.RANKING_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            run_periodically("ranking refresh", settings.RANKING_REFRESH_INTERVAL, ranking.refresh_all, leader)
+        ))
+    # Leaderboards are seeded in the background; until then the first request loads them
+    tasks.append(asyncio.create_task(_seed_leaderboards()))
+    if settings.LEADERBOARD_RECONCILE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            run_periodically("leaderboard reconcile", settings.LEADERBOARD_RECONCILE_INTERVAL, leaderboard.reconcile)
+        ))
+    if settings.LEDGER_RECONCILE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            run_periodically(
+                "ledger reconciliation", settings.LEDGER_RECONCILE_INTERVAL, ledger.scheduled_reconcile, leader
+            )
+        ))
+    if settings.SESSION_SWEEP_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            run_periodically(
+                "session sweeper", settings.SESSION_SWEEP_INTERVAL, session_sweeper.scheduled_sweep, leader
+            )
+        ))
+    runner = None
+    if settings.JOBS_ENABLED:
+        from app.core.jobs import JobRunner, parse_queues
+        from app.services import tasks as _handlers  # noqa: F401 (registers the job handlers)
+
+        runner = JobRunner(
+            parse_queues(settings.JOB_QUEUES),
+            poll_interval=settings.JOB_POLL_INTERVAL,
+            stale_after=settings.JOB_STALE_AFTER,
+        )
+        await runner.start()
+    if settings.JOB_RETENTION_DAYS > 0:
+        from app.core.jobs import prune as prune_jobs
+
+        tasks.append(asyncio.create_task(
+            run_periodically("job pruning", 3600, lambda: prune_jobs(settings.JOB_RETENTION_DAYS), leader)
+        ))
+    tasks.append(asyncio.create_task(run_periodically("idempotency key pruning", 3600, prune_expired, leader)))
+    # Until the snapshot is loaded, token checks query revoked_tokens
+    tasks.append(asyncio.create_task(_load_revocations()))
+    if settings.REVOCATION_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            run_periodically("revocation snapshot", settings.REVOCATION_REFRESH_INTERVAL, revocation.revocations.refresh)
+        ))
+    tasks.append(asyncio.create_task(run_periodically("token pruning", 3600, _prune_tokens, leader)))
+    if settings.METRICS_DIR and settings.METRICS_FLUSH_INTERVAL > 0:
+        # Every worker, so a scrape answered by any one of them sees the others' recent values
+        tasks.append(asyncio.create_task(
+            run_periodically("metrics snapshot", settings.METRICS_FLUSH_INTERVAL, metrics.flush)
+        ))
+    dispatcher = None
+    if settings.OUTBOX_ENABLED:
+        from app.core.outbox import OutboxDispatcher, prune
+
+        dispatcher = OutboxDispatcher(
+            poll_interval=settings.OUTBOX_POLL_INTERVAL,
+            batch_size=settings.OUTBOX_BATCH_SIZE,
+            gap_timeout=settings.OUTBOX_GAP_TIMEOUT,
+        )
+        await dispatcher.start()
+        if settings.OUTBOX_RETENTION_DAYS > 0:
+            tasks.append(asyncio.create_task(
+                run_periodically("outbox pruning", 3600, lambda: prune(settings.OUTBOX_RETENTION_DAYS), leader)
+            ))
+    yield
+    if runner is not None:
+        await runner.stop()
+    if dispatcher is not None:
+        await dispatcher.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.to_thread(leader.release)
+    await asyncio.to_thread(metrics.flush)
+
 
 app = FastAPI(
     title="CircleEd API",
     description="Peer-to-peer learning platform API",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Retried booking/messaging POSTs with an Idempotency-Key replay the first response;
+# innermost so stored bodies are uncompressed
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL,
+    max_entries=settings.IDEMPOTENCY_CACHE_SIZE,
+    lock_timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT,
 )
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store, wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT)
+
+# Response compression
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
+# Opt-in profiler: signed X-Profile-Token header or sampling
+if settings.PROFILING_ENABLED:
+    from app.core.profiling import ProfilingMiddleware
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILING_DIR,
+        secret=settings.PROFILING_SECRET,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        max_files=settings.PROFILING_MAX_FILES,
+    )
+
+# Per-caller rate limits; inside CORS so browsers can read the 429
+if settings.RATE_LIMIT_ENABLED:
+    from app.core.ratelimit import RateLimitMiddleware, build_policies, create_bucket_store
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=create_bucket_store(settings.RATE_LIMIT_URL, settings.RATE_LIMIT_MAX_KEYS),
+        policies=build_policies(settings),
+        trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -16,7 +182,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # Named one by one: browsers ignore "*" here when credentials are allowed
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Retry-After", "RateLimit-Policy", "Idempotent-Replayed"],
 )
 
 # Include API routes
@@ -32,8 +199,27 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Answered by whichever worker took the connection, so it doubles as a per-worker liveness probe
+    return {
+        "status": "healthy",
+        "worker": os.getpid(),
+        "uptime_s": round(time.monotonic() - STARTED_AT, 1),
+    }
+
+
+metrics.configure(settings.METRICS_DIR)
 
 
+def _may_scrape(request: Request) -> bool:
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), settings.METRICS_TOKEN)
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1", "localhost")
 
 
+@app.get("/metrics")
+def get_metrics(request: Request):
+    # Collectors query the database, so scrapers must authenticate; this runs in the threadpool
+    if not _may_scrape(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
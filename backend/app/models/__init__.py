@@ -1,17 +1,28 @@
-from app.models.user import User
-from app.models.skill import Skill, SkillReview
+from app.models.user import User, UserSkillTag
+from app.models.skill import Skill, SkillReview, SkillAvailability
 from app.models.session import Session
 from app.models.transaction import Transaction
 from app.models.chat import Chat, Message
+from app.models.job import Job
+from app.models.outbox import OutboxEvent
+from app.models.idempotency import IdempotencyKey
+from app.models.token import RefreshToken, RevokedToken
 
 __all__ = [
     "User",
+    "UserSkillTag",
     "Skill",
     "SkillReview",
+    "SkillAvailability",
     "Session",
     "Transaction",
     "Chat",
     "Message",
+    "Job",
+    "OutboxEvent",
+    "IdempotencyKey",
+    "RefreshToken",
+    "RevokedToken",
 ]
 
 
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary, Index
+from app.core.database import Base
+from datetime import datetime
+
+class IdempotencyKey(Base):
+    """Stored response for an Idempotency-Key; see app.core.idempotency."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)  # sha256 of the token subject, path and the client's key
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request body
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is still running
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from app.core.database import Base
+from datetime import datetime
+
+class Job(Base):
+    """A unit of deferred work; see app.core.jobs."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    queue = Column(String, nullable=False, default="default")
+    name = Column(String, nullable=False)  # registered handler
+    payload = Column(JSON, default=dict)
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Workers claim the oldest due job of their queue
+        Index("ix_jobs_status_queue_run_at", "status", "queue", "run_at"),
+    )
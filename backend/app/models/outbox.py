@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from app.core.database import Base
+from datetime import datetime
+
+class OutboxEvent(Base):
+    """A domain event, written in the transaction of the change it describes; see app.core.outbox."""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)  # delivery order
+    topic = Column(String, nullable=False)  # e.g. "session.completed"
+    key = Column(String, nullable=True)  # id of the changed entity
+    payload = Column(JSON, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Retention pruning
+        Index("ix_outbox_events_created_at", "created_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import enum
@@ -22,12 +22,25 @@ class Session(Base):
     duration_minutes = Column(Integer, default=60)
     review_submitted = Column(Integer, default=0)  # 0 = not reviewed, > 0 = reviewed with rating
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set by the sweeper when a confirmed session is long past and still not completed
+    overdue_at = Column(DateTime, nullable=True)
+    # Set when the completion is added to the student's streak, so a re-run job cannot count it twice
+    streak_counted_at = Column(DateTime, nullable=True)
     
     # Relationships
     skill = relationship("Skill", back_populates="sessions")
     teacher = relationship("User", foreign_keys=[teacher_id], back_populates="sessions_as_teacher")
     student = relationship("User", foreign_keys=[student_id], back_populates="sessions_as_student")
 
+    __table_args__ = (
+        # Conflict checks and free-slot lookups scan one teacher's calendar by time
+        Index("ix_sessions_teacher_id_scheduled_at", "teacher_id", "scheduled_at"),
+        # Recent completions per skill for ranking
+        Index("ix_sessions_skill_id_status_scheduled_at", "skill_id", "status", "scheduled_at"),
+        # Stale pending and past confirmed sessions for the sweeper
+        Index("ix_sessions_status_scheduled_at", "status", "scheduled_at"),
+    )
+
 
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -9,13 +9,15 @@ class Skill(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=False)
-    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     category = Column(String, nullable=False, index=True)
-    level = Column(String, nullable=False)  # Beginner, Intermediate, Advanced
-    language = Column(String, nullable=False, default="English")
+    level = Column(String, nullable=False, index=True)  # Beginner, Intermediate, Advanced
+    language = Column(String, nullable=False, default="English", index=True)
     tokens_per_session = Column(Integer, nullable=False)
     rating = Column(Float, default=0.0)
     review_count = Column(Integer, default=0)
+    recent_completions = Column(Integer, nullable=False, default=0, server_default="0")
+    ranking_score = Column(Float, nullable=False, default=0.0, server_default="0")  # see app.services.ranking
     badges = Column(JSON, default=list)
     availability = Column(JSON, default=list)  # [{day: "Monday", timeSlots: ["10:00 AM", "2:00 PM"]}]
     
@@ -23,6 +25,16 @@ class Skill(Base):
     teacher = relationship("User", back_populates="skills")
     reviews = relationship("SkillReview", back_populates="skill", cascade="all, delete-orphan")
     sessions = relationship("Session", back_populates="skill")
+    availability_slots = relationship("SkillAvailability", back_populates="skill", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Covers the facet GROUP BYs so counts come from the index alone
+        Index("ix_skills_category_level_language", "category", "level", "language"),
+        # Keyset pagination for each catalog sort order
+        Index("ix_skills_ranking_score_id", "ranking_score", "id"),
+        Index("ix_skills_rating_id", "rating", "id"),
+        Index("ix_skills_tokens_per_session_id", "tokens_per_session", "id"),
+    )
 
 class SkillReview(Base):
     __tablename__ = "skill_reviews"
@@ -32,8 +44,35 @@ class SkillReview(Base):
     reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     rating = Column(Integer, nullable=False)  # 1-5
     comment = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
     skill = relationship("Skill", back_populates="reviews")
     reviewer = relationship("User", back_populates="reviews_given")
+
+    __table_args__ = (
+        # Newest-first pages of one skill's reviews
+        Index("ix_skill_reviews_skill_id_created_at_id", "skill_id", "created_at", "id"),
+    )
+
+class SkillAvailability(Base):
+    """One weekly slot from Skill.availability, normalized to UTC.
+
+    weekday is 0 (Monday) to 6, minutes count from UTC midnight and end is
+    exclusive; slots crossing midnight are split in two rows. tz records the
+    zone the slot was entered in.
+    """
+    __tablename__ = "skill_availability"
+
+    id = Column(Integer, primary_key=True, index=True)
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)
+    start_minute = Column(Integer, nullable=False)
+    end_minute = Column(Integer, nullable=False)
+    tz = Column(String, nullable=False, default="UTC")
+
+    skill = relationship("Skill", back_populates="availability_slots")
+
+    __table_args__ = (
+        Index("ix_skill_availability_weekday_start_end", "weekday", "start_minute", "end_minute"),
+    )
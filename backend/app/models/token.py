@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.core.database import Base
+from datetime import datetime
+
+class RefreshToken(Base):
+    """One refresh token of a login; see app.services.refresh_tokens."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # sha256; the token itself is never stored
+    family = Column(String(32), nullable=False, index=True)  # shared by every rotation of one login
+    access_jti = Column(String(32), nullable=True)  # access token issued alongside, revoked with the family
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # rotated: presenting it again means it leaked
+    revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+
+class RevokedToken(Base):
+    """A revoked access token, kept until the token would have expired anyway."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
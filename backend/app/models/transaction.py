@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import enum
@@ -21,6 +21,11 @@ class Transaction(Base):
     # Relationships
     user = relationship("User", back_populates="transactions")
 
+    __table_args__ = (
+        # A user's history, newest first; ledger reconciliation scans it by user id range
+        Index("ix_transactions_user_id_created_at", "user_id", "created_at"),
+    )
+
 
 
 
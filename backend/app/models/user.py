@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text
+from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy import JSON
 from app.core.database import Base
@@ -26,4 +26,20 @@ class User(Base):
     transactions = relationship("Transaction", back_populates="user")
     chats_initiated = relationship("Chat", foreign_keys="Chat.user1_id", back_populates="user1")
     chats_received = relationship("Chat", foreign_keys="Chat.user2_id", back_populates="user2")
+    skill_tags = relationship("UserSkillTag", back_populates="user", cascade="all, delete-orphan")
+
+class UserSkillTag(Base):
+    """One normalized entry of skills_to_teach (kind="teach") or skills_to_learn (kind="learn")."""
+    __tablename__ = "user_skill_tags"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    tag = Column(String, primary_key=True)
+
+    user = relationship("User", back_populates="skill_tags")
+
+    __table_args__ = (
+        # Matching looks up everyone teaching/learning a tag
+        Index("ix_user_skill_tags_kind_tag_user_id", "kind", "tag", "user_id"),
+    )
 
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class MessageBase(BaseModel):
     content: str
@@ -36,5 +36,4 @@ class ChatCreate(BaseModel):
     user_id: int
 
 
-
-
+MessageListAdapter = TypeAdapter(List[Message])
@@ -0,0 +1,25 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class LeaderboardName(str, Enum):
+    STREAK = "streak"
+    TOKENS_EARNED = "tokens_earned"
+    SESSIONS_TAUGHT = "sessions_taught"
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    score: int
+
+
+class Leaderboard(BaseModel):
+    board: LeaderboardName
+    total: int  # users with a non-zero score
+    entries: List[LeaderboardEntry]
+    me: Optional[LeaderboardEntry] = None
@@ -17,6 +17,7 @@ class Session(SessionBase):
     status: str
     review_submitted: int = 0
     created_at: datetime
+    overdue_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
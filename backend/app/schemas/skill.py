@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Optional, List, Dict
 from app.schemas.user import User
 from datetime import datetime
@@ -35,6 +35,23 @@ class Skill(SkillBase):
     class Config:
         from_attributes = True
 
+class SkillFacets(BaseModel):
+    category: Dict[str, int] = {}
+    level: Dict[str, int] = {}
+    language: Dict[str, int] = {}
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class ReviewerSummary(BaseModel):
+    """The part of a reviewer's profile shown next to a review."""
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: int
+    full_name: str = Field(validation_alias="name")
+    avatar_url: Optional[str] = None
+
 class SkillReviewBase(BaseModel):
     rating: int
     comment: Optional[str] = None
@@ -46,12 +63,15 @@ class SkillReview(SkillReviewBase):
     id: int
     skill_id: int
     reviewer_id: int
-    reviewer: Optional[User] = None
+    reviewer: Optional[ReviewerSummary] = None
     created_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
 
-
-
+# Prebuilt adapters for serializing list responses straight to JSON bytes
+SkillAdapter = TypeAdapter(Skill)
+SkillFacetsAdapter = TypeAdapter(SkillFacets)
+SkillListAdapter = TypeAdapter(List[Skill])
+SkillReviewListAdapter = TypeAdapter(List[SkillReview])
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from typing import List
 from datetime import datetime
 
 class TransactionBase(BaseModel):
@@ -18,5 +19,4 @@ class Transaction(TransactionBase):
         from_attributes = True
 
 
-
-
+TransactionListAdapter = TypeAdapter(List[Transaction])
@@ -43,6 +43,16 @@ class User(BaseModel):
     skills_to_learn: List[str] = []
 
 
+class UserMatch(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    user: User
+    score: float
+    teaches: List[str] = []  # their skills_to_teach that I want to learn
+    learns: List[str] = []  # their skills_to_learn that I teach
+    mutual: bool = False
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str = Field(..., min_length=8)
@@ -0,0 +1,169 @@
+"""Normalized skill availability.
+
+`Skill.availability` stays the JSON the frontend edits
+(`[{"day": "Monday", "timeSlots": ["10:00 AM"]}]`); every save mirrors it into
+`skill_availability` rows in UTC so "who is free at T" is an indexed query.
+"""
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import and_, exists, or_, select
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.models.skill import Skill as SkillModel, SkillAvailability as SkillAvailabilityModel
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MINUTES_PER_DAY = 24 * 60
+TIME_FORMATS = ("%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M")
+
+# (weekday, start_minute, end_minute) in UTC, end exclusive
+Window = Tuple[int, int, int]
+
+
+def parse_time(value: str) -> Optional[int]:
+    """Minutes after midnight for "10:00 AM"-style strings, None if unparseable."""
+    text = str(value).strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    return None
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+@lru_cache(maxsize=4096)
+def _to_utc(weekday: int, minute: int, tz: str, today: date) -> Tuple[int, int]:
+    # Offsets are taken for the coming occurrence of that weekday, so a DST
+    # change shifts slots when the skill is next saved or backfilled.
+    day = today + timedelta(days=(weekday - today.weekday()) % 7)
+    local = datetime.combine(day, time(0), tzinfo=_zone(tz)) + timedelta(minutes=minute)
+    utc = local.astimezone(timezone.utc)
+    return utc.weekday(), utc.hour * 60 + utc.minute
+
+
+def slot_rows(availability, default_tz: Optional[str] = None,
+              slot_minutes: Optional[int] = None) -> List[Tuple[int, int, int, str]]:
+    """(weekday, start_minute, end_minute, tz) rows for an availability JSON list.
+
+    Unknown days and unparseable times are skipped; slots crossing UTC midnight
+    are split at midnight.
+    """
+    default_tz = default_tz or settings.AVAILABILITY_TIMEZONE
+    slot_minutes = slot_minutes or settings.AVAILABILITY_SLOT_MINUTES
+    today = date.today()
+    rows = set()
+    for entry in availability or []:
+        if not isinstance(entry, dict):
+            continue
+        day = str(entry.get("day", "")).strip().lower()
+        if day not in WEEKDAYS:
+            continue
+        tz = entry.get("timezone") or default_tz
+        for slot in entry.get("timeSlots") or []:
+            minute = parse_time(slot)
+            if minute is None:
+                continue
+            weekday, start = _to_utc(WEEKDAYS.index(day), minute, tz, today)
+            end = start + slot_minutes
+            if end <= MINUTES_PER_DAY:
+                rows.add((weekday, start, end, tz))
+            else:
+                rows.add((weekday, start, MINUTES_PER_DAY, tz))
+                rows.add(((weekday + 1) % 7, 0, end - MINUTES_PER_DAY, tz))
+    return sorted(rows)
+
+
+def sync_skill_availability(skill: SkillModel):
+    """Replace the skill's normalized rows with ones derived from its JSON."""
+    skill.availability_slots = [
+        SkillAvailabilityModel(weekday=weekday, start_minute=start, end_minute=end, tz=tz)
+        for weekday, start, end, tz in slot_rows(skill.availability)
+    ]
+
+
+def backfill(conn: Connection) -> int:
+    """Create rows for skills that have none yet (databases created before the table)."""
+    missing = conn.execute(
+        select(SkillModel.id, SkillModel.availability).where(
+            ~exists().where(SkillAvailabilityModel.skill_id == SkillModel.id)
+        )
+    ).all()
+    rows = [
+        {"skill_id": skill_id, "weekday": weekday, "start_minute": start, "end_minute": end, "tz": tz}
+        for skill_id, availability in missing
+        for weekday, start, end, tz in slot_rows(availability)
+    ]
+    if rows:
+        conn.execute(SkillAvailabilityModel.__table__.insert(), rows)
+    return len(rows)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive datetimes are taken to be UTC, like every other timestamp in the API
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def windows_between(start: datetime, end: datetime) -> List[Window]:
+    """Split [start, end) into per-weekday minute ranges."""
+    start, end = _as_utc(start), _as_utc(end)
+    if end - start >= timedelta(days=7):
+        return [(weekday, 0, MINUTES_PER_DAY) for weekday in range(7)]
+    windows = []
+    day = datetime.combine(start.date(), time(0))
+    while day < end:
+        low = max(start, day) - day
+        high = min(end, day + timedelta(days=1)) - day
+        windows.append((day.weekday(), int(low.total_seconds() // 60), math.ceil(high.total_seconds() / 60)))
+        day += timedelta(days=1)
+    return windows
+
+
+def windows_at(moment: datetime) -> List[Window]:
+    moment = _as_utc(moment)
+    minute = moment.hour * 60 + moment.minute
+    return [(moment.weekday(), minute, minute + 1)]
+
+
+def parse_interval(value: str) -> Tuple[datetime, datetime]:
+    """Parse an ISO 8601 "<start>/<end>" interval."""
+    start, sep, end = value.partition("/")
+    if not sep:
+        raise ValueError("expected <start>/<end>")
+    start_at, end_at = datetime.fromisoformat(start.strip()), datetime.fromisoformat(end.strip())
+    if _as_utc(end_at) <= _as_utc(start_at):
+        raise ValueError("end must be after start")
+    return start_at, end_at
+
+
+def available_clause(windows: Sequence[Window]):
+    """EXISTS clause matching skills with a slot overlapping any of the windows."""
+    return exists().where(
+        SkillAvailabilityModel.skill_id == SkillModel.id,
+        or_(*(
+            and_(
+                SkillAvailabilityModel.weekday == weekday,
+                SkillAvailabilityModel.start_minute < end,
+                SkillAvailabilityModel.end_minute > start,
+            )
+            for weekday, start, end in windows
+        )),
+    )
+
+
+def windows_key(windows: Iterable[Window]) -> str:
+    return ";".join(f"{weekday}:{start}-{end}" for weekday, start, end in windows)
@@ -0,0 +1,170 @@
+"""In-memory leaderboards.
+
+Each board keeps `(-score, user_id)` pairs in a sorted list, so top-N is a
+slice and a user's rank is one bisect (O(log n)). Boards are loaded from the
+database at startup (or on first use), bumped in place from outbox events,
+and rebuilt every LEADERBOARD_RECONCILE_INTERVAL seconds.
+
+Boards are per process; every worker applies the `session.completed` and
+`user.streak_changed` outbox events, so all of them see every update. A
+board remembers the last event id it reflects: a reload records the outbox
+position of the snapshot it read, and events at or below it (or delivered
+again) are not applied a second time.
+"""
+import logging
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.database import SessionLocal
+from app.core.outbox import Event, consumer
+from app.models.outbox import OutboxEvent as OutboxEventModel
+from app.models.session import Session as SessionModel
+from app.models.transaction import Transaction as TransactionModel
+from app.models.user import User as UserModel
+from app.services.ledger import TEACHING_EARNING_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class Board:
+    def __init__(self, name: str, load: Callable[[SQLSession], Dict[int, int]]):
+        self.name = name
+        self._load = load
+        self._scores: Dict[int, int] = {}
+        self._order: List[Tuple[int, int]] = []  # (-score, user_id): best first
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.position = 0  # id of the last outbox event reflected in the scores
+
+    def reload(self, db: SQLSession):
+        scores = {user_id: int(score) for user_id, score in self._load(db).items() if score and score > 0}
+        order = sorted((-score, user_id) for user_id, score in scores.items())
+        # Read after the scores: an event committed in between is missed until the next
+        # reconcile rather than counted twice (reconcile reads both from one snapshot on PostgreSQL)
+        position = db.query(func.max(OutboxEventModel.id)).scalar() or 0
+        with self._lock:
+            self._scores, self._order = scores, order
+            self.position = position
+            self.loaded = True
+
+    def apply(self, event_id: int, update: Callable[[], None]) -> bool:
+        """Run `update` for an outbox event unless the board already reflects it."""
+        with self._lock:
+            if event_id <= self.position:
+                return False
+            update()
+            self.position = event_id
+            return True
+
+    def set(self, user_id: int, score: int):
+        with self._lock:
+            old = self._scores.pop(user_id, None)
+            if old is not None:
+                del self._order[bisect_left(self._order, (-old, user_id))]
+            if score > 0:
+                self._scores[user_id] = score
+                insort(self._order, (-score, user_id))
+
+    def add(self, user_id: int, delta: int):
+        with self._lock:
+            self.set(user_id, self._scores.get(user_id, 0) + delta)
+
+    def top(self, n: int) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, score) for the first n users; tied scores share a rank."""
+        with self._lock:
+            head = self._order[:n]
+        entries, rank = [], 0
+        for position, (negative, user_id) in enumerate(head, start=1):
+            if not entries or -negative != entries[-1][2]:
+                rank = position
+            entries.append((rank, user_id, -negative))
+        return entries
+
+    def rank(self, user_id: int) -> Tuple[int, int]:
+        """(rank, score); users not on the board share the last rank with score 0."""
+        with self._lock:
+            score = self._scores.get(user_id, 0)
+            if score <= 0:
+                return len(self._order) + 1, 0
+            return bisect_left(self._order, (-score, float("-inf"))) + 1, score
+
+    def __len__(self):
+        return len(self._order)
+
+
+def _streaks(db: SQLSession) -> Dict[int, int]:
+    return dict(db.query(UserModel.id, UserModel.streak).filter(UserModel.streak > 0).all())
+
+
+def _tokens_earned(db: SQLSession) -> Dict[int, int]:
+    # What teachers were actually paid, not the skills' current prices
+    return dict(
+        db.query(TransactionModel.user_id, func.sum(TransactionModel.amount))
+        .filter(TransactionModel.type == "earn", TransactionModel.description.startswith(TEACHING_EARNING_PREFIX))
+        .group_by(TransactionModel.user_id)
+        .all()
+    )
+
+
+def _sessions_taught(db: SQLSession) -> Dict[int, int]:
+    return dict(
+        db.query(SessionModel.teacher_id, func.count(SessionModel.id))
+        .filter(SessionModel.status == "completed")
+        .group_by(SessionModel.teacher_id)
+        .all()
+    )
+
+
+BOARDS: Dict[str, Board] = {
+    "streak": Board("streak", _streaks),
+    "tokens_earned": Board("tokens_earned", _tokens_earned),
+    "sessions_taught": Board("sessions_taught", _sessions_taught),
+}
+
+
+def get_board(name: str, db: Optional[SQLSession] = None) -> Board:
+    """The named board, loading it with `db` if startup seeding has not happened yet."""
+    board = BOARDS[name]
+    if not board.loaded and db is not None:
+        board.reload(db)
+    return board
+
+
+def reconcile():
+    """Rebuild every board from the database (startup and periodic job)."""
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            # One snapshot for the scores and the outbox position
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        for board in BOARDS.values():
+            board.reload(db)
+    finally:
+        db.close()
+    logger.info("Leaderboards reconciled: " + ", ".join(f"{b.name}={len(b)}" for b in BOARDS.values()))
+
+
+def record_completion(event_id: int, teacher_id: int, tokens: int):
+    """Apply a committed complete_session to the loaded boards."""
+    for name, delta in (("tokens_earned", tokens), ("sessions_taught", 1)):
+        board = BOARDS[name]
+        if board.loaded:
+            board.apply(event_id, lambda: board.add(teacher_id, delta))
+
+
+def record_streak(event_id: int, user_id: int, streak: int):
+    board = BOARDS["streak"]
+    if board.loaded:
+        board.apply(event_id, lambda: board.set(user_id, streak))
+
+
+@consumer("leaderboards", "session.completed", "user.streak_changed")
+def apply_event(event: Event):
+    if event.topic == "session.completed":
+        record_completion(event.id, event.payload["teacher_id"], event.payload["tokens"])
+    else:
+        record_streak(event.id, int(event.key), event.payload["streak"])
@@ -0,0 +1,249 @@
+"""
+Token ledger reconciliation: users.token_balance against the transactions.
+
+A user's balance should equal their earn transactions minus their spend
+transactions (the starting grant is a "Welcome bonus" earn). Write paths
+update both, but separately, so reconcile() checks that they still agree.
+
+The user id space is cut into ranges of `batch_size` ids. Each range is
+one aggregate query: per-user sums over the range's transactions (a range
+scan of the user_id index) joined to the users' balances, so a batch is
+`batch_size` small rows however many transactions there are. Ranges run
+on a thread pool, one connection each, and the database does the summing;
+no transaction is ever loaded.
+
+Repair is explicit and comes in two flavours:
+
+* "ledger" (balances are right, e.g. grants that were never recorded):
+  append an adjustment transaction for the difference;
+* "balance" (the ledger is right): set token_balance to the ledger sum.
+
+Each repair re-reads the user's numbers in its own transaction with the
+user row locked, so a change that landed after the scan is not undone.
+
+Users who registered before the starting grant was recorded have no
+welcome bonus row; init_db backfills it, and until that has run the
+scheduled check is skipped rather than report (or "repair") every
+account by STARTING_BALANCE.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import case, exists, func, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.transaction import Transaction as TransactionModel
+from app.models.user import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+REPAIR_MODES = ("ledger", "balance")
+ADJUSTMENT_DESCRIPTION = "Ledger adjustment"
+WELCOME_BONUS_DESCRIPTION = "Welcome bonus"
+# Followed by the skill title on the earn transaction paid for a completed session
+TEACHING_EARNING_PREFIX = "Earned from teaching "
+# The users.token_balance column default: what every account starts with
+STARTING_BALANCE = UserModel.__table__.c.token_balance.default.arg
+
+drift_users = metrics.gauge(
+    "ledger_drift_users", "Users whose balance disagreed with their transactions at the last reconciliation",
+    per_process=False,
+)
+drift_tokens = metrics.gauge(
+    "ledger_drift_tokens", "Sum of absolute balance drift at the last reconciliation", per_process=False
+)
+repairs = metrics.counter("ledger_repairs_total", "Balances or ledgers repaired by reconciliation")
+
+
+class Drift(NamedTuple):
+    user_id: int
+    balance: int
+    ledger: int  # earn - spend
+    transactions: int
+
+    @property
+    def difference(self) -> int:
+        return self.balance - self.ledger
+
+
+class Reconciliation(NamedTuple):
+    users: int
+    transactions: int
+    drifts: List[Drift]
+    repaired: int
+    seconds: float
+
+
+_signed_amount = case(
+    (TransactionModel.type == "earn", TransactionModel.amount),
+    (TransactionModel.type == "spend", -TransactionModel.amount),
+    else_=0,
+)
+
+
+def _sums(low: int, high: int):
+    return (
+        select(
+            TransactionModel.user_id.label("user_id"),
+            func.sum(_signed_amount).label("ledger"),
+            func.count().label("transactions"),
+        )
+        .where(TransactionModel.user_id.between(low, high))
+        .group_by(TransactionModel.user_id)
+        .subquery()
+    )
+
+
+def _missing_welcome_bonus():
+    return ~exists().where(
+        TransactionModel.user_id == UserModel.id,
+        TransactionModel.description == WELCOME_BONUS_DESCRIPTION,
+    )
+
+
+def backfill_welcome_bonus(conn: Connection) -> int:
+    """Record the starting grant of users who have no welcome bonus row (registered before it was written)."""
+    first_activity = (
+        select(func.min(TransactionModel.created_at))
+        .where(TransactionModel.user_id == UserModel.id)
+        .scalar_subquery()
+    )
+    return conn.execute(
+        TransactionModel.__table__.insert().from_select(
+            ["user_id", "type", "amount", "description", "created_at"],
+            select(
+                UserModel.id,
+                literal("earn"),
+                literal(STARTING_BALANCE),
+                literal(WELCOME_BONUS_DESCRIPTION),
+                func.coalesce(first_activity, literal(datetime.utcnow())),
+            ).where(_missing_welcome_bonus()),
+        )
+    ).rowcount
+
+
+def welcome_bonus_backfilled(db: SQLSession) -> bool:
+    return db.query(UserModel.id).filter(_missing_welcome_bonus()).first() is None
+
+
+def check_range(low: int, high: int) -> Tuple[int, int, List[Drift]]:
+    """(users, transactions, drifts) for user ids low..high inclusive."""
+    sums = _sums(low, high)
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(
+                UserModel.id,
+                func.coalesce(UserModel.token_balance, 0),
+                func.coalesce(sums.c.ledger, 0),
+                func.coalesce(sums.c.transactions, 0),
+            )
+            .outerjoin(sums, sums.c.user_id == UserModel.id)
+            .where(UserModel.id.between(low, high))
+        ).all()
+    finally:
+        db.close()
+    drifts = [Drift(user_id, int(balance), int(ledger), count) for user_id, balance, ledger, count in rows
+              if balance != ledger]
+    return len(rows), sum(row[3] for row in rows), sorted(drifts)
+
+
+def id_ranges(batch_size: int) -> Iterator[Tuple[int, int]]:
+    db = SessionLocal()
+    try:
+        low, high = db.query(func.min(UserModel.id), func.max(UserModel.id)).one()
+    finally:
+        db.close()
+    if low is None:
+        return
+    for start in range(low, high + 1, batch_size):
+        yield start, min(start + batch_size - 1, high)
+
+
+def repair(db: SQLSession, user_id: int, mode: str) -> Optional[Drift]:
+    """Re-check one user with their row locked and fix any drift; returns what was fixed."""
+    user = db.query(UserModel).filter(UserModel.id == user_id).with_for_update().first()
+    if user is None:
+        return None
+    ledger, count = db.query(
+        func.coalesce(func.sum(_signed_amount), 0), func.count(TransactionModel.id)
+    ).filter(TransactionModel.user_id == user_id).one()
+    drift = Drift(user_id, user.token_balance or 0, int(ledger), count)
+    if drift.difference == 0:
+        return None
+    if mode == "balance":
+        user.token_balance = drift.ledger
+    else:
+        db.add(TransactionModel(
+            user_id=user_id,
+            type="earn" if drift.difference > 0 else "spend",
+            amount=abs(drift.difference),
+            description=ADJUSTMENT_DESCRIPTION,
+            created_at=datetime.utcnow(),
+        ))
+    repairs.inc(mode=mode)
+    return drift
+
+
+def reconcile(batch_size: int = 10000, workers: int = 4, repair_mode: Optional[str] = None) -> Reconciliation:
+    """Check every user's balance against their transactions, optionally repairing drift."""
+    if repair_mode is not None and repair_mode not in REPAIR_MODES:
+        raise ValueError(f"repair mode must be one of {REPAIR_MODES}")
+    started = time.perf_counter()
+    users = transactions = 0
+    drifts: List[Drift] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for range_users, range_transactions, range_drifts in pool.map(
+            lambda bounds: check_range(*bounds), id_ranges(batch_size)
+        ):
+            users += range_users
+            transactions += range_transactions
+            drifts.extend(range_drifts)
+
+    repaired = 0
+    if repair_mode is not None:
+        for drift in drifts:
+            db = SessionLocal()
+            try:
+                if repair(db, drift.user_id, repair_mode) is not None:
+                    repaired += 1
+                db.commit()
+            finally:
+                db.close()
+
+    drift_users.set(len(drifts))
+    drift_tokens.set(sum(abs(drift.difference) for drift in drifts))
+    return Reconciliation(users, transactions, drifts, repaired, time.perf_counter() - started)
+
+
+def scheduled_reconcile():
+    """Periodic run from the app lifespan; logs drift and repairs if LEDGER_AUTO_REPAIR is set."""
+    db = SessionLocal()
+    try:
+        backfilled = welcome_bonus_backfilled(db)
+    finally:
+        db.close()
+    if not backfilled:
+        logger.warning("Ledger reconciliation skipped: some users have no welcome bonus row; run python -m app.db.init_db")
+        return
+    result = reconcile(
+        batch_size=settings.LEDGER_BATCH_SIZE,
+        workers=settings.LEDGER_WORKERS,
+        repair_mode=settings.LEDGER_AUTO_REPAIR or None,
+    )
+    message = (
+        f"Ledger reconciled: {result.users} users, {result.transactions} transactions, "
+        f"{len(result.drifts)} drifted, {result.repaired} repaired in {result.seconds:.1f}s"
+    )
+    if result.drifts:
+        sample = ", ".join(f"user {d.user_id}: {d.difference:+d}" for d in result.drifts[:10])
+        logger.warning(f"{message} ({sample})")
+    else:
+        logger.info(message)
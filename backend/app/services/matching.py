@@ -0,0 +1,150 @@
+"""Match learners with teachers and skill-exchange partners.
+
+skills_to_teach / skills_to_learn are mirrored into `user_skill_tags`, an
+inverted index keyed by (kind, tag). Finding matches for a user reads only
+the index entries for their own tags, never the users table as a whole:
+
+1. one grouped query over the index counts, per candidate, how many of my
+   wanted tags they teach and how many of my offered tags they want; the
+   best MATCH_CANDIDATE_POOL by overlap are kept,
+2. one grouped query over their skills gives a review-weighted rating,
+3. candidates are scored in Python and the top K users are loaded.
+"""
+import heapq
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.config import settings
+from app.models.skill import Skill as SkillModel
+from app.models.user import User as UserModel, UserSkillTag as UserSkillTagModel
+
+TEACH = "teach"
+LEARN = "learn"
+
+# Scoring weights: a teacher for something I want counts most, someone who
+# wants what I teach makes it an exchange, and skill quality breaks ties
+TEACH_WEIGHT = 1.0
+LEARN_WEIGHT = 0.5
+MUTUAL_BONUS = 1.0
+QUALITY_WEIGHT = 0.5
+# Reviews needed before a teacher's rating counts fully
+RATING_PRIOR_REVIEWS = 5
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(str(tag).split()).lower()
+
+
+def tag_rows(user: UserModel) -> Set[Tuple[str, str]]:
+    rows = set()
+    for kind, tags in ((TEACH, user.skills_to_teach), (LEARN, user.skills_to_learn)):
+        for tag in tags or []:
+            normalized = normalize_tag(tag)
+            if normalized:
+                rows.add((kind, normalized))
+    return rows
+
+
+def sync_user_tags(user: UserModel):
+    """Replace the user's index entries with ones derived from their profile."""
+    user.skill_tags = [UserSkillTagModel(kind=kind, tag=tag) for kind, tag in sorted(tag_rows(user))]
+
+
+def backfill(conn: Connection) -> int:
+    """Index users that have no entries yet (databases created before the table)."""
+    indexed = select(UserSkillTagModel.user_id).where(UserSkillTagModel.user_id == UserModel.id).exists()
+    missing = conn.execute(
+        select(UserModel.id, UserModel.skills_to_teach, UserModel.skills_to_learn).where(~indexed)
+    ).all()
+    rows = [
+        {"user_id": user_id, "kind": kind, "tag": tag}
+        for user_id, teach, learn in missing
+        for kind, tag in tag_rows(UserModel(skills_to_teach=teach, skills_to_learn=learn))
+    ]
+    if rows:
+        conn.execute(UserSkillTagModel.__table__.insert(), rows)
+    return len(rows)
+
+
+class Match(NamedTuple):
+    user: UserModel
+    score: float
+    teaches: List[str]
+    learns: List[str]
+
+    @property
+    def mutual(self) -> bool:
+        return bool(self.teaches and self.learns)
+
+
+def _quality(rating: float, reviews: int) -> float:
+    """Rating in [0, 1], shrunk towards 0 for teachers with few reviews."""
+    reviews = reviews or 0
+    return (rating or 0.0) / 5.0 * reviews / (reviews + RATING_PRIOR_REVIEWS)
+
+
+def _overlap(tags: Iterable[str], wanted: Set[str]) -> List[str]:
+    return [tag for tag in tags or [] if normalize_tag(tag) in wanted]
+
+
+def find_matches(db: SQLSession, user: UserModel, limit: int = 20) -> List[Match]:
+    own = tag_rows(user)
+    wanted = {tag for kind, tag in own if kind == LEARN}
+    offered = {tag for kind, tag in own if kind == TEACH}
+    if not wanted and not offered:
+        return []
+
+    tags = UserSkillTagModel
+    teaches = func.sum(case((tags.kind == TEACH, 1), else_=0))
+    learns = func.sum(case((tags.kind == LEARN, 1), else_=0))
+    conditions = []
+    if wanted:
+        conditions.append(and_(tags.kind == TEACH, tags.tag.in_(wanted)))
+    if offered:
+        conditions.append(and_(tags.kind == LEARN, tags.tag.in_(offered)))
+    overlap = (
+        db.query(tags.user_id, teaches, learns)
+        .filter(or_(*conditions), tags.user_id != user.id)
+        .group_by(tags.user_id)
+        .order_by((teaches * TEACH_WEIGHT + learns * LEARN_WEIGHT).desc(), tags.user_id)
+        .limit(settings.MATCH_CANDIDATE_POOL)
+        .all()
+    )
+    if not overlap:
+        return []
+
+    candidate_ids = [user_id for user_id, _, _ in overlap]
+    quality: Dict[int, float] = {
+        teacher_id: _quality(rating, reviews)
+        for teacher_id, rating, reviews in db.query(
+            SkillModel.teacher_id, func.max(SkillModel.rating), func.sum(SkillModel.review_count)
+        ).filter(SkillModel.teacher_id.in_(candidate_ids)).group_by(SkillModel.teacher_id)
+    }
+
+    def score(row) -> float:
+        user_id, teach_count, learn_count = row
+        value = teach_count * TEACH_WEIGHT + learn_count * LEARN_WEIGHT
+        if teach_count and learn_count:
+            value += MUTUAL_BONUS
+        return value + QUALITY_WEIGHT * quality.get(user_id, 0.0)
+
+    best = heapq.nlargest(limit, overlap, key=lambda row: (score(row), -row[0]))
+    users = {
+        candidate.id: candidate
+        for candidate in db.query(UserModel).filter(
+            UserModel.id.in_([row[0] for row in best]), UserModel.is_active.isnot(False)
+        )
+    }
+    return [
+        Match(
+            user=users[row[0]],
+            score=round(score(row), 4),
+            teaches=_overlap(users[row[0]].skills_to_teach, wanted),
+            learns=_overlap(users[row[0]].skills_to_learn, offered),
+        )
+        for row in best
+        if row[0] in users
+    ]
@@ -0,0 +1,36 @@
+"""Upgrading stored password hashes as users log in."""
+import logging
+
+from sqlalchemy import update
+
+from app.core import metrics
+from app.core.database import SessionLocal
+from app.core.security import get_password_hash
+from app.models.user import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+rehashed = metrics.counter("password_rehashes_total", "Outdated password hashes replaced after a login")
+
+
+def rehash_password(user_id: int, password: str, old_hash: str):
+    """Replace `old_hash` with a current hash of the just-verified password.
+
+    Runs after the login response is sent: the plain password only exists in
+    that request, so this cannot go through the (persistent) job queue.
+    """
+    new_hash = get_password_hash(password)
+    db = SessionLocal()
+    try:
+        # Compare-and-set, so a password changed in the meantime is not overwritten
+        updated = db.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id, UserModel.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if updated:
+        rehashed.inc()
+        logger.info(f"Upgraded password hash of user {user_id}")
@@ -0,0 +1,77 @@
+"""Stored ranking score behind `GET /skills?sort=top`.
+
+ranking_score is a Bayesian average of the skill's reviews (pulled towards
+PRIOR_MEAN until it has a few reviews) plus a saturating boost for sessions
+completed in the last RANKING_RECENT_DAYS. It is updated in place when a
+review or completion happens; `refresh_scores` recomputes every skill in two
+set-based UPDATEs so completions age out of the window.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.session import Session as SessionModel
+from app.models.skill import Skill as SkillModel
+from app.services import skill_cache
+
+logger = logging.getLogger(__name__)
+
+PRIOR_MEAN = 3.5
+PRIOR_REVIEWS = 10.0
+COMPLETION_WEIGHT = 1.0
+# Recent completions at which the boost reaches half of COMPLETION_WEIGHT
+COMPLETION_HALF = 5.0
+
+
+def ranking_score(rating, review_count, recent_completions):
+    """Works on plain numbers and on SQL column expressions alike."""
+    bayesian = (PRIOR_REVIEWS * PRIOR_MEAN + rating * review_count) / (PRIOR_REVIEWS + review_count)
+    return bayesian + COMPLETION_WEIGHT * recent_completions / (recent_completions + COMPLETION_HALF)
+
+
+def record_completion(db: SQLSession, skill_id: int, count: int = 1):
+    recent = SkillModel.recent_completions + count
+    db.execute(
+        update(SkillModel)
+        .where(SkillModel.id == skill_id)
+        .values(
+            recent_completions=recent,
+            ranking_score=ranking_score(
+                func.coalesce(SkillModel.rating, 0.0), func.coalesce(SkillModel.review_count, 0), recent
+            ),
+        )
+    )
+
+
+def refresh_scores(db: SQLSession):
+    cutoff = datetime.utcnow() - timedelta(days=settings.RANKING_RECENT_DAYS)
+    recent = (
+        select(func.count(SessionModel.id))
+        .where(
+            SessionModel.skill_id == SkillModel.id,
+            SessionModel.status == "completed",
+            SessionModel.scheduled_at >= cutoff,
+        )
+        .scalar_subquery()
+    )
+    db.execute(update(SkillModel).values(recent_completions=recent))
+    db.execute(update(SkillModel).values(ranking_score=ranking_score(
+        func.coalesce(SkillModel.rating, 0.0), func.coalesce(SkillModel.review_count, 0),
+        SkillModel.recent_completions,
+    )))
+
+
+def refresh_all():
+    """Periodic job: recompute every score in its own session."""
+    db = SessionLocal()
+    try:
+        refresh_scores(db)
+        db.commit()
+    finally:
+        db.close()
+    skill_cache.invalidate_lists()
+    logger.info("Skill ranking scores refreshed")
@@ -0,0 +1,123 @@
+"""
+Refresh tokens: renewing an access token without the password.
+
+Login issues a pair: a short-lived JWT access token and an opaque refresh
+token stored only as its sha256. POST /auth/refresh trades the refresh
+token for a new pair and marks the old one used (rotation), so each refresh
+token works once and renewal never runs bcrypt.
+
+All rotations of one login share a family. A used token presented again
+was copied, so its whole family is revoked, together with the access tokens
+issued alongside, and the user has to log in again. Reuse within
+REFRESH_REUSE_GRACE seconds of the rotation is only refused, with
+ConcurrentRefresh: that is a client (two tabs, say) sending the same
+refresh twice, and it keeps the tokens the other refresh got.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.revocation import revoke
+from app.core.security import create_access_token, hash_token, new_refresh_token
+from app.models.token import RefreshToken as RefreshTokenModel
+from app.models.user import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentRefresh(ValueError):
+    """The refresh token was rotated moments ago by another request of the same client."""
+
+
+def issue(db: SQLSession, user: UserModel, family: Optional[str] = None) -> dict:
+    """A new access/refresh token pair; written when the caller commits."""
+    jti = uuid.uuid4().hex
+    refresh_token = new_refresh_token()
+    db.add(RefreshTokenModel(
+        user_id=user.id,
+        token_hash=hash_token(refresh_token),
+        family=family or uuid.uuid4().hex,
+        access_jti=jti,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return {
+        "access_token": create_access_token(data={"sub": user.email, "jti": jti}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def rotate(db: SQLSession, refresh_token: str) -> Optional[dict]:
+    """Trade a refresh token for a new pair and commit; None if it is not valid (any more).
+
+    Raises ConcurrentRefresh for a token rotated less than REFRESH_REUSE_GRACE seconds ago.
+    """
+    now = datetime.utcnow()
+    token = db.query(RefreshTokenModel).filter(RefreshTokenModel.token_hash == hash_token(refresh_token)).first()
+    if token is None or token.revoked_at is not None or token.expires_at <= now:
+        return None
+
+    # Conditional update, so of two concurrent refreshes only one rotates
+    claimed = db.query(RefreshTokenModel).filter(
+        RefreshTokenModel.id == token.id, RefreshTokenModel.used_at.is_(None)
+    ).update({RefreshTokenModel.used_at: now}, synchronize_session=False)
+    if not claimed:
+        db.refresh(token)
+        if token.used_at is None:
+            return None
+        if now - token.used_at <= timedelta(seconds=settings.REFRESH_REUSE_GRACE):
+            raise ConcurrentRefresh("refresh token was just rotated")
+        logger.warning(f"Refresh token reuse for user {token.user_id}, revoking family {token.family}")
+        revoke_family(db, token.family)
+        db.commit()
+        return None
+
+    user = db.get(UserModel, token.user_id)
+    if user is None:
+        db.rollback()
+        return None
+    tokens = issue(db, user, family=token.family)
+    db.commit()
+    return tokens
+
+
+def revoke_family(db: SQLSession, family: str):
+    """Revoke every refresh token of a login and the access tokens issued with them."""
+    now = datetime.utcnow()
+    lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    tokens = db.query(RefreshTokenModel).filter(
+        RefreshTokenModel.family == family, RefreshTokenModel.revoked_at.is_(None)
+    ).all()
+    for token in tokens:
+        token.revoked_at = now
+        if token.access_jti and token.created_at + lifetime > now:
+            revoke(db, token.access_jti, token.created_at + lifetime)
+
+
+def logout(db: SQLSession, access_jti: Optional[str], access_expires_at: Optional[datetime],
+           refresh_token: Optional[str] = None):
+    """Revoke the presented access token and the refresh token's login, then commit."""
+    if access_jti and access_expires_at:
+        revoke(db, access_jti, access_expires_at)
+    if refresh_token:
+        token = db.query(RefreshTokenModel).filter(RefreshTokenModel.token_hash == hash_token(refresh_token)).first()
+        if token is not None:
+            revoke_family(db, token.family)
+    db.commit()
+
+
+def prune_expired() -> int:
+    db = SessionLocal()
+    try:
+        count = db.execute(delete(RefreshTokenModel).where(RefreshTokenModel.expires_at <= datetime.utcnow())).rowcount
+        db.commit()
+        return count
+    finally:
+        db.close()
@@ -0,0 +1,87 @@
+"""Teacher calendars: booking conflicts and open slots."""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.config import settings
+from app.models.session import Session as SessionModel
+from app.models.skill import SkillAvailability as SkillAvailabilityModel
+
+# Sessions in these states hold the teacher's time
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+Interval = Tuple[datetime, datetime]
+
+
+def teacher_bookings(db: SQLSession, teacher_id: int, start: datetime, end: datetime,
+                     exclude_id: Optional[int] = None) -> List[Interval]:
+    """Active bookings of a teacher overlapping [start, end), sorted by start.
+
+    Durations are capped at MAX_SESSION_MINUTES, so only sessions starting in
+    [start - cap, end) can overlap; that range is a scan of the
+    (teacher_id, scheduled_at) index.
+    """
+    query = db.query(SessionModel.scheduled_at, SessionModel.duration_minutes).filter(
+        SessionModel.teacher_id == teacher_id,
+        SessionModel.status.in_(ACTIVE_STATUSES),
+        SessionModel.scheduled_at > start - timedelta(minutes=settings.MAX_SESSION_MINUTES),
+        SessionModel.scheduled_at < end,
+    )
+    if exclude_id is not None:
+        query = query.filter(SessionModel.id != exclude_id)
+    bookings = []
+    for scheduled_at, duration in query.order_by(SessionModel.scheduled_at):
+        booking_end = scheduled_at + timedelta(minutes=duration or 60)
+        if booking_end > start:
+            bookings.append((scheduled_at, booking_end))
+    return bookings
+
+
+def has_conflict(db: SQLSession, teacher_id: int, start: datetime, duration_minutes: int,
+                 exclude_id: Optional[int] = None) -> bool:
+    end = start + timedelta(minutes=duration_minutes)
+    return bool(teacher_bookings(db, teacher_id, start, end, exclude_id))
+
+
+def availability_intervals(slots: Iterable[SkillAvailabilityModel], start: datetime, end: datetime) -> List[Interval]:
+    """Concrete UTC intervals of weekly availability slots within [start, end), sorted and merged."""
+    by_weekday = {}
+    for slot in slots:
+        by_weekday.setdefault(slot.weekday, []).append((slot.start_minute, slot.end_minute))
+    intervals = []
+    day = datetime.combine(start.date(), datetime.min.time())
+    while day < end:
+        for start_minute, end_minute in sorted(by_weekday.get(day.weekday(), ())):
+            low = max(start, day + timedelta(minutes=start_minute))
+            high = min(end, day + timedelta(minutes=end_minute))
+            if low >= high:
+                continue
+            # Adjacent or overlapping slots (including across midnight) merge
+            if intervals and low <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], high))
+            else:
+                intervals.append((low, high))
+        day += timedelta(days=1)
+    return intervals
+
+
+def subtract(free: Sequence[Interval], busy: Sequence[Interval]) -> List[Interval]:
+    """Remove busy intervals from free ones in one sweep; both sorted by start."""
+    result = []
+    b = 0
+    for start, end in free:
+        cursor = start
+        # Bookings that end before this window can never matter again
+        while b < len(busy) and busy[b][1] <= cursor:
+            b += 1
+        i = b
+        while i < len(busy) and busy[i][0] < end:
+            busy_start, busy_end = busy[i]
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            i += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
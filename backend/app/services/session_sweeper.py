@@ -0,0 +1,250 @@
+"""
+Sweeper for sessions that nobody will move on.
+
+* Pending sessions the teacher never answered are cancelled and the
+  student is refunded, like a decline: once the start time has passed, or
+  after SESSION_PENDING_TTL_HOURS whichever comes first.
+* Confirmed sessions that started more than SESSION_COMPLETE_AFTER_HOURS
+  ago are, per SESSION_PAST_CONFIRMED, either flagged (overdue_at is set
+  and a session.overdue event published, so the teacher can be nudged) or
+  completed as if the teacher had done it, paying the teacher.
+
+Each batch is one UPDATE ... WHERE id IN (next batch_size matching ids)
+RETURNING the rows it changed, so a session confirmed or cancelled by its
+users meanwhile is not touched twice. The batch's refunds or earnings are
+then written with one transactions INSERT and one balance UPDATE per user,
+and the batch commits. On PostgreSQL the id subquery skips locked rows, so
+a sweep_sessions.py run alongside the app's sweeper takes different batches.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.jobs import after_commit, enqueue
+from app.core.outbox import publish
+from app.models.session import Session as SessionModel
+from app.models.skill import Skill as SkillModel
+from app.models.transaction import Transaction as TransactionModel
+from app.models.user import User as UserModel
+from app.services import ranking, skill_cache
+from app.services.ledger import TEACHING_EARNING_PREFIX
+from app.services.tasks import increment_streak
+
+logger = logging.getLogger(__name__)
+
+PAST_CONFIRMED_POLICIES = ("flag", "complete")
+
+swept = metrics.counter("sessions_swept_total", "Sessions expired, completed or flagged by the sweeper")
+
+
+class Sweep(NamedTuple):
+    expired: int
+    refunded: int  # tokens returned to students
+    completed: int
+    earned: int  # tokens paid to teachers
+    flagged: int
+    dry_run: bool
+
+
+def stale_pending(now: datetime, pending_ttl_hours: float):
+    condition = SessionModel.scheduled_at <= now
+    if pending_ttl_hours > 0:
+        condition = or_(condition, SessionModel.created_at <= now - timedelta(hours=pending_ttl_hours))
+    return and_(SessionModel.status == "pending", condition)
+
+
+def past_confirmed(now: datetime, complete_after_hours: float):
+    return and_(
+        SessionModel.status == "confirmed",
+        SessionModel.scheduled_at <= now - timedelta(hours=complete_after_hours),
+    )
+
+
+def _transition(db: SQLSession, condition, values: dict, batch_size: int) -> list:
+    """Apply `values` to the next `batch_size` sessions matching `condition`; the rows changed."""
+    ids = (
+        select(SessionModel.id)
+        .where(condition)
+        .order_by(SessionModel.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return db.execute(
+        update(SessionModel)
+        .where(SessionModel.id.in_(ids), condition)
+        .values(**values)
+        .returning(SessionModel.id, SessionModel.skill_id, SessionModel.teacher_id, SessionModel.student_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _skills(db: SQLSession, rows: list) -> Dict[int, Tuple[str, int]]:
+    skill_ids = {row.skill_id for row in rows}
+    if not skill_ids:
+        return {}
+    return {
+        skill_id: (title, tokens or 0)
+        for skill_id, title, tokens in db.query(SkillModel.id, SkillModel.title, SkillModel.tokens_per_session)
+        .filter(SkillModel.id.in_(skill_ids))
+    }
+
+
+def _pay(db: SQLSession, payments: List[Tuple[int, int, str]]) -> int:
+    """Credit (user_id, amount, description) earnings: one bulk INSERT, one UPDATE per user."""
+    if not payments:
+        return 0
+    now = datetime.utcnow()
+    db.execute(insert(TransactionModel), [
+        {"user_id": user_id, "type": "earn", "amount": amount, "description": description, "created_at": now}
+        for user_id, amount, description in payments
+    ])
+    totals: Dict[int, int] = defaultdict(int)
+    for user_id, amount, _ in payments:
+        totals[user_id] += amount
+    users = UserModel.__table__
+    # In id order, so concurrent sweeps lock users in the same order
+    db.execute(
+        users.update()
+        .where(users.c.id == bindparam("user"))
+        .values(token_balance=func.coalesce(users.c.token_balance, 0) + bindparam("amount")),
+        [{"user": user_id, "amount": amount} for user_id, amount in sorted(totals.items())],
+    )
+    return sum(totals.values())
+
+
+def expire_batch(db: SQLSession, now: datetime, pending_ttl_hours: float, batch_size: int) -> Tuple[int, int]:
+    """Cancel and refund one batch of stale pending sessions; (sessions, tokens refunded)."""
+    rows = _transition(db, stale_pending(now, pending_ttl_hours), {"status": "cancelled"}, batch_size)
+    skills = _skills(db, rows)
+    refunds = []
+    for row in rows:
+        title, tokens = skills.get(row.skill_id, ("", 0))
+        if tokens:
+            refunds.append((row.student_id, tokens, f"Refund for expired session on {title}"))
+        publish(
+            db, "session.cancelled", row.id,
+            reason="expired", teacher_id=row.teacher_id, student_id=row.student_id, refunded=tokens,
+        )
+    swept.inc(len(rows), action="expired")
+    return len(rows), _pay(db, refunds)
+
+
+def complete_batch(db: SQLSession, now: datetime, complete_after_hours: float, batch_size: int) -> Tuple[int, int]:
+    """Complete one batch of past confirmed sessions and pay the teachers; (sessions, tokens paid)."""
+    rows = _transition(db, past_confirmed(now, complete_after_hours), {"status": "completed"}, batch_size)
+    skills = _skills(db, rows)
+    earnings = []
+    for row in rows:
+        title, tokens = skills.get(row.skill_id, ("", 0))
+        if tokens:
+            earnings.append((row.teacher_id, tokens, f"{TEACHING_EARNING_PREFIX}{title}"))
+        enqueue(db, increment_streak, user_id=row.student_id, session_id=row.id)
+        publish(
+            db, "session.completed", row.id,
+            skill_id=row.skill_id, teacher_id=row.teacher_id, student_id=row.student_id, tokens=tokens,
+        )
+    for skill_id, count in Counter(row.skill_id for row in rows).items():
+        ranking.record_completion(db, skill_id, count)
+    if rows:
+        after_commit(db, skill_cache.invalidate_lists)
+    swept.inc(len(rows), action="completed")
+    return len(rows), _pay(db, earnings)
+
+
+def flag_batch(db: SQLSession, now: datetime, complete_after_hours: float, batch_size: int) -> Tuple[int, int]:
+    """Mark one batch of past confirmed sessions overdue; (sessions, 0)."""
+    condition = and_(past_confirmed(now, complete_after_hours), SessionModel.overdue_at.is_(None))
+    rows = _transition(db, condition, {"overdue_at": now}, batch_size)
+    for row in rows:
+        publish(db, "session.overdue", row.id, teacher_id=row.teacher_id, student_id=row.student_id)
+    swept.inc(len(rows), action="flagged")
+    return len(rows), 0
+
+
+def _drain(step: Callable[[SQLSession], Tuple[int, int]], batch_size: int) -> Tuple[int, int]:
+    """Run `step` batch after batch, each in its own transaction, until a batch comes back short."""
+    sessions = tokens = 0
+    while True:
+        db = SessionLocal()
+        try:
+            count, amount = step(db)
+            db.commit()
+        finally:
+            db.close()
+        sessions += count
+        tokens += amount
+        if count < batch_size:
+            return sessions, tokens
+
+
+def _preview(now: datetime, pending_ttl_hours: float, policy: str, complete_after_hours: float) -> Sweep:
+    def count(condition) -> Tuple[int, int]:
+        sessions, tokens = db.execute(
+            select(func.count(SessionModel.id), func.coalesce(func.sum(SkillModel.tokens_per_session), 0))
+            .select_from(SessionModel)
+            .outerjoin(SkillModel, SkillModel.id == SessionModel.skill_id)
+            .where(condition)
+        ).one()
+        return sessions, int(tokens)
+
+    db = SessionLocal()
+    try:
+        expired, refunded = count(stale_pending(now, pending_ttl_hours))
+        completed = earned = flagged = 0
+        if policy == "complete":
+            completed, earned = count(past_confirmed(now, complete_after_hours))
+        elif policy == "flag":
+            flagged, _ = count(and_(past_confirmed(now, complete_after_hours), SessionModel.overdue_at.is_(None)))
+    finally:
+        db.close()
+    return Sweep(expired, refunded, completed, earned, flagged, dry_run=True)
+
+
+def sweep(
+    batch_size: int = 500,
+    pending_ttl_hours: float = 72,
+    past_confirmed_policy: str = "flag",
+    complete_after_hours: float = 24,
+    dry_run: bool = False,
+) -> Sweep:
+    """Expire stale pending sessions and apply the past-confirmed policy ("" leaves them alone).
+
+    With dry_run nothing is written; the result counts what a real sweep would change.
+    """
+    if past_confirmed_policy and past_confirmed_policy not in PAST_CONFIRMED_POLICIES:
+        raise ValueError(f"past-confirmed policy must be one of {PAST_CONFIRMED_POLICIES} or empty")
+    now = datetime.utcnow()
+    if dry_run:
+        return _preview(now, pending_ttl_hours, past_confirmed_policy, complete_after_hours)
+
+    expired, refunded = _drain(lambda db: expire_batch(db, now, pending_ttl_hours, batch_size), batch_size)
+    completed = earned = flagged = 0
+    if past_confirmed_policy == "complete":
+        completed, earned = _drain(lambda db: complete_batch(db, now, complete_after_hours, batch_size), batch_size)
+    elif past_confirmed_policy == "flag":
+        flagged, _ = _drain(lambda db: flag_batch(db, now, complete_after_hours, batch_size), batch_size)
+    return Sweep(expired, refunded, completed, earned, flagged, dry_run=False)
+
+
+def scheduled_sweep():
+    """Periodic run from the app lifespan with the SESSION_* settings."""
+    result = sweep(
+        batch_size=settings.SESSION_SWEEP_BATCH_SIZE,
+        pending_ttl_hours=settings.SESSION_PENDING_TTL_HOURS,
+        past_confirmed_policy=settings.SESSION_PAST_CONFIRMED,
+        complete_after_hours=settings.SESSION_COMPLETE_AFTER_HOURS,
+        dry_run=settings.SESSION_SWEEP_DRY_RUN,
+    )
+    if result.expired or result.completed or result.flagged:
+        logger.info(
+            f"Session sweep{' (dry run)' if result.dry_run else ''}: "
+            f"{result.expired} pending expired ({result.refunded} tokens refunded), "
+            f"{result.completed} completed ({result.earned} tokens paid), {result.flagged} flagged overdue"
+        )
@@ -0,0 +1,108 @@
+"""Response cache for the public skill catalog (`GET /skills`, `GET /skills/{id}`).
+
+Without a shared CACHE_URL every worker keeps its own generations, so an
+invalidation is also published as a `skill_cache.invalidated` outbox event
+that the other processes apply to their local copy.
+"""
+import hashlib
+import logging
+import uuid
+from typing import NamedTuple, Optional
+
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.cache import create_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.outbox import Event, consumer, publish
+from app.models.skill import Skill as SkillModel
+
+logger = logging.getLogger(__name__)
+
+cache = create_cache(settings.CACHE_URL, settings.SKILL_CACHE_MAX_ENTRIES)
+
+LIST_GENERATION = "skills:list"
+
+# Tells this process's own broadcasts apart from other workers'
+_ORIGIN = uuid.uuid4().hex
+
+
+class CachedBody(NamedTuple):
+    etag: str
+    body: bytes
+    next_cursor: str = ""  # keyset cursor for the following page, if any
+
+
+def _normalize(value) -> Optional[str]:
+    # Empty filters are ignored by the query, so they share the unfiltered key
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+def list_key(kind: str = "list", **params) -> str:
+    """Key for a catalog-wide query; empty filters are dropped and search is case-folded (it is ILIKE)."""
+    normalized = {k: _normalize(v) for k, v in params.items()}
+    if normalized.get("search"):
+        normalized["search"] = normalized["search"].lower()
+    parts = "&".join(f"{k}={v}" for k, v in sorted(normalized.items()) if v is not None)
+    return f"skills:{kind}:{cache.generation(LIST_GENERATION)}:{parts}"
+
+
+def detail_key(skill_id: int) -> str:
+    return f"skills:detail:{skill_id}:{cache.generation(f'skills:{skill_id}')}"
+
+
+def get(key: str) -> Optional[CachedBody]:
+    raw = cache.get(key)
+    if raw is None:
+        return None
+    parts = raw.split(b"\n", 2)
+    if len(parts) != 3:
+        return None
+    etag, next_cursor, body = parts
+    return CachedBody(etag.decode("ascii"), body, next_cursor.decode("ascii"))
+
+
+def put(key: str, body: bytes, next_cursor: str = "") -> CachedBody:
+    etag = '"' + hashlib.blake2b(body + next_cursor.encode("ascii"), digest_size=12).hexdigest() + '"'
+    cache.set(key, b"\n".join([etag.encode("ascii"), next_cursor.encode("ascii"), body]), settings.SKILL_CACHE_TTL)
+    return CachedBody(etag, body, next_cursor)
+
+
+def _bump(*names: str):
+    for name in names:
+        cache.bump(name)
+    if cache.shared is not None or not settings.OUTBOX_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        publish(db, "skill_cache.invalidated", origin=_ORIGIN, names=list(names))
+        db.commit()
+    except Exception:
+        # This worker is already up to date; the others catch up within SKILL_CACHE_TTL
+        logger.exception("Could not broadcast a skill cache invalidation")
+    finally:
+        db.close()
+
+
+@consumer("skill_cache", "skill_cache.invalidated")
+def apply_invalidation(event: Event):
+    if event.payload.get("origin") == _ORIGIN:
+        return
+    for name in event.payload.get("names", []):
+        cache.bump(name)
+
+
+def invalidate_lists():
+    _bump(LIST_GENERATION)
+
+
+def invalidate_skill(skill_id: int):
+    _bump(f"skills:{skill_id}", LIST_GENERATION)
+
+
+def invalidate_teacher(db: SQLSession, teacher_id: int):
+    """Skills embed their teacher, so a profile change invalidates all of them."""
+    names = [f"skills:{skill_id}" for (skill_id,) in db.query(SkillModel.id).filter(SkillModel.teacher_id == teacher_id)]
+    _bump(*names, LIST_GENERATION)
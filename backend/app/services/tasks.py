@@ -0,0 +1,59 @@
+"""Deferred write-path side effects, run by the job runner (app.core.jobs)."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session as SQLSession
+
+from app.core.jobs import after_commit, job
+from app.models.session import Session as SessionModel
+from app.models.skill import Skill as SkillModel, SkillReview as SkillReviewModel
+from app.models.user import User as UserModel
+from app.core.outbox import publish
+from app.services import skill_cache
+from app.services.ranking import ranking_score
+
+
+@job("skills.recompute_rating")
+def recompute_skill_rating(db: SQLSession, skill_id: int):
+    """Roll a skill's reviews up into rating, review_count and ranking_score."""
+    avg_rating, review_count = db.query(
+        func.avg(SkillReviewModel.rating), func.count(SkillReviewModel.id)
+    ).filter(SkillReviewModel.skill_id == skill_id).one()
+    rating = float(avg_rating) if avg_rating is not None else 0.0
+    db.execute(
+        update(SkillModel)
+        .where(SkillModel.id == skill_id)
+        .values(
+            rating=rating,
+            review_count=review_count,
+            ranking_score=ranking_score(rating, review_count, SkillModel.recent_completions),
+        )
+    )
+    after_commit(db, lambda: skill_cache.invalidate_skill(skill_id))
+
+
+@job("users.increment_streak")
+def increment_streak(db: SQLSession, user_id: int, session_id: Optional[int] = None):
+    """Count a completed session in its student's streak, once per session.
+
+    A job requeued while its first run was still going runs twice; only the
+    run that marks the session changes the streak. Jobs queued before
+    session_id was passed increment unconditionally.
+    """
+    if session_id is not None:
+        marked = db.execute(
+            update(SessionModel)
+            .where(SessionModel.id == session_id, SessionModel.streak_counted_at.is_(None))
+            .values(streak_counted_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not marked:
+            return
+    db.execute(
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(streak=func.coalesce(UserModel.streak, 0) + 1)
+    )
+    streak = db.query(UserModel.streak).filter(UserModel.id == user_id).scalar()
+    publish(db, "user.streak_changed", user_id, streak=streak or 0)
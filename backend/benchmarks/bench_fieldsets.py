@@ -0,0 +1,103 @@
+"""
+Benchmark: sparse fieldsets (`?fields=`) against full rows on the list endpoints.
+
+Loads the whole skill catalog with and without a narrow selection and times
+the query (including building the ORM rows) and the serialization
+separately. Then calls each list endpoint, full and narrow, through
+TestClient against the same generated dataset and reports response sizes.
+
+Usage:
+    python -m benchmarks.bench_fieldsets [--size 10000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "mock")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("JOBS_ENABLED", "false")
+os.environ.setdefault("OUTBOX_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.skills import _query_skills
+from app.core.compression import compress_bytes
+from app.core.database import get_db
+from app.core.fields import list_adapter, parse_fields
+from app.core.responses import dump_json
+from app.main import app
+from app.schemas.skill import Skill, SkillListAdapter
+from app.services import skill_cache
+
+from benchmarks.conftest import Dataset
+
+# (label, path, narrow fields)
+ENDPOINTS = [
+    ("skills", "/api/v1/skills/", "title,rating,tokens_per_session,teacher.full_name"),
+    ("skill reviews", "/api/v1/skills/{skill_id}/reviews?limit=100", "rating,comment,reviewer.full_name"),
+    ("sessions", "/api/v1/sessions/", "skill_id,scheduled_at,status"),
+    ("chats", "/api/v1/chats/", "participant_name,unread_count"),
+]
+
+
+def measure(client, ds, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        skill_cache.cache.clear()
+        start = time.perf_counter()
+        response = client.get(path, headers=ds.headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return response.content, statistics.median(timings)
+
+
+def time_catalog(ds, selection, repeat):
+    """Median (load ms, serialize ms) for the whole catalog: query plus ORM rows, then JSON."""
+    adapter = list_adapter(Skill, selection) if selection else SkillListAdapter
+    load, serialize = [], []
+    for _ in range(repeat):
+        db = ds.SessionLocal()
+        try:
+            start = time.perf_counter()
+            skills = _query_skills(db, None, None, None, None, selection=selection)
+            loaded = time.perf_counter()
+            dump_json(adapter, skills)
+            load.append((loaded - start) * 1000)
+            serialize.append((time.perf_counter() - loaded) * 1000)
+        finally:
+            db.close()
+    return statistics.median(load), statistics.median(serialize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Generating a {args.size}-row dataset...")
+    ds = Dataset(args.size)
+    app.dependency_overrides[get_db] = ds.get_db
+
+    catalog = parse_fields(ENDPOINTS[0][2], Skill)
+    print(f"\nWhole catalog ({args.size} skills)   load ms  serialize ms")
+    for variant, selection in (("all", None), ("narrow", catalog)):
+        load_ms, serialize_ms = time_catalog(ds, selection, args.repeat)
+        print(f"  {variant:<31} {load_ms:>7.1f} {serialize_ms:>13.1f}")
+
+    print(f"\n{'endpoint':<15} {'fields':<8} {'bytes':>11} {'gzip':>10} {'total ms':>9}")
+    with TestClient(app) as client:
+        for label, path, fields in ENDPOINTS:
+            path = path.format(skill_id=ds.skill_id)
+            separator = "&" if "?" in path else "?"
+            for variant, url in (("all", path), ("narrow", f"{path}{separator}fields={fields}")):
+                body, wall_ms = measure(client, ds, url, args.repeat)
+                gzipped = len(compress_bytes(body, "gzip"))
+                print(f"{label:<15} {variant:<8} {len(body):>11,} {gzipped:>10,} {wall_ms:>9.1f}")
+    app.dependency_overrides.clear()
+    ds.close()
+
+
+if __name__ == "__main__":
+    main()
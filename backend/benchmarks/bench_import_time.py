@@ -0,0 +1,75 @@
+"""
+Cold-start import time of the ASGI entry point, measured with `python -X importtime`.
+
+Each run imports the entry module in a fresh interpreter and records the
+cumulative import time of that module, so the number tracks what a serverless
+cold start pays before it can serve a request.
+
+Usage:
+    python -m benchmarks.bench_import_time [--module server] [--runs 5] [--budget-ms 1500] [--top 15]
+
+Exits non-zero when the median exceeds --budget-ms.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str) -> List[Tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for every import of a fresh `import module`."""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "mock")
+    env.setdefault("SECRET_KEY", "import-time")
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str, runs: int) -> Tuple[List[float], Dict[str, int]]:
+    totals, self_times = [], {}
+    for _ in range(runs):
+        rows = import_profile(module)
+        total = next(cum for name, _, cum in reversed(rows) if name == module)
+        totals.append(total / 1000)
+        for name, self_us, _ in rows:
+            self_times[name] = min(self_times.get(name, self_us), self_us)
+    return totals, self_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=15, help="Show the slowest modules by self time")
+    args = parser.parse_args()
+
+    totals, self_times = measure(args.module, args.runs)
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms, min {min(totals):.0f} ms over {args.runs} runs")
+    if args.top:
+        print(f"\nSlowest modules by self time:")
+        for name, us in sorted(self_times.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"\nFAIL: {median:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
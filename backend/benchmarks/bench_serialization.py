@@ -0,0 +1,109 @@
+"""
+Micro-benchmark: serialization time and bytes on the wire for a 1,000-skill catalog.
+
+Compares the default FastAPI path (response_model validation + jsonable_encoder +
+stdlib json) with the prebuilt TypeAdapter path, and reports gzip/brotli sizes.
+
+Usage:
+    python -m benchmarks.bench_serialization [--skills 1000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "mock")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from typing import List
+
+from app.core.compression import brotli, compress_bytes
+from app.core.responses import dump_json
+from app.models.skill import Skill as SkillModel
+from app.models.user import User as UserModel
+from app.schemas.skill import Skill, SkillListAdapter
+
+
+def build_catalog(n: int) -> List[SkillModel]:
+    teachers = [
+        UserModel(
+            id=i,
+            email=f"teacher{i}@example.com",
+            name=f"Teacher {i}",
+            hashed_password="x",
+            bio="Experienced teacher who loves sharing knowledge with the community.",
+            skills_to_teach=["Python", "JavaScript"],
+            skills_to_learn=["Spanish"],
+            token_balance=100,
+            streak=3,
+            is_active=True,
+        )
+        for i in range(1, n // 4 + 2)
+    ]
+    skills = []
+    for i in range(1, n + 1):
+        skill = SkillModel(
+            id=i,
+            title=f"Skill number {i}",
+            description="Learn the core concepts including variables, functions, and modern features. " * 2,
+            teacher_id=teachers[i % len(teachers)].id,
+            category=["Programming", "Language", "Music", "Design"][i % 4],
+            level=["Beginner", "Intermediate", "Advanced"][i % 3],
+            language="English",
+            tokens_per_session=40 + i % 50,
+            rating=4.5,
+            review_count=i % 200,
+            badges=["Popular", "Verified Teacher"],
+            availability=[{"day": "Monday", "timeSlots": ["10:00 AM", "2:00 PM"]}],
+        )
+        skill.teacher = teachers[i % len(teachers)]
+        skills.append(skill)
+    return skills
+
+
+def stdlib_path(skills) -> bytes:
+    # What FastAPI does for `response_model=List[Skill]` with JSONResponse
+    validated = [Skill.model_validate(s, from_attributes=True) for s in skills]
+    content = jsonable_encoder(validated)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def adapter_path(skills) -> bytes:
+    return dump_json(SkillListAdapter, skills)
+
+
+def timed(fn, skills, repeat: int) -> float:
+    fn(skills)  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(skills)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skills", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    skills = build_catalog(args.skills)
+
+    print(f"Serializing {args.skills} skills (best of {args.repeat})")
+    for label, fn in (("response_model + json", stdlib_path), ("TypeAdapter.dump_json", adapter_path)):
+        print(f"  {label:<24} {timed(fn, skills, args.repeat):8.2f} ms")
+
+    body = adapter_path(skills)
+    print("\nBytes on the wire")
+    print(f"  {'identity':<24} {len(body):>10,}")
+    print(f"  {'gzip':<24} {len(compress_bytes(body, 'gzip')):>10,}")
+    if brotli is not None:
+        print(f"  {'br':<24} {len(compress_bytes(body, 'br')):>10,}")
+    else:
+        print("  br                       (brotli not installed)")
+
+
+if __name__ == "__main__":
+    main()
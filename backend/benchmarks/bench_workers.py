@@ -0,0 +1,60 @@
+"""
+Startup time and throughput of the production server across worker counts.
+
+Launches gunicorn (gunicorn.conf.py) on a throwaway SQLite mock database for
+each worker count, measures time until /health answers, then runs the load
+test's read-heavy mix against it. SQLite serializes writers, so write-heavy
+mixes mostly measure lock contention; point --url-style runs at PostgreSQL for
+those.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --duration 15
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.loadtest import LocalServer, run_load, seed_command
+
+DEFAULT_MIX = "browse=80,wallet=20"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--users", type=int, help="Seed with app.db.generate for N users")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+    args.think_time = 0.0
+    args.timeout = 30.0
+    args.password = "password123"
+    args.max_accounts = 50
+
+    rows = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with LocalServer(workers=workers, seed_command=seed_command(args.users), gunicorn=True) as server:
+            result = asyncio.run(run_load(server.url, args))
+        totals = result["totals"]
+        rows.append({
+            "workers": workers,
+            "startup_s": round(server.startup_s, 2),
+            "rps": totals["rps"],
+            "p50_ms": totals["p50_ms"],
+            "p95_ms": totals["p95_ms"],
+            "p99_ms": totals["p99_ms"],
+            "error_rate": totals["error_rate"],
+        })
+        print(f"workers={workers:<3} startup={rows[-1]['startup_s']:>5.2f}s rps={totals['rps']:>8.1f} "
+              f"p50={totals['p50_ms']:>7.1f}ms p95={totals['p95_ms']:>7.1f}ms err={totals['error_rate']:.2%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mix": args.mix, "concurrency": args.concurrency, "runs": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
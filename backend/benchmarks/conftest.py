@@ -0,0 +1,170 @@
+"""
+Fixtures for the in-process endpoint benchmarks.
+
+Each dataset size gets its own in-memory SQLite database filled by
+app.db.generate. `size` is the approximate row count of the main tables
+(skills, reviews, sessions, messages); users and chats are a tenth of that.
+
+Environment knobs:
+    BENCH_SIZES            comma-separated sizes (default "1000,10000"; add 100000 for the full run)
+    BENCH_REPEAT           timed calls per endpoint and size, median is recorded (default 5)
+    BENCH_TOLERANCE        allowed slowdown vs. baseline as a fraction (default 0.5)
+    BENCH_MIN_DELTA_MS     slowdowns smaller than this are treated as noise (default 5)
+    BENCH_BASELINE         baseline JSON path (default benchmarks/baseline.json)
+    BENCH_UPDATE_BASELINE  set to 1 to overwrite the baseline with this run
+"""
+import json
+import os
+
+os.environ.setdefault("DATABASE_URL", "mock")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("JOBS_ENABLED", "false")
+os.environ.setdefault("OUTBOX_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("SESSION_SWEEP_INTERVAL", "0")
+
+import pytest
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+
+from app.core.database import Base, get_db
+from app.core.security import create_access_token
+from app.db.generate import generate
+from app.main import app
+from app.models import User, Skill, Session, Transaction, Chat
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SIZES = [int(s) for s in os.getenv("BENCH_SIZES", "1000,10000").split(",") if s.strip()]
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.5"))
+MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "5"))
+BASELINE_PATH = os.getenv("BENCH_BASELINE", os.path.join(BENCH_DIR, "baseline.json"))
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE") == "1"
+
+
+class Dataset:
+    """An in-memory database of a given size plus the ids the cases operate on."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        self.queries = 0
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        generate(
+            users=max(size // 10, 10),
+            skills=size,
+            reviews=size,
+            sessions=size,
+            chats=max(size // 10, 10),
+            messages=size,
+            seed=size,
+            bind=self.engine,
+        )
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.db = self.SessionLocal()
+        self._pick_actors()
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def _pick_actors(self):
+        db = self.db
+        # The busiest entities, so per-entity result sizes grow with the dataset
+        self.student_id = db.query(Transaction.user_id).group_by(Transaction.user_id) \
+            .order_by(func.count().desc()).limit(1).scalar()
+        self.skill_id = db.query(Session.skill_id).group_by(Session.skill_id) \
+            .order_by(func.count().desc()).limit(1).scalar()
+        self.teacher_id = db.query(Skill.teacher_id).filter(Skill.id == self.skill_id).scalar()
+        if self.teacher_id == self.student_id:
+            self.student_id = db.query(User.id).filter(User.id != self.teacher_id).limit(1).scalar()
+        self.chat_id = db.query(Chat.id).filter(
+            (Chat.user1_id == self.student_id) | (Chat.user2_id == self.student_id)
+        ).limit(1).scalar()
+        if self.chat_id is None:
+            chat = Chat(user1_id=self.student_id, user2_id=self.teacher_id)
+            db.add(chat)
+            db.commit()
+            self.chat_id = chat.id
+        # get_or_create_chat always measures the lookup, whether or not the generator gave this pair a chat
+        pair = ((Chat.user1_id == self.student_id) & (Chat.user2_id == self.teacher_id)) | \
+            ((Chat.user1_id == self.teacher_id) & (Chat.user2_id == self.student_id))
+        if db.query(Chat.id).filter(pair).first() is None:
+            db.add(Chat(user1_id=self.student_id, user2_id=self.teacher_id))
+            db.commit()
+        # Enough tokens for every booking the cases make
+        db.query(User).filter(User.id == self.student_id).update({User.token_balance: 10 ** 9})
+        db.commit()
+
+        self.student_email = db.query(User.email).filter(User.id == self.student_id).scalar()
+        self.teacher_email = db.query(User.email).filter(User.id == self.teacher_id).scalar()
+        self.headers = {"Authorization": f"Bearer {create_access_token({'sub': self.student_email})}"}
+        self.teacher_headers = {"Authorization": f"Bearer {create_access_token({'sub': self.teacher_email})}"}
+
+    def get_db(self):
+        db = self.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def close(self):
+        self.db.close()
+        self.engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def datasets():
+    cache = {}
+
+    def get(size: int) -> Dataset:
+        if size not in cache:
+            cache[size] = Dataset(size)
+        return cache[size]
+
+    yield get
+    for dataset in cache.values():
+        dataset.close()
+
+
+@pytest.fixture
+def empty_db():
+    """A sessionmaker over a new in-memory database with every table and no rows."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="session")
+def bench_results():
+    results = {}
+    yield results
+    if not results:
+        return
+    with open(RESULTS_PATH, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    if UPDATE_BASELINE or not os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    if UPDATE_BASELINE or not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
@@ -0,0 +1,470 @@
+"""
+HTTP load test for the CircleEd API.
+
+By default this launches a local uvicorn running `app.main:app` against a fresh
+SQLite mock database in a temporary directory, seeds it, and drives it with a
+weighted mix of scenarios from concurrent virtual users:
+
+    browse   - list/search the catalog, open a skill and its reviews
+    booking  - book a session, then confirm + complete or cancel it
+    chat     - open the chat list and send a burst of messages
+    wallet   - poll the token balance and transaction history
+
+Per endpoint it reports request count, RPS, p50/p95/p99 latency and error rate,
+and can write the results as JSON so runs can be diffed across commits.
+
+Usage:
+    python -m benchmarks.loadtest --duration 30 --concurrency 20 --output run.json
+    python -m benchmarks.loadtest --users 10000     # generated dataset instead of the demo seed
+    python -m benchmarks.loadtest --url http://localhost:8000   # existing server
+    python -m benchmarks.loadtest --compare base.json --output head.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v1"
+
+SCENARIOS = ("browse", "booking", "chat", "wallet")
+DEFAULT_MIX = "browse=60,booking=10,chat=15,wallet=15"
+SEARCH_TERMS = ["python", "spanish", "guitar", "data", "design", "react", "music", "intro"]
+# Accounts created by app.db.seed / app.db.generate; teachers found in the catalog are added on top
+SEED_ACCOUNTS = ["john@example.com", "user1@example.com"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, elapsed: float, status: int, ok: bool):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] += 1
+        if not ok:
+            self.errors[name] += 1
+
+    def summary(self, duration: float) -> Dict[str, dict]:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            count = len(values)
+            endpoints[name] = {
+                "requests": count,
+                "rps": round(count / duration, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / count, 4),
+                "statuses": {str(k): v for k, v in sorted(self.statuses[name].items())},
+            }
+        return endpoints
+
+
+class Client:
+    """Thin wrapper that times every call under its route template name."""
+
+    def __init__(self, http: httpx.AsyncClient, stats: Stats, recording: asyncio.Event):
+        self.http = http
+        self.stats = stats
+        self.recording = recording
+
+    async def call(self, name: str, method: str, path: str, token: Optional[str] = None,
+                   expected=(200,), **kwargs) -> Optional[httpx.Response]:
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, API + path, headers=headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        elapsed = time.perf_counter() - start
+        if self.recording.is_set():
+            self.stats.record(f"{method} {name}", elapsed, status, status in expected)
+        return response
+
+
+class World:
+    """Shared state discovered from the running API: accounts, skills and chats."""
+
+    def __init__(self):
+        self.tokens: Dict[str, str] = {}
+        self.user_ids: Dict[str, int] = {}
+        self.skills: List[dict] = []
+        self.chats: Dict[str, List[int]] = defaultdict(list)
+
+    def random_account(self) -> str:
+        return random.choice(list(self.tokens))
+
+    def token_for_user_id(self, user_id: int) -> Optional[str]:
+        for email, uid in self.user_ids.items():
+            if uid == user_id:
+                return self.tokens[email]
+        return None
+
+
+async def discover(client: Client, password: str, max_accounts: int) -> World:
+    world = World()
+    response = await client.call("/skills", "GET", "/skills/")
+    response.raise_for_status()
+    world.skills = response.json()
+    emails = list(SEED_ACCOUNTS)
+    for skill in world.skills:
+        email = (skill.get("teacher") or {}).get("email")
+        if email and email not in emails:
+            emails.append(email)
+
+    for email in emails[:max_accounts]:
+        response = await client.call("/auth/login", "POST", "/auth/login",
+                                     json={"email": email, "password": password})
+        if response is not None and response.status_code == 200:
+            body = response.json()
+            world.tokens[email] = body["access_token"]
+            world.user_ids[email] = body["user"]["id"]
+    if not world.tokens:
+        raise RuntimeError("Could not log in with any seeded account")
+
+    accounts = list(world.tokens)
+    for email in accounts:
+        response = await client.call("/chats", "GET", "/chats/", world.tokens[email])
+        chats = [c["id"] for c in response.json()] if response is not None and response.status_code == 200 else []
+        if not chats and len(accounts) > 1:
+            other = random.choice([a for a in accounts if a != email])
+            response = await client.call("/chats", "POST", "/chats/", world.tokens[email],
+                                         json={"user_id": world.user_ids[other]})
+            if response is not None and response.status_code == 200:
+                chats = [response.json()["id"]]
+        world.chats[email] = chats
+    return world
+
+
+async def scenario_browse(client: Client, world: World):
+    params = {}
+    if random.random() < 0.4:
+        params["search"] = random.choice(SEARCH_TERMS)
+    elif random.random() < 0.5 and world.skills:
+        params["category"] = random.choice(world.skills)["category"]
+    await client.call("/skills", "GET", "/skills/", params=params)
+    if world.skills:
+        skill_id = random.choice(world.skills)["id"]
+        await client.call("/skills/{id}", "GET", f"/skills/{skill_id}")
+        await client.call("/skills/{id}/reviews", "GET", f"/skills/{skill_id}/reviews")
+
+
+async def scenario_booking(client: Client, world: World):
+    student = world.random_account()
+    candidates = [s for s in world.skills if s["teacher_id"] != world.user_ids[student]]
+    if not candidates:
+        return
+    skill = random.choice(candidates)
+    scheduled_at = datetime.utcnow() + timedelta(days=random.randint(1, 30), minutes=random.randint(0, 10_000))
+    # 400 (insufficient tokens) is an expected business outcome under sustained booking
+    response = await client.call("/sessions", "POST", "/sessions/", world.tokens[student], expected=(200, 400),
+                                 json={"skill_id": skill["id"], "scheduled_at": scheduled_at.isoformat(),
+                                       "duration_minutes": 60})
+    if response is None or response.status_code != 200:
+        return
+    session_id = response.json()["id"]
+    teacher_token = world.token_for_user_id(skill["teacher_id"])
+    if teacher_token and random.random() < 0.7:
+        response = await client.call("/sessions/{id}/confirm", "POST", f"/sessions/{session_id}/confirm", teacher_token)
+        if response is not None and response.status_code == 200:
+            await client.call("/sessions/{id}/complete", "POST", f"/sessions/{session_id}/complete", teacher_token)
+    else:
+        await client.call("/sessions/{id}/cancel", "POST", f"/sessions/{session_id}/cancel", world.tokens[student])
+    await client.call("/sessions/upcoming", "GET", "/sessions/upcoming", world.tokens[student])
+
+
+async def scenario_chat(client: Client, world: World):
+    account = world.random_account()
+    token = world.tokens[account]
+    await client.call("/chats", "GET", "/chats/", token)
+    if not world.chats[account]:
+        return
+    chat_id = random.choice(world.chats[account])
+    for i in range(random.randint(3, 10)):
+        await client.call("/chats/{id}/messages", "POST", f"/chats/{chat_id}/messages", token,
+                          json={"content": f"load test message {i}"})
+    await client.call("/chats/{id}/messages", "GET", f"/chats/{chat_id}/messages", token)
+
+
+async def scenario_wallet(client: Client, world: World):
+    token = world.tokens[world.random_account()]
+    for _ in range(3):
+        await client.call("/transactions/balance", "GET", "/transactions/balance", token)
+    await client.call("/transactions", "GET", "/transactions/", token)
+
+
+SCENARIO_FUNCS = {
+    "browse": scenario_browse,
+    "booking": scenario_booking,
+    "chat": scenario_chat,
+    "wallet": scenario_wallet,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}', expected one of {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def virtual_user(client: Client, world: World, mix: Dict[str, int], deadline: float, think_time: float):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    while time.monotonic() < deadline:
+        await SCENARIO_FUNCS[random.choices(names, weights)[0]](client, world)
+        if think_time:
+            await asyncio.sleep(random.uniform(0, think_time))
+
+
+async def run_load(base_url: str, args) -> dict:
+    stats = Stats()
+    recording = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as http:
+        client = Client(http, stats, recording)
+        world = await discover(client, args.password, args.max_accounts)
+        mix = parse_mix(args.mix)
+
+        if args.warmup:
+            warmup_deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*(virtual_user(client, world, mix, warmup_deadline, args.think_time)
+                                   for _ in range(args.concurrency)))
+
+        recording.set()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(virtual_user(client, world, mix, deadline, args.think_time)
+                               for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+
+    endpoints = stats.summary(elapsed)
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(e["errors"] for e in endpoints.values())
+    all_latencies = sorted(v for values in stats.latencies.values() for v in values)
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "commit": git_commit(),
+            "base_url": base_url,
+            "duration_s": round(elapsed, 2),
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "accounts": len(world.tokens),
+            "skills": len(world.skills),
+        },
+        "totals": {
+            "requests": total,
+            "rps": round(total / elapsed, 2),
+            "p50_ms": round(percentile(all_latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(all_latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(all_latencies, 99) * 1000, 2),
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """uvicorn (or gunicorn, see gunicorn.conf.py) serving app.main:app on a throwaway SQLite mock database."""
+
+    def __init__(self, workers: int = 1, seed_command: Optional[List[str]] = None, extra_env: Optional[dict] = None,
+                 gunicorn: bool = False):
+        self.workers = workers
+        self.seed_command = seed_command or [sys.executable, "-m", "app.db.seed"]
+        self.extra_env = extra_env or {}
+        self.gunicorn = gunicorn
+        self.port = free_port()
+        self.workdir = None
+        self.process = None
+        self.startup_s = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def env(self) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "USE_MOCK_DB": "true",
+            "DATABASE_URL": "mock",
+            "SECRET_KEY": env.get("SECRET_KEY", "loadtest-secret"),
+            # Every simulated user comes from 127.0.0.1
+            "RATE_LIMIT_ENABLED": "false",
+            # Seeded sessions in the past would otherwise be swept mid-run
+            "SESSION_SWEEP_INTERVAL": "0",
+            "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        })
+        env.update(self.extra_env)
+        return env
+
+    def start(self, timeout: float = 30.0):
+        self.workdir = tempfile.mkdtemp(prefix="circleed-loadtest-")
+        env = self.env()
+        for command in ([sys.executable, "-m", "app.db.init_db"], self.seed_command):
+            subprocess.run(command, cwd=self.workdir, env=env, check=True, stdout=subprocess.DEVNULL)
+        if self.gunicorn:
+            command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+                       "app.main:app"]
+            env.update({"HOST": "127.0.0.1", "PORT": str(self.port), "WEB_CONCURRENCY": str(self.workers),
+                        "LOG_LEVEL": "warning"})
+        else:
+            command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                       "--port", str(self.port), "--log-level", "warning", "--no-access-log"]
+            if self.workers > 1:
+                command += ["--workers", str(self.workers)]
+        started = time.monotonic()
+        self.process = subprocess.Popen(command, cwd=self.workdir, env=env)
+        deadline = started + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(self.url + "/health", timeout=1).status_code == 200:
+                    self.startup_s = time.monotonic() - started
+                    return self
+            except httpx.HTTPError:
+                pass
+            if self.process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.2)
+        raise RuntimeError("server did not become healthy in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def seed_command(users: Optional[int]) -> Optional[List[str]]:
+    if not users:
+        return None
+    return [sys.executable, "-m", "app.db.generate", "--users", str(users), "--seed", "1"]
+
+
+def print_report(result: dict, baseline: Optional[dict] = None):
+    meta, totals = result["meta"], result["totals"]
+    print(f"\n{meta['duration_s']}s, {meta['concurrency']} virtual users, mix {meta['mix']}")
+    header = f"{'endpoint':<34} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6}"
+    if baseline:
+        header += f" {'Δp95':>8} {'Δrps':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = list(result["endpoints"].items()) + [("TOTAL", totals)]
+    base_rows = dict(baseline["endpoints"], TOTAL=baseline["totals"]) if baseline else {}
+    for name, row in rows:
+        line = (f"{name:<34} {row['requests']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+                f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['error_rate'] * 100:>6.2f}")
+        if baseline:
+            base = base_rows.get(name)
+            if base:
+                line += f" {delta(base['p95_ms'], row['p95_ms']):>8} {delta(base['rps'], row['rps']):>8}"
+            else:
+                line += f" {'new':>8} {'':>8}"
+        print(line)
+
+
+def delta(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target an already running server instead of launching one")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unrecorded warm-up seconds")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between scenarios")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the launched server")
+    parser.add_argument("--users", type=int, help="Seed the launched server with app.db.generate for N users")
+    parser.add_argument("--password", default="password123", help="Password of the seeded accounts")
+    parser.add_argument("--max-accounts", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible scenario choice")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run to diff against")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.url:
+        result = asyncio.run(run_load(args.url.rstrip("/"), args))
+    else:
+        with LocalServer(workers=args.workers, seed_command=seed_command(args.users)) as server:
+            result = asyncio.run(run_load(server.url, args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
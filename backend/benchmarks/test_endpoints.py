@@ -0,0 +1,261 @@
+"""
+In-process endpoint benchmarks.
+
+Every router function in app/api/v1/endpoints has a case below. Each case is
+called through TestClient against datasets of increasing size, recording the
+median wall time and the number of SQL statements per call. A case fails when
+
+  * its query count grows with the dataset size (an N+1 pattern), or
+  * it regresses beyond BENCH_TOLERANCE / BENCH_MIN_DELTA_MS against the baseline.
+
+Run with `python -m pytest benchmarks -q`; see conftest.py for the knobs.
+"""
+import itertools
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.api.v1.api import api_router
+from app.core.database import get_db
+from app.main import app, idempotency_store
+from app.models import Session, Skill, User
+from app.core.security import create_access_token
+from app.services import refresh_tokens, skill_cache
+
+from benchmarks.conftest import SIZES, REPEAT, TOLERANCE, MIN_DELTA_MS
+
+
+@dataclass
+class Case:
+    name: str  # router function name
+    method: str
+    path: str  # formatted with the dataset's attributes
+    as_teacher: bool = False
+    json: Optional[Callable] = None  # dataset -> request body
+    prepare: Optional[Callable] = None  # dataset -> extra format values, run untimed before every call
+    expected: int = 200
+    params: dict = field(default_factory=dict)
+    headers: Optional[Callable] = None  # dataset -> request headers, instead of the student's
+    # Send an Idempotency-Key and time "replay" (a repeat of an untimed first call), "mismatch" (a
+    # repeat with a different body) or "concurrent" (two identical calls at once, one of them replayed)
+    idempotency: Optional[str] = None
+
+
+_booking_hours = itertools.count()
+
+
+def _future() -> str:
+    # Far past generated bookings and never reused, so bookings never conflict
+    return (datetime(2100, 1, 1) + timedelta(hours=next(_booking_hours))).isoformat()
+
+
+def _new_session(status: str):
+    def prepare(ds):
+        session = Session(
+            skill_id=ds.skill_id, teacher_id=ds.teacher_id, student_id=ds.student_id,
+            scheduled_at=datetime.utcnow() + timedelta(days=3), status=status,
+        )
+        ds.db.add(session)
+        ds.db.commit()
+        return {"session_id": session.id}
+    return prepare
+
+
+def _refresh_token(ds) -> str:
+    # A fresh login for every call, since refresh tokens are single use
+    tokens = refresh_tokens.issue(ds.db, ds.db.get(User, ds.student_id))
+    ds.db.commit()
+    return tokens["refresh_token"]
+
+
+def _new_skill(ds):
+    skill = Skill(title="Benchmark skill", description="Temporary", teacher_id=ds.student_id,
+                  category="Programming", level="Beginner", language="English", tokens_per_session=10)
+    ds.db.add(skill)
+    ds.db.commit()
+    return {"own_skill_id": skill.id}
+
+
+CASES = [
+    # auth
+    Case("register", "POST", "/auth/register",
+         json=lambda ds: {"email": f"bench-{uuid.uuid4().hex[:12]}@example.com",
+                          "full_name": "Bench User", "password": "password123"}),
+    Case("login", "POST", "/auth/login",
+         json=lambda ds: {"email": ds.student_email, "password": "password123"}),
+    Case("refresh", "POST", "/auth/refresh", json=lambda ds: {"refresh_token": _refresh_token(ds)}),
+    # Its own access token, so the one the other cases use stays valid
+    Case("logout", "POST", "/auth/logout", json=lambda ds: {"refresh_token": _refresh_token(ds)},
+         headers=lambda ds: {"Authorization": f"Bearer {create_access_token({'sub': ds.student_email})}"}),
+    # users
+    Case("get_current_user", "GET", "/users/me"),
+    Case("get_user", "GET", "/users/{teacher_id}"),
+    Case("get_matches", "GET", "/users/me/matches"),
+    Case("update_user", "PUT", "/users/me", json=lambda ds: {"bio": "Benchmarking"}),
+    # skills
+    Case("get_skills", "GET", "/skills/"),
+    Case("get_skills", "GET", "/skills/", params={"search": "python"}),
+    Case("get_skills", "GET", "/skills/", params={"sort": "top", "limit": 20}),
+    Case("get_skills", "GET", "/skills/", params={"sort": "price", "limit": 20, "cursor": "WzIwLDUwMF0"}),
+    Case("get_skills", "GET", "/skills/", params={"sort": "price", "limit": 20, "cursor": "WyJ4Iiw1MDBd"},
+         expected=400),
+    Case("get_skills", "GET", "/skills/", params={"available_at": "2024-06-03T10:30:00"}),
+    Case("get_skills", "GET", "/skills/", params={"available_between": "2024-06-03T18:00:00/2024-06-04T09:00:00"}),
+    Case("get_skills", "GET", "/skills/", params={"fields": "title,rating,tokens_per_session,teacher.full_name"}),
+    Case("get_skill_facets", "GET", "/skills/facets"),
+    Case("get_skill_facets", "GET", "/skills/facets", params={"category": "Programming", "search": "python"}),
+    Case("get_skill", "GET", "/skills/{skill_id}"),
+    Case("create_skill", "POST", "/skills/",
+         json=lambda ds: {"title": "Bench", "description": "Bench skill", "category": "Programming",
+                          "level": "Beginner", "tokens_per_session": 10}),
+    Case("update_skill", "PUT", "/skills/{own_skill_id}", prepare=_new_skill,
+         json=lambda ds: {"title": "Bench renamed"}),
+    Case("delete_skill", "DELETE", "/skills/{own_skill_id}", prepare=_new_skill),
+    Case("get_free_slots", "GET", "/skills/{skill_id}/free-slots",
+         params={"from": "2024-06-03T00:00:00", "to": "2024-06-17T00:00:00"}),
+    Case("get_skill_reviews", "GET", "/skills/{skill_id}/reviews"),
+    Case("get_skill_reviews", "GET", "/skills/{skill_id}/reviews",
+         params={"limit": 50, "cursor": "WyIyMDI2LTAxLTAxVDAwOjAwOjAwIiwxMDAwMDAwMF0"}),
+    Case("get_skill_reviews", "GET", "/skills/{skill_id}/reviews", params={"fields": "rating,comment,reviewer.full_name"}),
+    Case("create_review", "POST", "/skills/{skill_id}/reviews",
+         json=lambda ds: {"rating": 5, "comment": "Great"}),
+    # sessions
+    Case("get_sessions", "GET", "/sessions/"),
+    Case("get_sessions", "GET", "/sessions/", params={"fields": "skill_id,scheduled_at,status"}),
+    Case("get_upcoming_sessions", "GET", "/sessions/upcoming"),
+    Case("create_session", "POST", "/sessions/",
+         json=lambda ds: {"skill_id": ds.skill_id, "scheduled_at": _future(), "duration_minutes": 60}),
+    Case("create_session", "POST", "/sessions/", idempotency="replay",
+         json=lambda ds: {"skill_id": ds.skill_id, "scheduled_at": _future(), "duration_minutes": 60}),
+    Case("create_session", "POST", "/sessions/", idempotency="mismatch", expected=422,
+         json=lambda ds: {"skill_id": ds.skill_id, "scheduled_at": _future(), "duration_minutes": 60}),
+    Case("create_session", "POST", "/sessions/", idempotency="concurrent",
+         json=lambda ds: {"skill_id": ds.skill_id, "scheduled_at": _future(), "duration_minutes": 60}),
+    Case("confirm_session", "POST", "/sessions/{session_id}/confirm", as_teacher=True,
+         prepare=_new_session("pending")),
+    Case("decline_session", "POST", "/sessions/{session_id}/decline", as_teacher=True,
+         prepare=_new_session("pending")),
+    Case("cancel_session", "POST", "/sessions/{session_id}/cancel", prepare=_new_session("pending")),
+    Case("complete_session", "POST", "/sessions/{session_id}/complete", as_teacher=True,
+         prepare=_new_session("confirmed")),
+    # leaderboards
+    Case("get_leaderboard", "GET", "/leaderboards/streak"),
+    Case("get_leaderboard", "GET", "/leaderboards/tokens_earned", params={"limit": 50}),
+    # transactions
+    Case("get_transactions", "GET", "/transactions/"),
+    Case("get_balance", "GET", "/transactions/balance"),
+    # chats
+    Case("get_chats", "GET", "/chats/"),
+    Case("get_chats", "GET", "/chats/", params={"fields": "participant_name,unread_count"}),
+    Case("get_messages", "GET", "/chats/{chat_id}/messages"),
+    Case("create_message", "POST", "/chats/{chat_id}/messages", json=lambda ds: {"content": "Benchmark"}),
+    Case("create_message", "POST", "/chats/{chat_id}/messages", idempotency="replay",
+         json=lambda ds: {"content": "Benchmark"}),
+    Case("get_or_create_chat", "POST", "/chats/", json=lambda ds: {"user_id": ds.teacher_id}),
+    # batch
+    Case("run_batch", "POST", "/batch/",
+         json=lambda ds: {"requests": [
+             {"id": "me", "path": "/users/me"},
+             {"id": "skill", "path": f"/skills/{ds.skill_id}"},
+             {"id": "upcoming", "path": "/sessions/upcoming"},
+             {"id": "balance", "path": "/transactions/balance"},
+         ]}),
+]
+
+
+def case_id(case: Case) -> str:
+    params = {**case.params, "idempotency": case.idempotency} if case.idempotency else case.params
+    suffix = ",".join(f"{k}={v}" for k, v in params.items())
+    return f"{case.name}[{suffix}]" if suffix else case.name
+
+
+def _replayed(response) -> bool:
+    return response.headers.get("Idempotent-Replayed") == "true"
+
+
+def run_case(client, ds, case: Case):
+    """Call the endpoint REPEAT times; return (median ms, max query count)."""
+    app.dependency_overrides[get_db] = ds.get_db
+    idempotency_store.session_factory = ds.SessionLocal
+    timings, queries = [], []
+    for _ in range(REPEAT):
+        values = vars(ds).copy()
+        if case.prepare:
+            values.update(case.prepare(ds))
+        path = "/api/v1" + case.path.format(**values)
+        if case.headers:
+            headers = case.headers(ds)
+        else:
+            headers = ds.teacher_headers if case.as_teacher else ds.headers
+        body = case.json(ds) if case.json else None
+
+        def call(body=body):
+            return client.request(case.method, path, headers=headers, json=body, params=case.params)
+
+        if case.idempotency:
+            headers = {**headers, "Idempotency-Key": uuid.uuid4().hex}
+            if case.idempotency in ("replay", "mismatch"):
+                first = call()
+                assert first.status_code == 200 and not _replayed(first), f"{case_id(case)} first call -> {first.status_code}"
+
+        # Measure the uncached path (and keep datasets from sharing cached catalog responses)
+        skill_cache.cache.clear()
+        ds.queries = 0
+        start = time.perf_counter()
+        if case.idempotency == "concurrent":
+            with ThreadPoolExecutor(2) as pool:
+                responses = list(pool.map(lambda _: call(), range(2)))
+        elif case.idempotency == "mismatch":
+            responses = [call({**body, "retry": 1})]
+        else:
+            responses = [call()]
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(ds.queries)
+        for response in responses:
+            assert response.status_code == case.expected, f"{case_id(case)} -> {response.status_code}: {response.text[:200]}"
+        if case.idempotency == "replay":
+            assert _replayed(responses[0]), f"{case_id(case)} was not replayed"
+        elif case.idempotency == "concurrent":
+            assert sorted(map(_replayed, responses)) == [False, True], f"{case_id(case)}: expected one run, one replay"
+    return statistics.median(timings), max(queries)
+
+
+@pytest.mark.parametrize("case", CASES, ids=case_id)
+def test_endpoint(case, client, datasets, bench_results, baseline):
+    measured = {}
+    for size in SIZES:
+        ms, queries = run_case(client, datasets(size), case)
+        key = f"{case_id(case)}@{size}"
+        measured[size] = (ms, queries)
+        bench_results[key] = {"ms": round(ms, 3), "queries": queries}
+
+    failures = []
+    smallest = SIZES[0]
+    for size in SIZES[1:]:
+        if measured[size][1] > measured[smallest][1]:
+            failures.append(
+                f"query count grows with data size: {measured[smallest][1]} @ {smallest} "
+                f"-> {measured[size][1]} @ {size}"
+            )
+    for size, (ms, queries) in measured.items():
+        base = baseline.get(f"{case_id(case)}@{size}")
+        if not base:
+            continue
+        if queries > base["queries"]:
+            failures.append(f"@{size}: {queries} queries, baseline {base['queries']}")
+        if ms > base["ms"] * (1 + TOLERANCE) and ms - base["ms"] > MIN_DELTA_MS:
+            failures.append(f"@{size}: {ms:.1f} ms, baseline {base['ms']:.1f} ms (+{TOLERANCE:.0%} allowed)")
+    assert not failures, "; ".join(failures)
+
+
+def test_every_route_is_benchmarked():
+    routed = {route.endpoint.__name__ for route in api_router.routes if isinstance(route, APIRoute)}
+    missing = routed - {case.name for case in CASES}
+    assert not missing, f"endpoints without a benchmark case: {sorted(missing)}"
@@ -0,0 +1,36 @@
+"""
+Cold-start regression checks for the serverless entry point.
+
+IMPORT_BUDGET_MS (default 2000) bounds the median cumulative import time of
+`server`; the module checks are deterministic and guard the lazy imports.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.bench_import_time import BACKEND_DIR, measure
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "2000"))
+
+# Loaded on first use (login, token checks, DB access), never by importing the app
+DEFERRED_MODULES = ["passlib", "jose", "sqlalchemy.dialects.sqlite", "sqlalchemy.dialects.postgresql", "cProfile"]
+
+
+def test_import_time_within_budget():
+    totals, _ = measure("server", runs=3)
+    assert statistics.median(totals) <= IMPORT_BUDGET_MS
+
+
+def test_heavy_modules_are_deferred():
+    env = dict(os.environ, DATABASE_URL="mock", SECRET_KEY="import-time")
+    code = (
+        "import sys, server; "
+        "from app.core import database; "
+        f"print([m for m in {DEFERRED_MODULES!r} if m in sys.modules]); "
+        "print(database._engine is None)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout.splitlines()
+    assert out[-2] == "[]", f"imported eagerly: {out[-2]}"
+    assert out[-1] == "True", "database engine created at import time"
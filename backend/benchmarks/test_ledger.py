@@ -0,0 +1,92 @@
+"""
+Checks for ledger reconciliation (app.services.ledger).
+
+Each test records three users' welcome bonus and a booking, moves two of
+the balances away from their transactions and reconciles in batches of two
+user ids, on one worker since the in-memory database has a single connection.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.models import Transaction, User
+from app.services import ledger
+from app.services.ledger import ADJUSTMENT_DESCRIPTION, STARTING_BALANCE, WELCOME_BONUS_DESCRIPTION
+
+
+@pytest.fixture
+def drifted(empty_db, monkeypatch):
+    monkeypatch.setattr(ledger, "SessionLocal", empty_db)
+    db = empty_db()
+    users = [User(email=f"user{i}@example.com", name=f"User {i}", hashed_password="x") for i in range(3)]
+    db.add_all(users)
+    db.flush()
+    now = datetime.utcnow()
+    for user in users:
+        db.add(Transaction(user_id=user.id, type="earn", amount=STARTING_BALANCE,
+                           description=WELCOME_BONUS_DESCRIPTION, created_at=now))
+        db.add(Transaction(user_id=user.id, type="spend", amount=10, description="Booked session", created_at=now))
+        user.token_balance = STARTING_BALANCE - 10
+    # Balance above the ledger, balance below it, and one user in agreement
+    users[0].token_balance += 25
+    users[1].token_balance -= 5
+    db.commit()
+    ids = [user.id for user in users]
+    yield db, ids
+    db.close()
+
+
+def _balances(db, ids):
+    db.expire_all()
+    return [db.get(User, user_id).token_balance for user_id in ids]
+
+
+def _ledgers(db, ids):
+    sums = []
+    for user_id in ids:
+        earned = sum(t.amount for t in db.query(Transaction).filter_by(user_id=user_id, type="earn"))
+        spent = sum(t.amount for t in db.query(Transaction).filter_by(user_id=user_id, type="spend"))
+        sums.append(earned - spent)
+    return sums
+
+
+def test_reconcile_reports_drift_without_writing(drifted):
+    db, ids = drifted
+
+    result = ledger.reconcile(batch_size=2, workers=1)
+
+    assert (result.users, result.transactions, result.repaired) == (3, 6, 0)
+    assert [(d.user_id, d.difference) for d in result.drifts] == [(ids[0], 25), (ids[1], -5)]
+    assert _balances(db, ids) == [STARTING_BALANCE + 15, STARTING_BALANCE - 15, STARTING_BALANCE - 10]
+    assert db.query(Transaction).count() == 6
+
+
+def test_repair_ledger_adds_adjustments(drifted):
+    db, ids = drifted
+
+    result = ledger.reconcile(batch_size=2, workers=1, repair_mode="ledger")
+
+    assert result.repaired == 2
+    adjustments = db.query(Transaction).filter(Transaction.description == ADJUSTMENT_DESCRIPTION) \
+        .order_by(Transaction.user_id).all()
+    assert [(t.user_id, t.type, t.amount) for t in adjustments] == [(ids[0], "earn", 25), (ids[1], "spend", 5)]
+    # Balances are kept; the ledger now matches them
+    assert _balances(db, ids) == [STARTING_BALANCE + 15, STARTING_BALANCE - 15, STARTING_BALANCE - 10]
+    assert _ledgers(db, ids) == _balances(db, ids)
+    assert ledger.reconcile(batch_size=2, workers=1).drifts == []
+
+
+def test_repair_balance_resets_balances(drifted):
+    db, ids = drifted
+
+    result = ledger.reconcile(batch_size=2, workers=1, repair_mode="balance")
+
+    assert result.repaired == 2
+    assert _balances(db, ids) == [STARTING_BALANCE - 10] * 3
+    assert db.query(Transaction).count() == 6  # transactions untouched
+    assert ledger.reconcile(batch_size=2, workers=1).drifts == []
+
+
+def test_unknown_repair_mode_is_rejected(drifted):
+    with pytest.raises(ValueError):
+        ledger.reconcile(repair_mode="both")
@@ -0,0 +1,121 @@
+"""
+Checks for the token-bucket rate limiter.
+
+The endpoint benchmarks run with RATE_LIMIT_ENABLED=false, so the buckets and
+the middleware are exercised here on their own, around a bare ASGI app.
+"""
+import re
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import ratelimit
+from app.core.ratelimit import MemoryBucketStore, Policy, RateLimitMiddleware
+from app.core.security import create_access_token
+
+
+class Clock:
+    """Stands in for the `time` module inside app.core.ratelimit only."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.wall = time.time()
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall + self.now - 1000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_waits_for_refill(clock):
+    store = MemoryBucketStore()
+    # 3 requests per 6 seconds: one token every 2 seconds
+    assert [store.take("k", 3, 6) for _ in range(3)] == [0, 0, 0]
+    assert store.take("k", 3, 6) == pytest.approx(2.0)
+    clock.now += 1
+    assert store.take("k", 3, 6) == pytest.approx(1.0)  # half a token back
+    clock.now += 1
+    assert store.take("k", 3, 6) == 0
+    assert store.take("other", 3, 6) == 0  # buckets are per key
+
+
+def test_bucket_refill_is_capped_at_the_limit(clock):
+    store = MemoryBucketStore()
+    store.take("k", 2, 10)
+    clock.now += 3600
+    assert [store.take("k", 2, 10) for _ in range(2)] == [0, 0]
+    assert store.take("k", 2, 10) == pytest.approx(5.0)
+
+
+def test_least_recently_used_buckets_are_dropped(clock):
+    store = MemoryBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.take(key, 1, 60)
+    assert len(store) == 2
+    assert store.take("a", 1, 60) == 0  # evicted, so it came back full
+    assert store.take("c", 1, 60) > 0
+
+
+def _client(policy: Policy) -> TestClient:
+    inner = FastAPI()
+
+    @inner.get("/api/v1/things")
+    def things():
+        return {"ok": True}
+
+    store = MemoryBucketStore()
+    return TestClient(RateLimitMiddleware(inner, store=store, policies=[policy]))
+
+
+def test_request_over_the_limit_gets_429_with_retry_after(clock):
+    client = _client(Policy("default", 2, 30, re.compile(r"^/api/")))
+    assert [client.get("/api/v1/things").status_code for _ in range(2)] == [200, 200]
+
+    response = client.get("/api/v1/things")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "15"  # one token per 15 seconds
+    assert response.headers["ratelimit-policy"] == "2;w=30"
+
+    clock.now += 15
+    assert client.get("/api/v1/things").status_code == 200
+
+
+def test_authenticated_callers_have_their_own_buckets(clock):
+    client = _client(Policy("default", 1, 60, re.compile(r"^/api/")))
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice@example.com'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': 'bob@example.com'})}"}
+
+    assert client.get("/api/v1/things", headers=alice).status_code == 200
+    assert client.get("/api/v1/things", headers=alice).status_code == 429
+    # Same address, different user
+    assert client.get("/api/v1/things", headers=bob).status_code == 200
+    assert client.get("/api/v1/things").status_code == 200
+
+
+def test_ip_policies_ignore_the_token(clock):
+    client = _client(Policy("login", 1, 60, re.compile(r"^/api/"), key="ip"))
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice@example.com'})}"}
+
+    assert client.get("/api/v1/things", headers=alice).status_code == 200
+    assert client.get("/api/v1/things").status_code == 429
+
+
+def test_cached_token_subject_expires(clock):
+    token = create_access_token({"sub": "alice@example.com"}, expires_delta=timedelta(minutes=5))
+    assert ratelimit._token_subject(token) == "alice@example.com"
+
+    clock.now += 6 * 60
+    hits = ratelimit._token_claims.cache_info().hits
+    assert ratelimit._token_subject(token) is None
+    assert ratelimit._token_claims.cache_info().hits == hits + 1  # decided without decoding again
@@ -0,0 +1,133 @@
+"""
+Checks for the session sweeper (app.services.session_sweeper and sweep_sessions.py).
+
+Each test seeds a teacher, a student and a skill in an empty database, plus
+sessions on either side of the pending TTL and the complete-after window.
+"""
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+import sweep_sessions
+from app.models import Session, Skill, Transaction, User
+from app.services import session_sweeper
+from app.services.ledger import TEACHING_EARNING_PREFIX
+
+PRICE = 7
+BALANCE = 100
+
+
+@pytest.fixture
+def world(empty_db, monkeypatch):
+    monkeypatch.setattr(session_sweeper, "SessionLocal", empty_db)
+    db = empty_db()
+    teacher = User(email="teacher@example.com", name="Teacher", hashed_password="x", token_balance=BALANCE)
+    student = User(email="student@example.com", name="Student", hashed_password="x", token_balance=BALANCE)
+    db.add_all([teacher, student])
+    db.flush()
+    skill = Skill(title="Guitar", description="Chords", teacher_id=teacher.id, category="Music",
+                  level="Beginner", tokens_per_session=PRICE)
+    db.add(skill)
+    db.flush()
+
+    now = datetime.utcnow()
+
+    def session(status: str, scheduled_at: datetime, created_at: datetime = now) -> int:
+        row = Session(skill_id=skill.id, teacher_id=teacher.id, student_id=student.id,
+                      scheduled_at=scheduled_at, status=status, created_at=created_at)
+        db.add(row)
+        db.flush()
+        return row.id
+
+    ids = {
+        "started_pending": session("pending", now - timedelta(hours=1)),
+        "old_pending": session("pending", now + timedelta(days=7), created_at=now - timedelta(hours=100)),
+        "fresh_pending": session("pending", now + timedelta(days=1)),
+        "past_confirmed": session("confirmed", now - timedelta(hours=30)),
+        "recent_confirmed": session("confirmed", now - timedelta(hours=2)),
+    }
+    db.commit()
+    yield db, teacher.id, student.id, ids
+    db.close()
+
+
+def _statuses(db, ids):
+    db.expire_all()
+    return {name: db.get(Session, session_id).status for name, session_id in ids.items()}
+
+
+def _balance(db, user_id):
+    return db.query(User.token_balance).filter(User.id == user_id).scalar()
+
+
+def test_stale_pending_sessions_are_cancelled_and_refunded(world):
+    db, teacher_id, student_id, ids = world
+
+    result = session_sweeper.sweep(batch_size=1, pending_ttl_hours=72, past_confirmed_policy="")
+
+    assert (result.expired, result.refunded, result.dry_run) == (2, 2 * PRICE, False)
+    assert _statuses(db, ids) == {
+        "started_pending": "cancelled",
+        "old_pending": "cancelled",
+        "fresh_pending": "pending",
+        "past_confirmed": "confirmed",
+        "recent_confirmed": "confirmed",
+    }
+    refunds = db.query(Transaction).filter(Transaction.user_id == student_id, Transaction.type == "earn").all()
+    assert sorted(t.amount for t in refunds) == [PRICE, PRICE]
+    assert all(t.description == "Refund for expired session on Guitar" for t in refunds)
+    assert _balance(db, student_id) == BALANCE + 2 * PRICE
+    assert _balance(db, teacher_id) == BALANCE
+
+    # Nothing left to do
+    assert session_sweeper.sweep(pending_ttl_hours=72, past_confirmed_policy="").expired == 0
+
+
+def test_past_confirmed_sessions_are_completed_and_paid(world):
+    db, teacher_id, student_id, ids = world
+
+    result = session_sweeper.sweep(pending_ttl_hours=0, past_confirmed_policy="complete", complete_after_hours=24)
+
+    assert (result.expired, result.completed, result.earned) == (1, 1, PRICE)
+    statuses = _statuses(db, ids)
+    assert statuses["past_confirmed"] == "completed"
+    assert statuses["recent_confirmed"] == "confirmed"
+    assert statuses["old_pending"] == "pending"  # no TTL: only sessions that have started expire
+    earnings = db.query(Transaction).filter(Transaction.user_id == teacher_id).all()
+    assert [(t.type, t.amount, t.description) for t in earnings] == [("earn", PRICE, f"{TEACHING_EARNING_PREFIX}Guitar")]
+    assert _balance(db, teacher_id) == BALANCE + PRICE
+    assert _balance(db, student_id) == BALANCE + PRICE  # the started pending session's refund
+    assert db.query(User.streak).filter(User.id == student_id).scalar() == 1
+
+
+def test_flag_policy_marks_overdue_without_paying(world):
+    db, teacher_id, _, ids = world
+
+    result = session_sweeper.sweep(pending_ttl_hours=72, past_confirmed_policy="flag", complete_after_hours=24)
+
+    assert (result.flagged, result.completed, result.earned) == (1, 0, 0)
+    db.expire_all()
+    overdue = db.get(Session, ids["past_confirmed"])
+    assert overdue.status == "confirmed" and overdue.overdue_at is not None
+    assert db.get(Session, ids["recent_confirmed"]).overdue_at is None
+    assert _balance(db, teacher_id) == BALANCE
+    # Flagged once
+    assert session_sweeper.sweep(pending_ttl_hours=72, past_confirmed_policy="flag").flagged == 0
+
+
+def test_dry_run_writes_nothing(world, monkeypatch, capsys):
+    db, teacher_id, student_id, ids = world
+    before = _statuses(db, ids)
+    monkeypatch.setattr(sys, "argv", [
+        "sweep_sessions.py", "--dry-run", "--pending-ttl-hours", "72", "--past-confirmed", "complete",
+    ])
+
+    sweep_sessions.main()
+
+    out = capsys.readouterr().out
+    assert f"2 stale pending sessions would be cancelled, refunding {2 * PRICE} tokens" in out
+    assert f"1 past confirmed sessions would be completed, paying {PRICE} tokens" in out
+    assert _statuses(db, ids) == before
+    assert db.query(Transaction).count() == 0
+    assert (_balance(db, teacher_id), _balance(db, student_id)) == (BALANCE, BALANCE)
@@ -0,0 +1,61 @@
+"""
+Production server configuration.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Runs a configurable number of uvicorn workers under gunicorn:
+- the app is imported once in the master (preload) so workers share imported
+  modules copy-on-write,
+- every worker drops the SQLAlchemy connection pool it inherited on fork,
+- SIGTERM drains in-flight requests for up to GRACEFUL_TIMEOUT seconds,
+- workers are recycled after MAX_REQUESTS (+ jitter) requests,
+- a worker that stops heartbeating for TIMEOUT seconds is killed and replaced,
+- several workers need CACHE_URL or the outbox to share skill cache
+  invalidations,
+- GET /metrics merges every worker's metrics through snapshot files in
+  METRICS_DIR, which is emptied when the server starts.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Per-worker skill caches only learn of each other's invalidations through the outbox
+if workers > 1 and not os.getenv("CACHE_URL") and os.getenv("OUTBOX_ENABLED", "true").lower() != "true":
+    raise RuntimeError("More than one worker needs CACHE_URL or OUTBOX_ENABLED=true to keep the skill cache consistent")
+
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+# Read by the app's settings, which preload imports after this file
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"circleed-metrics-{os.getenv('PORT', '8000')}"))
+
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+accesslog = os.getenv("ACCESS_LOG") or None
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Counters restart with the server; Prometheus treats that as a reset
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared between processes;
+    # close=False leaves them to the parent and gives this worker a fresh pool.
+    from app.core.database import dispose_engine
+    dispose_engine(close=False)
+    server.log.info(f"Worker {worker.pid} ready")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
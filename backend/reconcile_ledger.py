@@ -0,0 +1,65 @@
+"""
+Check every user's token balance against their transactions (earn - spend)
+and report the users that disagree; see app.services.ledger.
+
+Usage:
+    python reconcile_ledger.py [--batch-size 10000] [--workers 4] [--show 50]
+    python reconcile_ledger.py --repair ledger    # balances are right: add adjustment transactions
+    python reconcile_ledger.py --repair balance   # transactions are right: reset the balances
+
+Exits with status 1 if drift was found and not repaired, so it can gate a
+deploy or alert from cron. Repairs are refused until `python -m app.db.init_db`
+has recorded the welcome bonus of users who registered before it was written.
+"""
+import argparse
+import sys
+
+from app.core.database import SessionLocal
+from app.services.ledger import REPAIR_MODES, STARTING_BALANCE, reconcile, welcome_bonus_backfilled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=10000, help="user ids per aggregate query")
+    parser.add_argument("--workers", type=int, default=4, help="aggregate queries run in parallel")
+    parser.add_argument("--repair", choices=REPAIR_MODES, help="fix the drift found (default: report only)")
+    parser.add_argument("--show", type=int, default=50, help="drifted users to list (largest first)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        backfilled = welcome_bonus_backfilled(db)
+    finally:
+        db.close()
+    if not backfilled:
+        message = (f"Some users have no welcome bonus transaction and will show +{STARTING_BALANCE} drift; "
+                   "run python -m app.db.init_db to record it")
+        if args.repair:
+            parser.error(message)
+        print(f"Warning: {message}\n", file=sys.stderr)
+
+    result = reconcile(batch_size=args.batch_size, workers=args.workers, repair_mode=args.repair)
+    print(f"Checked {result.users} users and {result.transactions} transactions "
+          f"in {result.seconds:.1f}s with {args.workers} workers")
+    if not result.drifts:
+        print("Every balance matches its transactions.")
+        return
+
+    total = sum(drift.difference for drift in result.drifts)
+    print(f"{len(result.drifts)} users drifted, net {total:+d} tokens "
+          f"(balance above ledger: {sum(1 for d in result.drifts if d.difference > 0)}, "
+          f"below: {sum(1 for d in result.drifts if d.difference < 0)})\n")
+    print(f"{'user':>10} {'balance':>10} {'ledger':>10} {'drift':>10} {'transactions':>13}")
+    for drift in sorted(result.drifts, key=lambda d: -abs(d.difference))[:args.show]:
+        print(f"{drift.user_id:>10} {drift.balance:>10} {drift.ledger:>10} {drift.difference:>+10d} {drift.transactions:>13}")
+    if len(result.drifts) > args.show:
+        print(f"... and {len(result.drifts) - args.show} more")
+
+    if args.repair:
+        print(f"\nRepaired {result.repaired} users ({args.repair})")
+    else:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
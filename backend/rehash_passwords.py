@@ -1,59 +1,124 @@
 """
-Migration script to rehash all existing passwords.
-Run this once to migrate all passwords to the new SHA256 + bcrypt scheme.
+Audit stored password hashes: scheme and cost distribution, and how many
+are due for an upgrade.
+
+Hashes cannot be upgraded offline (that needs the plain password); outdated
+ones are rehashed automatically after the user's next successful login
+(see app.services.passwords). This script shows how far that has got.
+
+Users are streamed in id order, --batch-size at a time, and each batch is
+classified in a process pool while the next one is read, so memory stays
+flat and the database sees only short keyset queries.
+
+Usage:
+    python rehash_passwords.py [--batch-size 5000] [--workers 4] [--list-outdated]
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
+from app.core.database import SessionLocal
 from app.models.user import User
-from app.core.config import settings
-from app.core.security import get_password_hash, pwd_context
-import hashlib
-
-def get_db_engine():
-    return create_engine(settings.DATABASE_URL)
-
-def is_old_format_hash(hash_string: str) -> bool:
-    """Check if hash is in old format (bcrypt only, without SHA256 pre-hashing)."""
-    # Old format hashes start with $2a$, $2b$, or $2y$ (bcrypt)
-    # New format hashes are also bcrypt, but input was SHA256 pre-hashed
-    # We can identify old ones by trying to verify a known pattern
-    return hash_string.startswith("$2")
-
-def rehash_password_to_new_format(old_hash: str, plain_password: str = None):
-    """
-    If we have the plain password, we can rehash it properly.
-    Otherwise, we need the plain password to be re-entered.
-    
-    NOTE: This script requires plain passwords. If they're not available,
-    users will need to reset their passwords.
-    """
-    if plain_password is None:
-        return None
-    
-    return get_password_hash(plain_password)
+
+
+def iter_batches(batch_size: int) -> Iterator[List[Tuple[int, str]]]:
+    """(id, hashed_password) rows in id order, without loading whole users or the whole table."""
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(User.id, User.hashed_password)
+                .filter(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+                .all()
+            )
+        finally:
+            db.close()
+        if not rows:
+            return
+        yield [(user_id, hashed) for user_id, hashed in rows]
+        last_id = rows[-1][0]
+
+
+def describe(hashed: str) -> Tuple[str, bool]:
+    """("bcrypt $2b$ cost 12", needs update) for one stored hash."""
+    from app.core.security import get_pwd_context
+
+    context = get_pwd_context()
+    if not hashed:
+        return "empty", True
+    handler = context.identify(hashed, resolve=True, required=False)
+    if handler is None:
+        return "unrecognized", True
+    parsed = handler.from_string(hashed)
+    label = handler.name
+    ident = getattr(parsed, "ident", None)
+    if ident:
+        label += f" {ident}"
+    rounds = getattr(parsed, "rounds", None)
+    if rounds is not None:
+        label += f" cost {rounds}"
+    return label, context.needs_update(hashed)
+
+
+def classify(batch: List[Tuple[int, str]]) -> Tuple[Counter, List[int]]:
+    """Runs in a worker process: hash kinds of one batch and the ids due for an upgrade."""
+    kinds = Counter()
+    outdated = []
+    for user_id, hashed in batch:
+        label, needs_update = describe(hashed)
+        kinds[label] += 1
+        if needs_update:
+            outdated.append(user_id)
+    return kinds, outdated
+
 
 def main():
-    engine = get_db_engine()
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    
-    try:
-        users = session.query(User).all()
-        count = 0
-        
-        for user in users:
-            if user.hashed_password and is_old_format_hash(user.hashed_password):
-                print(f"User {user.email} has old format hash")
-                # Note: We cannot automatically rehash without the plain password
-                # This script is informational
-                count += 1
-        
-        print(f"\nFound {count} users with potentially old format hashes.")
-        print("NOTE: Users will need to reset their passwords or the old hashes")
-        print("will be automatically handled by the new verification logic.")
-        
-    finally:
-        session.close()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--list-outdated", action="store_true", help="print the ids of users with outdated hashes")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    kinds = Counter()
+    outdated: List[int] = []
+    scanned = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pending = []
+        # At most two batches per worker in flight, so reading never runs far ahead
+        for batch in iter_batches(args.batch_size):
+            scanned += len(batch)
+            pending.append(pool.submit(classify, batch))
+            if len(pending) >= 2 * args.workers:
+                batch_kinds, batch_outdated = pending.pop(0).result()
+                kinds.update(batch_kinds)
+                outdated.extend(batch_outdated)
+                print(f"  {scanned} users scanned...", file=sys.stderr)
+        for future in pending:
+            batch_kinds, batch_outdated = future.result()
+            kinds.update(batch_kinds)
+            outdated.extend(batch_outdated)
+
+    elapsed = time.perf_counter() - started
+    print(f"Scanned {scanned} users in {elapsed:.1f}s with {args.workers} workers\n")
+    print(f"{'hash':<32} {'users':>10} {'share':>7}")
+    for label, count in sorted(kinds.items(), key=lambda item: -item[1]):
+        print(f"{label:<32} {count:>10} {count / scanned:>7.1%}")
+    print(f"\n{len(outdated)} hashes are due for an upgrade; they are rehashed at each user's next login.")
+    unusable = kinds["unrecognized"] + kinds["empty"]
+    if unusable:
+        print(f"{unusable} of them cannot be verified at all; those users need a password reset.")
+    if args.list_outdated:
+        for user_id in sorted(outdated):
+            print(user_id)
+
 
 if __name__ == "__main__":
     main()
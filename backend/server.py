@@ -1,7 +1,8 @@
-import uvicorn
 from app.main import app
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         app,
         host="0.0.0.0",
@@ -0,0 +1,44 @@
+"""
+Expire stale pending sessions (refunding the students) and flag or complete
+long-past confirmed ones; see app.services.session_sweeper. Defaults come
+from the SESSION_* settings.
+
+Usage:
+    python sweep_sessions.py --dry-run
+    python sweep_sessions.py [--batch-size 500] [--pending-ttl-hours 72]
+                             [--past-confirmed flag|complete|none] [--complete-after-hours 24]
+"""
+import argparse
+
+from app.core.config import settings
+from app.services.session_sweeper import PAST_CONFIRMED_POLICIES, sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.SESSION_SWEEP_BATCH_SIZE)
+    parser.add_argument("--pending-ttl-hours", type=float, default=settings.SESSION_PENDING_TTL_HOURS,
+                        help="expire pending sessions older than this even before their start (0: only after it)")
+    parser.add_argument("--past-confirmed", choices=PAST_CONFIRMED_POLICIES + ("none",),
+                        default=settings.SESSION_PAST_CONFIRMED or "none")
+    parser.add_argument("--complete-after-hours", type=float, default=settings.SESSION_COMPLETE_AFTER_HOURS)
+    parser.add_argument("--dry-run", action="store_true", help="only count what would change")
+    args = parser.parse_args()
+
+    result = sweep(
+        batch_size=args.batch_size,
+        pending_ttl_hours=args.pending_ttl_hours,
+        past_confirmed_policy="" if args.past_confirmed == "none" else args.past_confirmed,
+        complete_after_hours=args.complete_after_hours,
+        dry_run=args.dry_run,
+    )
+    verb = "would be" if result.dry_run else "were"
+    print(f"{result.expired} stale pending sessions {verb} cancelled, refunding {result.refunded} tokens")
+    if args.past_confirmed == "complete":
+        print(f"{result.completed} past confirmed sessions {verb} completed, paying {result.earned} tokens")
+    elif args.past_confirmed == "flag":
+        print(f"{result.flagged} past confirmed sessions {verb} flagged overdue")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ import { PrimaryButton } from "@/components/PrimaryButton"
 import { SecondaryButton } from "@/components/SecondaryButton"
 import { Github, Mail } from "lucide-react"
 import { useAuthRedirect } from "@/lib/useAuthRedirect"
+import { storeTokens } from "@/lib/api"
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1"
 
@@ -41,7 +42,7 @@ export default function LoginPage() {
       const data = await response.json()
       
       // Store token in localStorage
-      localStorage.setItem("access_token", data.access_token)
+      storeTokens(data)
       localStorage.setItem("user", JSON.stringify(data.user))
       
       // Dispatch custom event so navbar updates immediately
@@ -10,6 +10,7 @@ import { PrimaryButton } from "@/components/PrimaryButton"
 import { SecondaryButton } from "@/components/SecondaryButton"
 import { Github, Mail } from "lucide-react"
 import { useAuthRedirect } from "@/lib/useAuthRedirect"
+import { storeTokens } from "@/lib/api"
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1"
 
@@ -72,7 +73,7 @@ export default function RegisterPage() {
       const loginData = await loginResponse.json()
       
       // Store token in localStorage
-      localStorage.setItem("access_token", loginData.access_token)
+      storeTokens(loginData)
       localStorage.setItem("user", JSON.stringify(loginData.user))
       
       // Dispatch custom event so navbar updates immediately
@@ -5,7 +5,7 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
 import { Textarea } from "@/components/ui/textarea"
-import { sessionsAPI, skillsAPI, Session, Skill } from "@/lib/api"
+import { sessionsAPI, skillsAPI, usersAPI, Session, Skill } from "@/lib/api"
 import type { User as ApiUser } from "@/lib/api"
 import { Calendar, Clock, User, CheckCircle, XCircle, AlertCircle, MessageSquare, Star, X } from "lucide-react"
 import { TokenBadge } from "@/components/TokenBadge"
@@ -18,8 +18,6 @@ import {
   sendTokensEarnedNotification 
 } from "@/lib/notifications"
 
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1"
-
 export default function BookingsPage() {
   const [activeTab, setActiveTab] = useState<"all" | "upcoming" | "past">("all")
   const [sessions, setSessions] = useState<Session[]>([])
@@ -67,11 +65,7 @@ export default function BookingsPage() {
         const usersMap = new Map<number, ApiUser>()
         for (const userId of userIds) {
           try {
-            const user = await fetch(`${API_BASE_URL}/users/${userId}`, {
-              headers: {
-                'Authorization': `Bearer ${localStorage.getItem('access_token')}`
-              }
-            }).then(r => r.json())
+            const user = await usersAPI.getById(userId)
             usersMap.set(userId, user)
           } catch (err) {
             console.error(`Failed to fetch user ${userId}:`, err)
@@ -4,7 +4,7 @@ import { useState, useEffect, useRef } from "react"
 import { Card, CardContent } from "@/components/ui/card"
 import { Input } from "@/components/ui/input"
 import { Button } from "@/components/ui/button"
-import { chatsAPI, Chat } from "@/lib/api"
+import { chatsAPI, usersAPI, Chat } from "@/lib/api"
 import { Search, Send, User, ArrowLeft } from "lucide-react"
 import { useToast } from "@/components/Toast"
 import Image from "next/image"
@@ -32,18 +32,8 @@ export default function ChatPage() {
   useEffect(() => {
     const loadUser = async () => {
       try {
-        const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1'
-        const token = typeof window !== 'undefined' ? localStorage.getItem('access_token') : null
-        const response = await fetch(`${API_BASE_URL}/users/me`, {
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json'
-          }
-        })
-        if (response.ok) {
-          const u = await response.json()
-          setCurrentUserId(u.id)
-        }
+        const u = await usersAPI.getCurrentUser()
+        setCurrentUserId(u.id)
       } catch (err) {
         console.error('Failed to load user:', err)
         setCurrentUserId(null)
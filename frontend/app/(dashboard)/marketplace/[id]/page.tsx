@@ -8,7 +8,7 @@ import { TokenBadge } from "@/components/TokenBadge"
 import { PrimaryButton } from "@/components/PrimaryButton"
 import { Star, Calendar, CheckCircle } from "lucide-react"
 import Image from "next/image"
-import { skillsAPI, sessionsAPI, chatsAPI, Skill, SkillReview } from "@/lib/api" 
+import { skillsAPI, sessionsAPI, chatsAPI, usersAPI, Skill, SkillReview } from "@/lib/api"
 import { useRouter } from "next/navigation"
 import { useToast } from "@/components/Toast"
 
@@ -19,6 +19,8 @@ export default function SkillProfilePage({
 }) {
   const [skill, setSkill] = useState<Skill | null>(null)
   const [reviews, setReviews] = useState<SkillReview[]>([])
+  const [reviewsCursor, setReviewsCursor] = useState<string | null>(null)
+  const [loadingReviews, setLoadingReviews] = useState(false)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [skillId, setSkillId] = useState<string | null>(null)
@@ -33,18 +35,8 @@ export default function SkillProfilePage({
   useEffect(() => {
     const fetchCurrentUser = async () => {
       try {
-        const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1'
-        const token = typeof window !== 'undefined' ? localStorage.getItem('access_token') : null
-        const response = await fetch(`${API_BASE_URL}/users/me`, {
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json'
-          }
-        })
-        if (response.ok) {
-          const user = await response.json()
-          setCurrentUser(user)
-        }
+        const user = await usersAPI.getCurrentUser()
+        setCurrentUser(user)
       } catch (err) {
         console.error('Failed to load current user:', err)
       }
@@ -66,8 +58,9 @@ export default function SkillProfilePage({
         setLoading(true)
         const s = await skillsAPI.getById(Number(skillId))
         setSkill(s)
-        const r = await skillsAPI.getReviews(Number(skillId))
-        setReviews(r)
+        const page = await skillsAPI.getReviews(Number(skillId))
+        setReviews(page.items)
+        setReviewsCursor(page.nextCursor)
         setError(null)
       } catch (err) {
         console.error("Error loading skill:", err)
@@ -137,6 +130,20 @@ export default function SkillProfilePage({
     return candidate.toISOString()
   }
 
+  const loadMoreReviews = async () => {
+    if (!reviewsCursor) return
+    try {
+      setLoadingReviews(true)
+      const page = await skillsAPI.getReviews(Number(skillId), reviewsCursor)
+      setReviews((current) => [...current, ...page.items])
+      setReviewsCursor(page.nextCursor)
+    } catch (err) {
+      showToast({ title: 'Reviews', message: err instanceof Error ? err.message : 'Failed to load more reviews', type: 'error' })
+    } finally {
+      setLoadingReviews(false)
+    }
+  }
+
   const handleSelectSlot = (day: string, time: string) => {
     setSelectedSlot({ day, time })
   }
@@ -205,7 +212,7 @@ export default function SkillProfilePage({
                 <Star className="h-4 w-4 fill-yellow-400 text-yellow-400" />
                 <span className="font-medium">{(skill.rating ?? 0).toFixed(1)}</span>
               </div>
-              <span className="text-gray-500">({reviews.length || skill.review_count || 0} reviews)</span>
+              <span className="text-gray-500">({skill.review_count || reviews.length} reviews)</span>
             </div>
           </div>
         </div>
@@ -297,7 +304,7 @@ export default function SkillProfilePage({
       {/* Reviews */}
       <Card>
         <CardHeader>
-          <CardTitle>Reviews ({reviews.length})</CardTitle>
+          <CardTitle>Reviews ({skill.review_count || reviews.length})</CardTitle>
         </CardHeader>
         <CardContent>
           <div className="space-y-4">
@@ -315,6 +322,15 @@ export default function SkillProfilePage({
             ) : (
               <p className="text-gray-500 text-center py-8">No reviews yet.</p>
             )}
+            {reviewsCursor && (
+              <button
+                onClick={loadMoreReviews}
+                disabled={loadingReviews}
+                className="w-full py-2 rounded-lg border text-sm font-medium text-indigo-700 hover:bg-indigo-50 disabled:opacity-50"
+              >
+                {loadingReviews ? 'Loading...' : 'Load more reviews'}
+              </button>
+            )}
           </div>
         </CardContent>
       </Card>
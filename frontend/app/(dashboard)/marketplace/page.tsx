@@ -4,7 +4,7 @@ import { useState, useEffect } from "react"
 import { SkillCard } from "@/components/SkillCard"
 import { Select } from "@/components/ui/select"
 import { Input } from "@/components/ui/input"
-import { skillsAPI, Skill } from "@/lib/api"
+import { skillsAPI, usersAPI, Skill } from "@/lib/api"
 import { Search, Filter, Sparkles } from "lucide-react"
 import { Button } from "@/components/ui/button"
 
@@ -22,18 +22,8 @@ export default function MarketplacePage() {
   useEffect(() => {
     const fetchCurrentUser = async () => {
       try {
-        const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1'
-        const token = typeof window !== 'undefined' ? localStorage.getItem('access_token') : null
-        const response = await fetch(`${API_BASE_URL}/users/me`, {
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json'
-          }
-        })
-        if (response.ok) {
-          const u = await response.json()
-          setCurrentUserId(u.id)
-        }
+        const u = await usersAPI.getCurrentUser()
+        setCurrentUserId(u.id)
       } catch (err) {
         console.error('Failed to load current user:', err)
       }
@@ -7,6 +7,7 @@ import { Select } from "@/components/ui/select"
 import { PrimaryButton } from "@/components/PrimaryButton"
 import { Button } from "@/components/ui/button"
 import { Bell, Clock, Calendar, LogOut } from "lucide-react"
+import { authAPI } from "@/lib/api"
 
 export default function SettingsPage() {
   const [emailNotifications, setEmailNotifications] = useState(true)
@@ -28,10 +29,9 @@ export default function SettingsPage() {
     }
   }
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
     if (confirm("Are you sure you want to logout?")) {
-      localStorage.removeItem("access_token")
-      localStorage.removeItem("user")
+      await authAPI.logout()
       window.location.href = "/login"
     }
   }
@@ -6,6 +6,7 @@ import { usePathname, useRouter } from "next/navigation"
 import { Button } from "@/components/ui/button"
 import { GraduationCap } from "lucide-react"
 import { NotificationCenter } from "@/components/NotificationCenter"
+import { authAPI, hasSession } from "@/lib/api"
 
 export function Navbar() {
   const pathname = usePathname()
@@ -19,9 +20,7 @@ export function Navbar() {
     // Check if user is logged in by checking for token in localStorage
     const checkAuth = () => {
       try {
-        const token = localStorage.getItem("access_token")
-        console.log("Token check:", { hasToken: !!token, tokenValue: token ? "exists" : "none" })
-        setIsLoggedIn(!!token)
+        setIsLoggedIn(hasSession())
       } catch (error) {
         console.error("Error checking auth:", error)
         setIsLoggedIn(false)
@@ -41,10 +40,9 @@ export function Navbar() {
     }
   }, [])
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
     if (typeof window !== "undefined") {
-      localStorage.removeItem("access_token")
-      localStorage.removeItem("user")
+      await authAPI.logout()
       setIsLoggedIn(false)
       // Dispatch custom event so navbar updates immediately
       window.dispatchEvent(new Event("authStateChanged"))
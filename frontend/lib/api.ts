@@ -29,11 +29,17 @@ export interface User {
   updated_at?: string
 }
 
+export interface ReviewerSummary {
+  id: number
+  full_name: string
+  avatar_url?: string
+}
+
 export interface SkillReview {
   id: number
   skill_id: number
   reviewer_id: number
-  reviewer?: User
+  reviewer?: ReviewerSummary
   rating: number
   comment: string
   created_at?: string
@@ -73,11 +79,76 @@ export interface Transaction {
   created_at?: string
 }
 
-// Helper function to make API calls
-async function apiCall<T>(
+export interface AuthTokens {
+  access_token: string
+  refresh_token: string
+  token_type: string
+  expires_in: number
+}
+
+export function storeTokens(tokens: { access_token: string; refresh_token?: string }) {
+  localStorage.setItem("access_token", tokens.access_token)
+  if (tokens.refresh_token) localStorage.setItem("refresh_token", tokens.refresh_token)
+}
+
+// Signed in as long as either token is left; an expired access token is renewed on the next call
+export function hasSession(): boolean {
+  return !!(localStorage.getItem("access_token") || localStorage.getItem("refresh_token"))
+}
+
+function clearTokens() {
+  localStorage.removeItem("access_token")
+  localStorage.removeItem("refresh_token")
+  localStorage.removeItem("user")
+}
+
+async function waitForRotation(usedToken: string, timeoutMs = 3000): Promise<boolean> {
+  const deadline = Date.now() + timeoutMs
+  while (Date.now() < deadline) {
+    const current = localStorage.getItem("refresh_token")
+    if (current && current !== usedToken) return true
+    await new Promise((resolve) => setTimeout(resolve, 100))
+  }
+  return false
+}
+
+// One refresh at a time: refresh tokens are single use, so parallel 401s must share it
+let refreshing: Promise<boolean> | null = null
+
+function refreshAccessToken(): Promise<boolean> {
+  if (!refreshing) {
+    refreshing = (async () => {
+      const refreshToken = localStorage.getItem("refresh_token")
+      if (!refreshToken) return false
+      const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      })
+      if (response.status === 409) {
+        // Another tab rotated this refresh token a moment ago: use the tokens it stores
+        return waitForRotation(refreshToken)
+      }
+      if (!response.ok) {
+        clearTokens()
+        window.dispatchEvent(new Event("authStateChanged"))
+        return false
+      }
+      storeTokens(await response.json())
+      return true
+    })().catch(() => false).finally(() => {
+      refreshing = null
+    })
+  }
+  return refreshing
+}
+
+// Authenticated fetch of an API path; an expired access token is renewed and the call retried once
+async function apiFetch(
   endpoint: string,
-  options: RequestInit = {}
-): Promise<T> {
+  options: RequestInit = {},
+  retried = false
+): Promise<Response> {
   const url = `${API_BASE_URL}${endpoint}`
   // Attach Authorization header when running in the browser and a token exists
   const authHeader: Record<string, string> = {}
@@ -99,14 +170,41 @@ async function apiCall<T>(
     },
   })
 
+  // Expired access token: renew it with the refresh token and try once more
+  if (response.status === 401 && !retried && authHeader["Authorization"] && !endpoint.startsWith('/auth/')) {
+    if (await refreshAccessToken()) return apiFetch(endpoint, options, true)
+  }
+
+  return response
+}
+
+async function checked(response: Response): Promise<Response> {
   if (!response.ok) {
     const error = await response.json().catch(() => ({}))
     throw new Error(error.detail || `API Error: ${response.status}`)
   }
+  return response
+}
 
+// Helper function to make API calls
+async function apiCall<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
+  const response = await checked(await apiFetch(endpoint, options))
   return response.json()
 }
 
+// One page of a cursor-paginated list; pass nextCursor back to get the page after it
+export interface Page<T> {
+  items: T[]
+  nextCursor: string | null
+}
+
+async function apiPage<T>(endpoint: string, cursor?: string | null): Promise<Page<T>> {
+  const separator = endpoint.includes('?') ? '&' : '?'
+  const url = cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint
+  const response = await checked(await apiFetch(url))
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
+}
+
 // Skills API
 export const skillsAPI = {
   getAll: (filters?: {
@@ -145,8 +243,8 @@ export const skillsAPI = {
       method: 'DELETE',
     }),
 
-  getReviews: (skillId: number) =>
-    apiCall<SkillReview[]>(`/skills/${skillId}/reviews`),
+  getReviews: (skillId: number, cursor?: string | null) =>
+    apiPage<SkillReview>(`/skills/${skillId}/reviews`, cursor),
 
   addReview: (skillId: number, review: { rating: number; comment: string }) =>
     apiCall<SkillReview>(`/skills/${skillId}/reviews`, {
@@ -227,6 +325,29 @@ export const transactionsAPI = {
   getBalance: () => apiCall<{ balance: number }>('/transactions/balance'),
 }
 
+// Batch API: several calls in one round trip (paths as passed to apiCall)
+export interface BatchSubRequest {
+  id?: string
+  method?: 'GET' | 'POST' | 'PUT' | 'PATCH' | 'DELETE'
+  path: string
+  body?: unknown
+}
+
+export interface BatchSubResponse<T = unknown> {
+  id?: string
+  status: number
+  headers: Record<string, string>
+  body: T
+}
+
+export const batchAPI = {
+  run: (requests: BatchSubRequest[]) =>
+    apiCall<{ responses: BatchSubResponse[] }>('/batch/', {
+      method: 'POST',
+      body: JSON.stringify({ requests }),
+    }),
+}
+
 // Auth API
 export const authAPI = {
   register: (credentials: { email: string; password: string; full_name: string }) =>
@@ -239,11 +360,25 @@ export const authAPI = {
     ),
 
   login: (credentials: { email: string; password: string }) =>
-    apiCall<{ access_token: string; token_type: string; user: User }>(
+    apiCall<AuthTokens & { user: User }>(
       '/auth/login',
       {
         method: 'POST',
         body: JSON.stringify(credentials),
       }
     ),
+
+  // Revokes the access and refresh tokens server-side, then forgets them
+  logout: async () => {
+    const refreshToken = localStorage.getItem("refresh_token")
+    try {
+      await apiCall<{ message: string }>('/auth/logout', {
+        method: 'POST',
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      })
+    } catch {
+      // Logged out locally either way
+    }
+    clearTokens()
+  },
 }